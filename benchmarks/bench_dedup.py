@@ -0,0 +1,71 @@
+"""
+Benchmark threat deduplication on synthetic LLM output with paraphrased duplicates.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_dedup.py [rows ...]
+
+Rows mix asset spellings ('Cloud Run: svc-1', 'Cloud Run svc-1', 'svc-1'), category
+aliases and filler words, so exact, canonicalized and near-duplicate paths are all hit.
+"""
+import random
+import sys
+import time
+
+from threat_modeling.dedup import ThreatDeduplicator
+
+TEMPLATES = [
+    ("Unauthenticated access to {x} allows data theft", "Spoofing"),
+    ("Missing audit logging on {x}", "Repudiation"),
+    ("Privilege escalation through overly broad service account on {x}", "Elevation of Privilege"),
+    ("Denial of service by flooding {x} with requests", "DoS"),
+    ("Tampering with data stored in {x}", "Tampering"),
+    ("Sensitive data exposed by {x} logs", "info disclosure"),
+]
+FILLERS = ["the", "publicly", "exposed", "", ""]
+
+
+def synthetic_rows(total, resources, seed=1):
+    rng = random.Random(seed)
+    summary = {
+        "cloud_run_services": [{"name": f"svc-{i}"} for i in range(resources // 2)],
+        "storage_buckets": [{"name": f"bucket-{i}"} for i in range(resources // 2)],
+    }
+    rows = []
+    for _ in range(total):
+        template, category = rng.choice(TEMPLATES)
+        k = rng.randrange(resources)
+        if k < resources // 2:
+            name = f"svc-{k}"
+            asset = rng.choice([f"Cloud Run: {name}", f"Cloud Run {name}", name])
+        else:
+            name = f"bucket-{k - resources // 2}"
+            asset = rng.choice([f"GCS: {name}", f"bucket {name}"])
+        rows.append({
+            "threat": template.format(x=f"{rng.choice(FILLERS)} {name}"),
+            "asset": asset,
+            "category": category,
+            "likelihood": rng.choice(["high", "Med", "Low"]),
+            "impact": rng.choice(["high", "Moderate", "minor"]),
+            "mitigation": "Restrict access",
+        })
+    return summary, rows
+
+
+def main(sizes):
+    print(f"{'rows':>8} {'kept':>8} {'exact':>8} {'near':>8} {'seconds':>9} {'rows/s':>10}")
+    for size in sizes:
+        summary, rows = synthetic_rows(size, resources=max(2, size // 25))
+        dedup = ThreatDeduplicator(summary)
+        started = time.perf_counter()
+        for row in rows:
+            dedup.add(row)
+        elapsed = time.perf_counter() - started
+        stats = dedup.stats
+        print(
+            f"{size:>8} {stats['rows_out']:>8} {stats['exact_duplicates']:>8} {stats['near_duplicates']:>8} "
+            f"{elapsed:>9.3f} {size / elapsed:>10,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 100_000])
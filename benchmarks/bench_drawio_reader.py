@@ -0,0 +1,102 @@
+"""
+Benchmark the streaming draw.io parser on generated multi-page diagrams.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_drawio_reader.py [cells ...]
+
+Each size is the number of cells per page (two pages: one plain, one compressed
+the way draw.io saves by default). Compares the old ET.parse + raw cell dump
+with parse_drawio on time, peak Python memory and output size.
+"""
+import base64
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+import xml.etree.ElementTree as ET
+import zlib
+from urllib.parse import quote
+
+from threat_modeling.tools.drawio_reader_tool import parse_drawio
+
+KINDS = ["gcp2.cloud_run", "gcp2.pubsub", "gcp2.cloud_storage", "gcp2.bigquery", "gcp2.cloud_sql"]
+
+
+def graph_model(cells):
+    parts = ['<mxGraphModel><root><mxCell id="0"/><mxCell id="1" parent="0"/>']
+    containers = max(1, cells // 500)
+    for c in range(containers):
+        parts.append(
+            f'<mxCell id="vpc{c}" value="VPC {c}" style="swimlane;dashed=1" vertex="1" parent="1">'
+            f'<mxGeometry x="{c * 600}" y="0" width="580" height="2000" as="geometry"/></mxCell>'
+        )
+    vertices = (cells - containers) // 2
+    for v in range(vertices):
+        parts.append(
+            f'<mxCell id="v{v}" value="service-{v}" style="shape=mxgraph.{KINDS[v % len(KINDS)]};html=1" '
+            f'vertex="1" parent="vpc{v % containers}"><mxGeometry x="10" y="{v % 40 * 48}" width="40" height="40" as="geometry"/></mxCell>'
+        )
+    for e in range(cells - containers - vertices):
+        parts.append(
+            f'<mxCell id="e{e}" value="" style="edgeStyle=orthogonalEdgeStyle" edge="1" parent="1" '
+            f'source="v{e % vertices}" target="v{(e * 7 + 1) % vertices}"><mxGeometry relative="1" as="geometry"/></mxCell>'
+        )
+    parts.append("</root></mxGraphModel>")
+    return "".join(parts)
+
+
+def compress(model):
+    deflate = zlib.compressobj(9, zlib.DEFLATED, -15)
+    return base64.b64encode(deflate.compress(quote(model).encode()) + deflate.flush()).decode()
+
+
+def write_diagram(path, cells):
+    model = graph_model(cells)
+    with open(path, "w") as f:
+        f.write(f'<mxfile><diagram id="p1" name="Plain">{model}</diagram>')
+        f.write(f'<diagram id="p2" name="Compressed">{compress(model)}</diagram></mxfile>')
+
+
+def legacy(path):
+    root = ET.parse(path).getroot()
+    cells = []
+    for cell in root.iter("mxCell"):
+        cell_data = {k: cell.attrib.get(k, "") for k in cell.attrib}
+        if cell.attrib.get("value", ""):
+            cell_data["text"] = cell.attrib["value"]
+        cells.append(cell_data)
+    return json.dumps({"cells": cells})
+
+
+def streaming(path):
+    return json.dumps({"pages": parse_drawio(path)}, separators=(",", ":"))
+
+
+def measure(function, path):
+    # Timed and memory-traced separately: tracemalloc slows allocation-heavy code several-fold
+    started = time.perf_counter()
+    output = function(path)
+    elapsed = time.perf_counter() - started
+    tracemalloc.start()
+    function(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, len(output)
+
+
+def main(sizes):
+    print(f"{'cells/page':>10} {'parser':<10} {'seconds':>8} {'peak MB':>9} {'output chars':>13}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for cells in sizes:
+            path = os.path.join(tmp, f"diagram_{cells}.drawio")
+            write_diagram(path, cells)
+            for label, function in (("legacy", legacy), ("streaming", streaming)):
+                elapsed, peak, size = measure(function, path)
+                # The legacy parser never sees the compressed page's cells
+                print(f"{cells:>10} {label:<10} {elapsed:>8.3f} {peak / 1e6:>9.1f} {size:>13,}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [5_000, 50_000, 100_000])
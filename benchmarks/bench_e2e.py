@@ -0,0 +1,469 @@
+"""
+Offline end-to-end benchmark of ThreatModelingCrew on synthetic projects.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_e2e.py [small|medium|large ...] [--save-baseline] [--baseline PATH]
+
+Each size runs in a fresh interpreter inside a temporary directory (cold caches,
+peak RSS of that run only) with:
+- fake `gcloud`/`bq` executables first on PATH that return N resources of each type,
+  datasets and tables, after BENCH_GCLOUD_LATENCY seconds (default 0.05) per call
+- a synthetic PDF of M pages, a large PNG diagram and a draw.io diagram
+- a deterministic stub LLM that calls each agent's tool once, answers STRIDE tasks
+  with three threats per resource it is shown, and hands every threat to the exporter
+
+STRIDE tasks are built from the cached GCP summary, so the inventory is collected once
+before the crew is created (reported as "collect"), as `run` does.
+
+The crew's phase timings and the instrumentation spans of each tool are reported
+with throughput and peak RSS. Results are compared with the stored baseline
+(benchmarks/baselines/e2e.json, committed for small and medium), and the script exits 1
+on a regression:
+- machine-independent counts (report rows, model rows, gcloud/bq subprocesses) differ
+- metered payload tokens (same tokenizer only) or peak RSS grow by more than
+  BENCH_TOLERANCE (default 0.25)
+- a phase's or tool's share of the run's total time grows by more than BENCH_TOLERANCE
+  and by at least 50 ms; shares rather than seconds, so the baseline holds across machines
+--save-baseline stores this run's sizes in the baseline instead.
+"""
+import json
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+BASELINE_PATH = os.path.join(BENCH_DIR, "baselines", "e2e.json")
+TOLERANCE = float(os.environ.get("BENCH_TOLERANCE", "0.25"))
+MIN_REGRESSION_SECONDS = 0.05
+PROJECT_ID = "bench-project-1"
+RESULT_MARKER = "BENCH_RESULT "
+
+SIZES = {
+    "small": {"resources": 10, "datasets": 4, "tables": 20, "pdf_pages": 20, "image": (1600, 1000), "drawio_cells": 200},
+    "medium": {"resources": 100, "datasets": 10, "tables": 200, "pdf_pages": 100, "image": (4000, 2500), "drawio_cells": 2000},
+    "large": {"resources": 1000, "datasets": 25, "tables": 1000, "pdf_pages": 400, "image": (9000, 6000), "drawio_cells": 10000},
+}
+
+FAKE_GCLOUD = '''#!{python}
+import json, os, sys, time
+time.sleep(float(os.environ.get("BENCH_GCLOUD_LATENCY", "0.05")))
+n = int(os.environ["BENCH_RESOURCES"])
+args = " ".join(sys.argv[1:])
+if args.startswith("services list"):
+    apis = ["compute", "storage", "cloudfunctions", "run", "pubsub", "bigquery", "container", "sqladmin", "secretmanager"]
+    print(json.dumps([{{"config": {{"name": f"{{api}}.googleapis.com"}}}} for api in apis]))
+elif args.startswith("compute instances"):
+    print(json.dumps([{{
+        "name": f"vm-{{i}}", "zone": "zones/us-central1-a", "machineType": "machineTypes/e2-medium",
+        "networkInterfaces": [{{"accessConfigs": [{{"natIP": f"34.1.{{i // 250}}.{{i % 250}}"}}] if i % 3 == 0 else []}}],
+        "serviceAccounts": [{{"email": f"sa-{{i % 7}}@{PROJECT_ID}.iam.gserviceaccount.com"}}],
+    }} for i in range(n)]))
+elif args.startswith("storage buckets"):
+    print(json.dumps([{{
+        "name": f"bucket-{{i}}", "location": "US", "storageClass": "STANDARD",
+        "iamConfiguration": {{"publicAccessPrevention": "inherited" if i % 4 == 0 else "enforced"}},
+    }} for i in range(n)]))
+elif args.startswith("functions"):
+    print(json.dumps([{{
+        "name": f"projects/{PROJECT_ID}/locations/us-central1/functions/fn-{{i}}", "entryPoint": "main",
+        "runtime": "python311", "serviceAccountEmail": f"sa-{{i % 7}}@{PROJECT_ID}.iam.gserviceaccount.com",
+        **({{"httpsTrigger": {{"url": f"https://fn-{{i}}"}}}} if i % 2 else
+           {{"eventTrigger": {{"eventType": "google.pubsub.topic.publish", "resource": f"projects/{PROJECT_ID}/topics/topic-{{i}}"}}}}),
+    }} for i in range(n)]))
+elif args.startswith("run services"):
+    print(json.dumps([{{
+        "metadata": {{"name": f"svc-{{i}}", "annotations": {{"run.googleapis.com/ingress": "all" if i % 2 else "internal"}}}},
+        "status": {{"url": f"https://svc-{{i}}.a.run.app", "latestCreatedRevisionName": f"svc-{{i}}-00001"}},
+    }} for i in range(n)]))
+elif args.startswith("pubsub"):
+    print(json.dumps([{{"name": f"projects/{PROJECT_ID}/topics/topic-{{i}}"}} for i in range(n)]))
+elif args.startswith("compute firewall-rules"):
+    print(json.dumps([{{
+        "name": f"allow-{{i}}", "network": f"projects/{PROJECT_ID}/global/networks/default", "direction": "INGRESS",
+        "priority": 1000, "disabled": False, "sourceRanges": ["0.0.0.0/0" if i % 5 == 0 else "10.0.0.0/8"],
+        "allowed": [{{"IPProtocol": "tcp", "ports": ["22", "443"]}}] if i % 10 else [{{"IPProtocol": "all"}}],
+        "targetTags": [f"tier-{{i % 3}}"], "selfLink": f"https://compute.googleapis.com/compute/v1/projects/{PROJECT_ID}/global/firewalls/allow-{{i}}",
+    }} for i in range(n)]))
+elif args.startswith("container clusters"):
+    # Real cluster descriptions are large; only a handful of fields end up in the summary
+    print(json.dumps([{{
+        "name": f"gke-{{i}}", "location": "us-central1", "currentMasterVersion": "1.30.5-gke.1014001",
+        "privateClusterConfig": {{"enablePrivateNodes": bool(i % 2)}}, "legacyAbac": {{"enabled": i % 9 == 0}},
+        "workloadIdentityConfig": {{"workloadPool": f"{PROJECT_ID}.svc.id.goog"}} if i % 3 else {{}},
+        "nodeConfig": {{"serviceAccount": f"sa-{{i % 7}}@{PROJECT_ID}.iam.gserviceaccount.com", "oauthScopes": ["https://www.googleapis.com/auth/cloud-platform"]}},
+        "nodePools": [{{"name": f"pool-{{p}}", "config": {{"machineType": "e2-standard-4", "diskSizeGb": 100,
+                        "metadata": {{"disable-legacy-endpoints": "true"}}, "labels": {{f"label-{{k}}": "x" * 32 for k in range(20)}}}},
+                        "instanceGroupUrls": [f"https://compute.googleapis.com/zones/us-central1-a/instanceGroupManagers/gke-{{i}}-pool-{{p}}-{{z}}" for z in range(3)]}}
+                      for p in range(4)],
+    }} for i in range(n)]))
+elif args.startswith("sql instances"):
+    print(json.dumps([{{
+        "name": f"sql-{{i}}", "databaseVersion": "POSTGRES_15", "region": "us-central1",
+        "settings": {{"ipConfiguration": {{"ipv4Enabled": i % 2 == 0, "requireSsl": i % 4 == 0,
+                      "authorizedNetworks": [{{"value": "0.0.0.0/0" if i % 6 == 0 else "203.0.113.0/24"}}]}},
+                     "backupConfiguration": {{"enabled": True}}}},
+    }} for i in range(n)]))
+elif args.startswith("secrets"):
+    print(json.dumps([{{
+        "name": f"projects/{PROJECT_ID}/secrets/secret-{{i}}", "replication": {{"automatic": {{}}}},
+        **({{"rotation": {{"rotationPeriod": "7776000s", "nextRotationTime": "2030-01-01T00:00:00Z"}}}} if i % 2 else {{}}),
+    }} for i in range(n)]))
+elif args.startswith("projects get-iam-policy"):
+    print(json.dumps({{"bindings": [
+        {{"role": "roles/owner", "members": ["user:admin@example.com"]}},
+        {{"role": "roles/editor", "members": [f"serviceAccount:sa-{{i}}@{PROJECT_ID}.iam.gserviceaccount.com" for i in range(7)]}},
+    ]}}))
+else:
+    sys.exit(1)
+'''
+
+FAKE_BQ = '''#!{python}
+import json, os, sys, time
+time.sleep(float(os.environ.get("BENCH_GCLOUD_LATENCY", "0.05")))
+args = sys.argv[1:]
+if "--dataset_id" in args:
+    dataset = args[args.index("--dataset_id") + 1]
+    limits = [int(a.split("=", 1)[1]) for a in args if a.startswith("--max_results=")]
+    count = min(int(os.environ["BENCH_TABLES"]), limits[0] if limits else 50)
+    print(json.dumps([{{"tableReference": {{"tableId": f"{{dataset}}_t{{i:05d}}"}}}} for i in range(count)]))
+else:
+    print(json.dumps([{{"datasetReference": {{"datasetId": f"dataset_{{i}}"}}}} for i in range(int(os.environ["BENCH_DATASETS"]))]))
+'''
+
+
+# ----------------------------------------
+# 🏗️ Fixtures
+# ----------------------------------------
+
+def write_fake_cli(bin_dir):
+    os.makedirs(bin_dir, exist_ok=True)
+    for name, template in (("gcloud", FAKE_GCLOUD), ("bq", FAKE_BQ)):
+        path = os.path.join(bin_dir, name)
+        with open(path, "w") as f:
+            f.write(template.format(python=sys.executable, PROJECT_ID=PROJECT_ID))
+        os.chmod(path, 0o755)
+
+
+def write_fixtures(workdir, params):
+    """Generate the inputs for one size; returns their paths."""
+    sys.path.insert(0, BENCH_DIR)
+    from bench_drawio_reader import write_diagram
+    from bench_image_pipeline import draw_diagram
+    from bench_pdf_reader import generate_pdf
+
+    write_fake_cli(os.path.join(workdir, "bin"))
+    paths = {
+        "pdf": os.path.join(workdir, "architecture.pdf"),
+        "image": os.path.join(workdir, "diagram.png"),
+        "drawio": os.path.join(workdir, "diagram.drawio"),
+    }
+    generate_pdf(paths["pdf"], params["pdf_pages"])
+    width, height = params["image"]
+    draw_diagram(width, height).save(paths["image"], "PNG")
+    write_diagram(paths["drawio"], params["drawio_cells"])
+    return paths
+
+
+# ----------------------------------------
+# 🤖 Stub LLM
+# ----------------------------------------
+
+TOOL_PATTERN = re.compile(r"Tool Name: ([^\n]+)")
+SUMMARY_HEADING = "GCP Metadata Summary"
+TOOL_ARGUMENTS = {
+    "GCP Metadata Extractor": lambda text: {"project_id": PROJECT_ID},
+    "Cloud Architecture PDF Interpreter": lambda text: {"file_path": re.search(r"PDF file_path: (\S+)", text).group(1)},
+    "GCP Architecture Diagram Interpreter": lambda text: {"image_path": re.search(r"Diagram path: (\S+)", text).group(1)},
+    "Draw.io Architecture Diagram Interpreter": lambda text: {"file_path": re.search(r"Diagram path: (\S+)", text).group(1)},
+    # Structured payloads, as a model emits them; the tools' args_schema passes them through
+    "STRIDE Threat Model Generator": lambda text: {
+        "summarized_input": {"gcp_metadata": task_summary(text), "architecture_summary": ""}
+    },
+    "Threat Model CSV Exporter": lambda text: {"risks_json": context_threats(text)},
+}
+
+
+def task_summary(text):
+    """The GCP summary JSON embedded in a STRIDE task description ({} if there is none)."""
+    position = text.rfind(SUMMARY_HEADING)
+    position = text.find("{", position) if position >= 0 else -1
+    if position < 0:
+        return {}
+    try:
+        return json.JSONDecoder().raw_decode(text, position)[0]
+    except json.JSONDecodeError:
+        return {}
+
+
+def summary_threats(summary):
+    """Three threats per resource; the last two differ only in wording, so the exporter's dedup has work to do."""
+    threats = []
+    for category, records in summary.items():
+        for record in records if isinstance(records, list) else []:
+            name = str(record.get("name") or record.get("datasetId") or record.get("tableId") or "").rsplit("/", 1)[-1]
+            if not name:
+                continue
+            asset = f"{category}: {name}"
+            threats.append({"threat": f"Attacker impersonates a caller of {name}", "asset": asset, "category": "Spoofing",
+                            "likelihood": "Medium", "impact": "Moderate", "mitigation": "Require authenticated callers"})
+            for wording in ("Sensitive data in {0} is exposed to unauthorized users",
+                            "Sensitive data in {0} exposed to unauthorized users"):
+                threats.append({"threat": wording.format(name), "asset": asset, "category": "Information Disclosure",
+                                "likelihood": "Low", "impact": "Severe", "mitigation": "Restrict IAM access to least privilege"})
+    return threats
+
+
+def context_threats(text):
+    """Every threat list the STRIDE tasks returned, as found in the export task's context."""
+    decoder, threats, position = json.JSONDecoder(), [], 0
+    while True:
+        position = text.find('[{"threat"', position)
+        if position < 0:
+            return threats
+        try:
+            items, position = decoder.raw_decode(text, position)
+            threats.extend(items)
+        except json.JSONDecodeError:
+            position += 1
+
+
+def make_stub_llm():
+    from crewai.llms.base_llm import BaseLLM
+
+    class StubLLM(BaseLLM):
+        """Deterministic ReAct responses: call the agent's tool once, then give a final answer."""
+
+        def __init__(self):
+            super().__init__(model="bench-stub")
+
+        def call(self, messages, tools=None, callbacks=None, available_functions=None):
+            if isinstance(messages, str):
+                messages = [{"role": "user", "content": messages}]
+            text = "\n".join(str(m.get("content", "")) for m in messages)
+            # crewai appends each tool result to the conversation as an assistant "Observation:" message
+            observed = messages[-1].get("role") == "assistant"
+            tool = next((name.strip() for name in TOOL_PATTERN.findall(text) if name.strip() in TOOL_ARGUMENTS), None)
+            if tool and not observed:
+                arguments = TOOL_ARGUMENTS[tool](text)
+                return f"Thought: I should use the tool.\nAction: {tool}\nAction Input: {json.dumps(arguments)}"
+            if tool == "Threat Model CSV Exporter":
+                # The export task's expected output is the exporter's JSON receipt
+                answer = messages[-1]["content"].rsplit("Observation:", 1)[-1].strip()
+            elif SUMMARY_HEADING in text:
+                answer = json.dumps(summary_threats(task_summary(text)))
+            else:
+                answer = "Components, data flows and trust boundaries as reported by the tool."
+            return f"Thought: I now know the final answer\nFinal Answer: {answer}"
+
+        def supports_stop_words(self):
+            return True
+
+        def supports_function_calling(self):
+            return False
+
+        def get_context_window_size(self):
+            return 1_000_000
+
+    return StubLLM()
+
+
+# ----------------------------------------
+# ⏱️ One size (runs in its own interpreter)
+# ----------------------------------------
+
+def run_worker(size):
+    workdir = tempfile.mkdtemp(prefix=f"bench_e2e_{size}_")
+    try:
+        return measure(size, workdir)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def measure(size, workdir):
+    params = SIZES[size]
+    paths = write_fixtures(workdir, params)
+    os.environ.update({
+        "PATH": os.path.join(workdir, "bin") + os.pathsep + os.environ.get("PATH", ""),
+        "BENCH_RESOURCES": str(params["resources"]),
+        "BENCH_DATASETS": str(params["datasets"]),
+        "BENCH_TABLES": str(params["tables"]),
+        "PROJECT_ID": PROJECT_ID,
+        "DRAWIO_PATH": paths["drawio"],
+        "LLM_CACHE": "off",
+        "TRACE": "on",
+        "CREWAI_DISABLE_TELEMETRY": "true",
+        "OTEL_SDK_DISABLED": "true",
+    })
+    os.chdir(workdir)  # metadata and artifact caches start cold in the scratch directory
+
+    from threat_modeling.crew import ThreatModelingCrew
+    from threat_modeling.instrumentation import _peak_rss_bytes, get_tracer
+    from threat_modeling.resource_types import listed_types
+    from threat_modeling.tools.gcp_metadata import GCPMetadataCollector
+    from threat_modeling.token_budget import get_token_ledger
+
+    crew = ThreatModelingCrew(
+        project_id=PROJECT_ID,
+        output_dir=os.path.join(workdir, "output"),
+        pdf_path=paths["pdf"],
+        diagram_path=paths["image"],
+    )
+    crew.llm = make_stub_llm()
+    # Collected before the crew is built, as `run` does; the STRIDE tasks are built from this summary
+    started = time.perf_counter()
+    gcp_summary = json.loads(GCPMetadataCollector(drawio_path=crew.drawio_path).collect(PROJECT_ID))
+    collect = time.perf_counter() - started
+    inputs = {"project_id": PROJECT_ID, "pdf_path": paths["pdf"], "diagram_path": paths["image"],
+              "gcp_metadata": "", "architecture_summary": "", "diagram_insights": "", "component_list": "", "threat_list": ""}
+    started = time.perf_counter()
+    output = crew.crew().kickoff(inputs=inputs)
+    total = time.perf_counter() - started
+    try:
+        # The export task's output is the exporter's JSON summary
+        model_rows = json.loads(output.raw).get("model_rows", 0)
+    except (ValueError, AttributeError):
+        model_rows = 0
+
+    timings = crew.phase_timings()
+    summary = get_tracer().summary()
+    tools = {t["name"]: t["wall_seconds"] for t in summary["by_name"] if t["category"] == "tool"}
+    subprocess_seconds = sum(t["wall_seconds"] for t in summary["by_name"] if t["category"] == "subprocess")
+    subprocesses = sum(t["count"] for t in summary["by_name"] if t["category"] == "subprocess")
+    tokens = get_token_ledger().report()
+    with open(os.path.join(workdir, "output", "threat_model.csv")) as f:
+        rows = sum(1 for _ in f) - 1
+    # Every list-shaped type in config/resource_types.yaml, as the fake CLIs answered it
+    resources = sum(len(gcp_summary.get(t.category) or []) for t in listed_types())
+    throughput = {
+        # The crew's own metadata call is a cache hit; collection throughput comes from the cold call
+        "resources_per_s": resources / collect if collect else None,
+        "pdf_pages_per_s": params["pdf_pages"] / tools["Cloud Architecture PDF Interpreter"]
+        if tools.get("Cloud Architecture PDF Interpreter") else None,
+        "threat_rows_per_s": rows / tools["Threat Model CSV Exporter"] if tools.get("Threat Model CSV Exporter") else None,
+    }
+    return {
+        "size": size,
+        "params": params,
+        "total_seconds": round(total, 3),
+        "phases": {"collect": round(collect, 3), **timings["phases"]},
+        "tools": tools,
+        "subprocess_seconds": round(subprocess_seconds, 3),
+        "subprocesses": subprocesses,
+        "rows": rows,
+        "model_rows": model_rows,
+        "payload_tokens": tokens["total_tokens"],
+        "tokenizer": tokens["tokenizer"],
+        "throughput": {k: round(v, 1) for k, v in throughput.items() if v is not None},
+        "peak_rss_mb": round((_peak_rss_bytes() or 0) / 1024 / 1024, 1),
+    }
+
+
+def run_size(size):
+    completed = subprocess.run(
+        [sys.executable, os.path.abspath(__file__), "--worker", size], capture_output=True, text=True
+    )
+    for line in completed.stdout.splitlines():
+        if line.startswith(RESULT_MARKER):
+            return json.loads(line[len(RESULT_MARKER):])
+    sys.stderr.write(completed.stdout[-4000:] + completed.stderr[-4000:])
+    raise RuntimeError(f"Benchmark worker for '{size}' failed with exit code {completed.returncode}")
+
+
+# ----------------------------------------
+# 📊 Report and baseline comparison
+# ----------------------------------------
+
+# Deterministic for a given code version; any change means the pipeline now does different work
+COUNT_METRICS = ("rows", "model_rows", "subprocesses")
+
+
+def timing_shares(result):
+    """Each phase's and tool's seconds as a fraction of the run's total, which carries across machines."""
+    total = result["total_seconds"] or 1.0
+    metrics = {f"phase.{name}": seconds for name, seconds in result["phases"].items()}
+    metrics.update({f"tool.{name}": seconds for name, seconds in result["tools"].items()})
+    return {metric: seconds / total for metric, seconds in metrics.items()}
+
+
+def compare(results, baseline):
+    regressions = []
+    for size, result in results.items():
+        previous = baseline.get(size)
+        if not previous:
+            print(f"[INFO] No baseline for '{size}'")
+            continue
+        for metric in COUNT_METRICS:
+            if metric in previous and result[metric] != previous[metric]:
+                regressions.append(f"{size} {metric}: {previous[metric]} -> {result[metric]}")
+        if previous.get("tokenizer") == result["tokenizer"] and "payload_tokens" in previous:
+            if result["payload_tokens"] > previous["payload_tokens"] * (1 + TOLERANCE):
+                regressions.append(f"{size} payload tokens: {previous['payload_tokens']} -> {result['payload_tokens']}")
+        before, after = timing_shares(previous), timing_shares(result)
+        for metric, share in after.items():
+            reference = before.get(metric)
+            if reference is None:
+                continue
+            change = (share - reference) / reference if reference else 0.0
+            if change > TOLERANCE and (share - reference) * result["total_seconds"] >= MIN_REGRESSION_SECONDS:
+                regressions.append(f"{size} {metric}: {reference:.1%} -> {share:.1%} of total time (+{change:.0%})")
+        if result["peak_rss_mb"] > previous["peak_rss_mb"] * (1 + TOLERANCE):
+            regressions.append(f"{size} peak RSS: {previous['peak_rss_mb']} MB -> {result['peak_rss_mb']} MB")
+    return regressions
+
+
+def print_report(results):
+    print(f"\n{'size':<8} {'total s':>8} {'collect s':>10} {'extract s':>10} {'merge s':>8} {'stride s':>9} {'export s':>9} "
+          f"{'gcloud Σs':>9} {'rows':>7} {'model':>7} {'RSS MB':>7}")
+    for size, r in results.items():
+        phases = r["phases"]
+        print(
+            f"{size:<8} {r['total_seconds']:>8.2f} {phases['collect']:>10.2f} {phases.get('extraction', 0):>10.2f} {phases.get('merge', 0):>8.2f} "
+            f"{phases.get('stride', 0):>9.2f} {phases.get('export', 0):>9.2f} {r['subprocess_seconds']:>9.2f} "
+            f"{r['rows']:>7} {r['model_rows']:>7} {r['peak_rss_mb']:>7.1f}"
+        )
+    for size, r in results.items():
+        tools = ", ".join(f"{name} {seconds:.3f}s" for name, seconds in r["tools"].items())
+        rates = ", ".join(f"{name} {value:,.0f}" for name, value in r["throughput"].items())
+        print(f"{size}: {tools}\n{' ' * len(size)}  {rates}")
+
+
+def main(argv):
+    if argv[:1] == ["--worker"]:
+        print(RESULT_MARKER + json.dumps(run_worker(argv[1])))
+        return 0
+    save = "--save-baseline" in argv
+    baseline_path = argv[argv.index("--baseline") + 1] if "--baseline" in argv else BASELINE_PATH
+    sizes = [a for a in argv if a in SIZES] or ["small", "medium"]
+
+    results = {}
+    for size in sizes:
+        print(f"[INFO] Running '{size}': {SIZES[size]}")
+        results[size] = run_size(size)
+    print_report(results)
+
+    baseline = {}
+    if os.path.exists(baseline_path):
+        with open(baseline_path) as f:
+            baseline = json.load(f)
+    if save:
+        os.makedirs(os.path.dirname(baseline_path), exist_ok=True)
+        with open(baseline_path, "w") as f:
+            json.dump({**baseline, **results}, f, indent=2)
+        print(f"[INFO] Baseline written to {baseline_path}")
+        return 0
+    if not baseline:
+        print(f"[INFO] No baseline at {baseline_path}; record one with --save-baseline")
+        return 0
+    regressions = compare(results, baseline)
+    for regression in regressions:
+        print(f"[ERROR] Regression: {regression}")
+    print(f"[INFO] {len(regressions)} regressions against {baseline_path} (tolerance {TOLERANCE:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,57 @@
+"""
+Benchmark the trust-boundary and data-flow graph on synthetic GCP summaries.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_flow_graph.py [resources ...]
+
+Each size is the total number of resources, spread across VMs, functions, Cloud Run
+services and Pub/Sub topics; every function is triggered by a topic.
+"""
+import sys
+import time
+
+from threat_modeling.flow_graph import analyze, build_graph
+
+
+def synthetic_summary(total):
+    per_type = max(1, total // 4)
+    accounts = max(1, per_type // 20)
+    return {
+        "compute_instances": [
+            {"name": f"vm-{i}", "publicIP": i % 3 == 0, "serviceAccounts": [f"sa-{i % accounts}@p.iam.gserviceaccount.com"]}
+            for i in range(per_type)
+        ],
+        "cloud_functions": [
+            {
+                "name": f"projects/p/locations/us-central1/functions/fn-{i}",
+                "httpsTrigger": {"url": f"https://fn-{i}"} if i % 2 else None,
+                "eventTrigger": None if i % 2 else {"resource": f"projects/p/topics/topic-{i}"},
+                "serviceAccountEmail": f"sa-{i % accounts}@p.iam.gserviceaccount.com",
+            }
+            for i in range(per_type)
+        ],
+        "cloud_run_services": [
+            {"name": f"svc-{i}", "url": f"https://svc-{i}.run.app", "ingress": "all" if i % 2 else "internal"}
+            for i in range(per_type)
+        ],
+        "pubsub_topics": [{"name": f"projects/p/topics/topic-{i}"} for i in range(per_type)],
+    }
+
+
+def main(sizes):
+    print(f"{'resources':>10} {'nodes':>8} {'edges':>8} {'build s':>9} {'analyze s':>10} {'resources/s':>12}")
+    for size in sizes:
+        summary = synthetic_summary(size)
+        started = time.perf_counter()
+        graph = build_graph(summary)
+        built = time.perf_counter()
+        analyze(graph)
+        finished = time.perf_counter()
+        print(
+            f"{size:>10} {len(graph.nodes):>8} {graph.edge_count:>8} {built - started:>9.4f} "
+            f"{finished - built:>10.4f} {size / (finished - started):>12,.0f}"
+        )
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 50_000, 100_000])
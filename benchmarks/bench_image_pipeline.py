@@ -0,0 +1,84 @@
+"""
+Benchmark ImageDiagramTool's image pipeline on a corpus of synthetic diagrams.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_image_pipeline.py
+
+For each diagram, compares the old path (decode and re-encode as PNG) with
+prepare_image (passthrough, downscale + cheapest encoding, tiling): base64
+payload size (overview plus tiles) and latency. Note that for very large diagrams
+the legacy payload is downsampled again by the vision model, so small labels are
+lost; the tiled payload is larger but keeps them at full resolution.
+"""
+import base64
+import io
+import os
+import random
+import tempfile
+import time
+
+from PIL import Image, ImageDraw
+
+from threat_modeling.tools.image_diagram_tool import prepare_image
+
+SERVICES = ["Cloud Run", "Pub/Sub", "GCS", "BigQuery", "Cloud SQL", "GKE", "Load Balancer", "Cloud Armor"]
+
+
+def draw_diagram(width, height, mode="RGB", noise=False, seed=0):
+    rng = random.Random(seed)
+    image = Image.new(mode, (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    if noise:
+        # Screenshot/photo-like background that PNG compresses badly
+        for _ in range(width * height // 400):
+            x, y = rng.randrange(width), rng.randrange(height)
+            draw.rectangle((x, y, x + 12, y + 12), fill=(rng.randrange(200, 256), rng.randrange(200, 256), rng.randrange(200, 256)))
+    box_w, box_h = 220, 90
+    boxes = []
+    for y in range(60, height - box_h, box_h * 3):
+        for x in range(60, width - box_w, box_w * 2):
+            draw.rectangle((x, y, x + box_w, y + box_h), outline="black", width=3, fill=(232, 240, 254))
+            draw.text((x + 12, y + 35), f"{rng.choice(SERVICES)} {len(boxes)}", fill="black")
+            boxes.append((x, y))
+    for (x1, y1), (x2, y2) in zip(boxes, boxes[1:]):
+        draw.line((x1 + box_w, y1 + box_h // 2, x2, y2 + box_h // 2), fill="gray", width=2)
+    return image
+
+
+CORPUS = [
+    ("small.png", dict(width=1200, height=800), "PNG"),
+    ("screenshot.png", dict(width=3200, height=2000, noise=True), "PNG"),
+    ("photo.jpg", dict(width=2400, height=1600, noise=True), "JPEG"),
+    ("transparent.png", dict(width=5000, height=3000, mode="RGBA"), "PNG"),
+    ("huge.png", dict(width=9000, height=6000), "PNG"),
+]
+
+
+def legacy(path):
+    image = Image.open(path)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return len(base64.b64encode(buffer.getvalue())), 0, "png"
+
+
+def pipeline(path):
+    prepared = prepare_image(path)
+    payload = len(prepared["image_base64"]) + sum(len(tile["image_base64"]) for tile in prepared["tiles"])
+    return payload, len(prepared["tiles"]), f"{prepared['encoding']} {prepared['media_type']}"
+
+
+def main():
+    print(f"{'diagram':<16} {'mode':<8} {'seconds':>8} {'payload':>12} {'tiles':>6}  encoding")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, spec, image_format in CORPUS:
+            path = os.path.join(tmp, name)
+            draw_diagram(**spec).save(path, format=image_format)
+            for label, function in (("legacy", legacy), ("pipeline", pipeline)):
+                started = time.perf_counter()
+                payload, tiles, encoding = function(path)
+                elapsed = time.perf_counter() - started
+                print(f"{name:<16} {label:<8} {elapsed:>8.3f} {payload:>12,} {tiles:>6}  {encoding}")
+
+
+if __name__ == "__main__":
+    main()
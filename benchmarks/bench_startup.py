@@ -0,0 +1,66 @@
+"""
+Benchmark CLI startup time and guard against import-time regressions.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_startup.py [runs]
+
+Each case runs in a fresh interpreter. The CLI cases (`--help` and a run that fails
+input validation) must finish within STARTUP_TARGET_SECONDS (default 1.0) and must not
+import any of the heavy modules below; the script exits non-zero otherwise.
+`import threat_modeling.crew` is reported for comparison only.
+"""
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+TARGET_SECONDS = float(os.environ.get("STARTUP_TARGET_SECONDS", "1.0"))
+HEAVY_MODULES = ("crewai", "langfuse", "litellm", "fitz", "PIL", "pyarrow")
+
+CASES = [
+    ("main --help", ["-m", "threat_modeling.main", "--help"], True),
+    ("run (no inputs)", ["-m", "threat_modeling.main", "run"], True),
+    ("import crew", ["-c", "import threat_modeling.crew"], False),
+]
+LOADED_CHECK = (
+    "import sys, threat_modeling.main; "
+    f"print('loaded:' + ','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+)
+
+
+def time_command(args, runs):
+    env = {**os.environ, "PROJECT_ID": "", "PDF_PATH": "", "DIAGRAM_PATH": ""}
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, *args], env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - started)
+    return timings
+
+
+def main(runs):
+    failures = []
+    print(f"{'case':<18} {'min s':>8} {'median s':>9} {'target s':>9}")
+    for label, args, gated in CASES:
+        timings = time_command(args, runs)
+        median = statistics.median(timings)
+        target = f"{TARGET_SECONDS:.2f}" if gated else "-"
+        print(f"{label:<18} {min(timings):>8.3f} {median:>9.3f} {target:>9}")
+        if gated and median > TARGET_SECONDS:
+            failures.append(f"{label}: median {median:.3f}s exceeds {TARGET_SECONDS:.2f}s")
+
+    output = subprocess.run([sys.executable, "-c", LOADED_CHECK], capture_output=True, text=True, check=True).stdout
+    line = next((l for l in output.splitlines() if l.startswith("loaded:")), "loaded:")
+    loaded = [m for m in line[len("loaded:"):].split(",") if m]
+    print(f"heavy modules loaded by 'import threat_modeling.main': {', '.join(loaded) or 'none'}")
+    if loaded:
+        failures.append(f"threat_modeling.main imports {', '.join(loaded)} at startup")
+
+    for failure in failures:
+        print(f"[ERROR] {failure}")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5))
@@ -0,0 +1,72 @@
+"""
+Benchmark the rule-based STRIDE pre-pass on synthetic GCP summaries.
+
+Usage:
+    PYTHONPATH=src python benchmarks/bench_stride_rules.py [resources ...]
+
+Each size is the total number of resources, spread across all summary categories.
+"""
+import sys
+import time
+
+from threat_modeling.stride_rules import StrideRuleEngine
+
+
+def synthetic_summary(total):
+    per_type = max(1, total // 6)
+    return {
+        "compute_instances": [
+            {
+                "name": f"vm-{i}",
+                "zone": "us-central1-a",
+                "machineType": "e2-medium",
+                "publicIP": i % 3 == 0,
+                "serviceAccounts": [f"{i}-compute@developer.gserviceaccount.com" if i % 2 else f"app-{i}@p.iam.gserviceaccount.com"],
+            }
+            for i in range(per_type)
+        ],
+        "storage_buckets": [
+            {
+                "name": f"bucket-{i}",
+                "location": "US",
+                "storageClass": "STANDARD",
+                "iamConfiguration": {
+                    "uniformBucketLevelAccess": {"enabled": i % 2 == 0},
+                    "publicAccessPrevention": "enforced" if i % 4 == 0 else "inherited",
+                },
+            }
+            for i in range(per_type)
+        ],
+        "cloud_functions": [
+            {
+                "name": f"projects/p/locations/us-central1/functions/fn-{i}",
+                "entryPoint": "main",
+                "runtime": "python311",
+                "httpsTrigger": {"url": f"https://fn-{i}"} if i % 2 else None,
+                "eventTrigger": None if i % 2 else {"resource": f"projects/p/topics/topic-{i}"},
+            }
+            for i in range(per_type)
+        ],
+        "cloud_run_services": [
+            {"name": f"svc-{i}", "url": f"https://svc-{i}.run.app", "latestCreatedRevisionName": f"svc-{i}-001"}
+            for i in range(per_type)
+        ],
+        "pubsub_topics": [{"name": f"projects/p/topics/topic-{i}"} for i in range(per_type)],
+        "bigquery_datasets": [{"datasetId": f"ds_{i}", "tables": [f"t{j}" for j in range(5)]} for i in range(per_type)],
+        "iam_policy": {"bindings_count": 4, "roles": ["roles/owner", "roles/editor", "roles/viewer", "roles/iam.serviceAccountUser"]},
+    }
+
+
+def main(sizes):
+    engine = StrideRuleEngine.from_file()
+    print(f"{'resources':>10} {'findings':>10} {'seconds':>10} {'resources/s':>14}")
+    for size in sizes:
+        summary = synthetic_summary(size)
+        started = time.perf_counter()
+        findings = engine.evaluate(summary)
+        elapsed = time.perf_counter() - started
+        print(f"{size:>10} {len(findings):>10} {elapsed:>10.4f} {size / elapsed:>14,.0f}")
+
+
+if __name__ == "__main__":
+    main([int(a) for a in sys.argv[1:]] or [1_000, 10_000, 50_000, 100_000])
@@ -0,0 +1,167 @@
+import json
+import os
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from threat_modeling.flow_graph import drawio_input
+from threat_modeling.incremental import can_skip_modeling, diff_path
+from threat_modeling.tools.gcp_collector import run_command, set_process_limit
+from threat_modeling.tools.gcp_metadata import GCPMetadataCollector
+from threat_modeling.tools.metadata_cache import CACHE_DIR, atomic_write_bytes
+
+BATCH_INDEX_FILE = "batch_index.json"
+
+
+# ----------------------------------------
+# 📋 Project discovery
+# ----------------------------------------
+
+def list_projects_under(parent_type, parent_id):
+    """List ACTIVE project IDs directly under a folder or organization."""
+    command = [
+        "gcloud", "projects", "list",
+        f"--filter=parent.type={parent_type} AND parent.id={parent_id} AND lifecycleState=ACTIVE",
+        "--format=json",
+    ]
+    result = run_command(command)
+    return [p["projectId"] for p in json.loads(result.stdout or "[]") if p.get("projectId")]
+
+
+def resolve_project_ids(project_ids=None, projects_file=None, folder_id=None, organization_id=None):
+    """
+    Collect project IDs from a comma-separated list, a file (one ID per line,
+    '#' comments allowed) and/or a folder/organization listing.
+    Order is preserved and duplicates are dropped.
+    """
+    resolved = []
+    if project_ids:
+        resolved += [p.strip() for p in project_ids.split(",")]
+    if projects_file:
+        with open(projects_file, "r") as f:
+            resolved += [line.split("#", 1)[0].strip() for line in f]
+    if folder_id:
+        resolved += list_projects_under("folder", folder_id)
+    if organization_id:
+        resolved += list_projects_under("organization", organization_id)
+    return list(dict.fromkeys(p for p in resolved if p))
+
+
+# ----------------------------------------
+# 🏭 Batch execution
+# ----------------------------------------
+
+def _extract(project_id, drawio_path=None):
+    started = time.perf_counter()
+    output = GCPMetadataCollector(drawio_path=drawio_path).collect(project_id)
+    if isinstance(output, str) and output.startswith("[ERROR]"):
+        raise ValueError(output)
+    return time.perf_counter() - started
+
+
+def _model(project_id, project_dir, pdf_path, diagram_path, incremental):
+    # Imported here so extraction-only batches never pay for crewai/langfuse
+    from threat_modeling.crew import ThreatModelingCrew
+    from threat_modeling.main import build_inputs
+
+    started = time.perf_counter()
+    inputs = build_inputs(project_id, pdf_path, diagram_path)
+    crew = ThreatModelingCrew(
+        project_id=project_id,
+        output_dir=project_dir,
+        incremental=incremental,
+        pdf_path=pdf_path,
+        diagram_path=diagram_path,
+    )
+    crew.crew().kickoff(inputs=inputs)
+    crew.write_phase_timings()
+    return time.perf_counter() - started
+
+
+def run_batch(
+    project_ids,
+    output_dir="output",
+    max_workers=4,
+    max_processes=None,
+    crew_workers=1,
+    pdf_path=None,
+    diagram_path=None,
+    extract_only=False,
+    incremental=False,
+):
+    """
+    Threat-model many projects in one process.
+
+    Extraction runs concurrently across projects on a pool of `max_workers`,
+    with all gcloud/bq subprocesses sharing `max_processes` slots. Modeling
+    then runs on a pool of `crew_workers`; with `incremental`, projects whose
+    inventory did not change since their last model are skipped. Each project writes to
+    `<output_dir>/<project_id>/`, and a failure in one project is recorded in
+    the index without stopping the others.
+
+    Returns the consolidated index, which is also written to
+    `<output_dir>/batch_index.json`.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    # A draw.io diagram also feeds each project's data-flow graph during extraction
+    drawio_path = drawio_input(diagram_path)
+    set_process_limit(max_processes or max_workers * 4)
+    results = {
+        project_id: {
+            "project_id": project_id,
+            "status": "pending",
+            "summary_path": os.path.join(CACHE_DIR, f"{project_id}_summary.json"),
+            "csv_path": os.path.join(output_dir, project_id, "threat_model.csv"),
+            "diff_path": diff_path(project_id),
+        }
+        for project_id in project_ids
+    }
+
+    def extract(project_id):
+        entry = results[project_id]
+        try:
+            entry["extraction_seconds"] = round(_extract(project_id, drawio_path), 3)
+            entry["status"] = "extracted"
+        except Exception as e:
+            entry.update(status="failed", stage="extraction", error=str(e), traceback=traceback.format_exc())
+            print(f"[ERROR] [batch] Extraction failed for {project_id}: {e}")
+
+    def model(project_id):
+        entry = results[project_id]
+        try:
+            if incremental and can_skip_modeling(project_id, entry["csv_path"]):
+                entry.update(status="ok", skipped="unchanged")
+                return
+            project_dir = os.path.join(output_dir, project_id)
+            os.makedirs(project_dir, exist_ok=True)
+            entry["modeling_seconds"] = round(_model(project_id, project_dir, pdf_path, diagram_path, incremental), 3)
+            entry["status"] = "ok"
+        except Exception as e:
+            entry.update(status="failed", stage="modeling", error=str(e), traceback=traceback.format_exc())
+            print(f"[ERROR] [batch] Threat modeling failed for {project_id}: {e}")
+
+    try:
+        print(f"[INFO] [batch] Extracting metadata for {len(project_ids)} projects ({max_workers} workers)")
+        with ThreadPoolExecutor(max_workers=max(1, max_workers)) as pool:
+            list(pool.map(extract, project_ids))
+
+        ready = [p for p in project_ids if results[p]["status"] == "extracted"]
+        if not extract_only and ready:
+            print(f"[INFO] [batch] Threat modeling {len(ready)} projects ({crew_workers} workers)")
+            with ThreadPoolExecutor(max_workers=max(1, crew_workers)) as pool:
+                list(pool.map(model, ready))
+    finally:
+        set_process_limit(None)
+
+    index = {
+        "generated_at": datetime.now(timezone.utc).isoformat(),
+        "total": len(project_ids),
+        "succeeded": sum(1 for r in results.values() if r["status"] in ("ok", "extracted")),
+        "failed": sum(1 for r in results.values() if r["status"] == "failed"),
+        "projects": [results[p] for p in project_ids],
+    }
+    index_path = os.path.join(output_dir, BATCH_INDEX_FILE)
+    atomic_write_bytes(index_path, json.dumps(index, indent=2).encode())
+    print(f"[INFO] [batch] Wrote results index to {index_path}")
+    return index
@@ -1,48 +1,33 @@
-from typing import List
-from pydantic import BaseModel, Field
+import json
+import os
+import threading
+from typing import List, Optional
+from pydantic import BaseModel, Field, PrivateAttr
 from pathlib import Path
 import yaml
 
 from crewai import Agent, Crew, Process, Task
 from crewai.project import CrewBase, agent, crew, task
-from crewai.tools import BaseTool  # <-- Add this import for ToolProxy
-from langfuse import Langfuse
-
-# Import your custom tools
-from threat_modeling.tools.gcp_metadata_tool import GCPMetadataTool
-from threat_modeling.tools.pdf_reader_tool import PDFReaderTool
-from threat_modeling.tools.image_diagram_tool import ImageDiagramTool
-from threat_modeling.tools.stride_threat_modeler_tool import STRIDEThreatModelerTool
-from threat_modeling.tools.csv_risk_exporter import CSVRiskExporterTool
-
-langfuse = Langfuse()
-
-# GenericToolProxy moved to module level for use in all agents
-class GenericToolProxy(BaseTool):
-    def __init__(self, wrapped_tool):
-        super().__init__(name=wrapped_tool.name, description=wrapped_tool.description)
-        self._wrapped_tool = wrapped_tool
-    def _run(self, *args, **kwargs):
-        import json
-        value = args[0] if args else (next(iter(kwargs.values()), "") if kwargs else "")
-        # If value is a dict with a single key, extract the value
-        if isinstance(value, dict) and len(value) == 1:
-            value = next(iter(value.values()))
-        # If value is a dict or list, serialize it
-        if isinstance(value, (dict, list)):
-            value = json.dumps(value)
-        # If value is not a string, convert to string
-        if not isinstance(value, str):
-            value = str(value)
-        # If value is a string that looks like JSON, but is wrapped in quotes, remove the quotes
-        value = value.strip()
-        if (value.startswith('"') and value.endswith('"')) or (value.startswith("'") and value.endswith("'")):
-            value = value[1:-1]
-        return self._wrapped_tool._run(value)
-    def __getattr__(self, attr):
-        if attr in ("_wrapped_tool", "__class__", "__dict__", "__weakref__", "__module__", "__init__", "_run", "__getattr__"):
-            return object.__getattribute__(self, attr)
-        return getattr(self._wrapped_tool, attr)
+from dotenv import load_dotenv
+
+# Custom tools are imported where they are instantiated: PyMuPDF, Pillow and
+# pyarrow are only loaded when a run actually uses the tool that needs them
+from threat_modeling.incremental import changed_summary, incremental_enabled, load_diff, summary_path
+from threat_modeling.stride_rules import compact_findings, get_default_engine
+from threat_modeling.flow_graph import analysis_for_nodes, drawio_input, load_flow_analysis, summary_node_ids
+from threat_modeling.llm_cache import build_llm
+from threat_modeling.sharding import (
+    DEFAULT_SHARD_PARALLELISM,
+    DEFAULT_SHARD_STRATEGY,
+    DEFAULT_SHARD_TOKENS,
+    shard_label,
+    shard_summary,
+)
+from threat_modeling.token_budget import STAGE_BUDGETS, count_tokens, enforce_budget
+from threat_modeling.instrumentation import span
+
+# Collect GCP metadata, read the PDF and interpret the diagram as concurrent tasks before merging them
+DEFAULT_PARALLEL_EXTRACTION = os.environ.get("PARALLEL_EXTRACTION", "true").lower() in ("1", "true", "yes")
 
 # Optional schema for validating threat output
 class ThreatEntry(BaseModel):
@@ -53,6 +38,36 @@ class ThreatEntry(BaseModel):
     impact: str
     mitigation: str
 
+# Smallest shard size tried when re-sharding a STRIDE description that exceeds its token budget
+MIN_BUDGET_SHARD_TOKENS = 250
+
+# Task that records a span (wall and CPU time, peak RSS, description and output size) per execution
+class TracedTask(Task):
+    def _execute_core(self, agent, context, tools):
+        with span("task", self.name or "task", bytes_in=len(self.description)) as current:
+            output = super()._execute_core(agent, context, tools)
+            if current is not None:
+                current.set(bytes_out=len(output.raw or ""))
+            return output
+
+# Async task that reports failures on its future; optionally bounded by a semaphore shared with other tasks
+class ShardTask(TracedTask):
+    _slots: Optional[threading.BoundedSemaphore] = PrivateAttr(default=None)
+
+    def _execute_task_async(self, agent, context, tools, future) -> None:
+        if self._slots:
+            self._slots.acquire()
+        try:
+            result = self._execute_core(agent, context, tools)
+        except Exception as e:
+            # Without this the crew would wait forever on the future
+            future.set_exception(e)
+            return
+        finally:
+            if self._slots:
+                self._slots.release()
+        future.set_result(result)
+
 # Dynamically resolve the config file paths relative to this file
 CONFIG_PATH = Path(__file__).parent / "config"
 
@@ -63,7 +78,37 @@ class ThreatModelingCrew:
     agents_config_path = str(CONFIG_PATH / "agents.yaml")
     tasks_config_path = str(CONFIG_PATH / "tasks.yaml")
 
-    def __init__(self):
+    def __init__(
+        self,
+        project_id: Optional[str] = None,
+        output_dir: Optional[str] = None,
+        incremental: Optional[bool] = None,
+        pdf_path: Optional[str] = None,
+        diagram_path: Optional[str] = None,
+    ):
+        load_dotenv()
+        # Per-instance project and output location, so several crews can run in one process
+        self.project_id = project_id or os.environ.get("PROJECT_ID")
+        self.csv_path = os.path.join(output_dir, "threat_model.csv") if output_dir else os.environ.get("CSV_PATH", "threat_model.csv")
+        self.output_dir = output_dir or "output"
+        # Extraction inputs; each configured source becomes its own concurrent task
+        self.pdf_path = pdf_path or os.environ.get("PDF_PATH")
+        self.diagram_paths = [
+            p for p in dict.fromkeys([diagram_path or os.environ.get("DIAGRAM_PATH"), os.environ.get("DRAWIO_PATH")]) if p
+        ]
+        # The first draw.io input also feeds the data-flow graph built after GCP extraction
+        self.drawio_path = drawio_input(*self.diagram_paths)
+        self.parallel_extraction = DEFAULT_PARALLEL_EXTRACTION
+        self._extraction_tasks = None
+        # Only model changed components and merge prior rows for the rest
+        self.incremental = incremental if incremental is not None else incremental_enabled()
+        # STRIDE sharding (STRIDE_SHARD_TOKENS / STRIDE_SHARD_PARALLELISM / STRIDE_SHARD_STRATEGY)
+        self.shard_tokens = DEFAULT_SHARD_TOKENS
+        self.shard_parallelism = DEFAULT_SHARD_PARALLELISM
+        self.shard_strategy = DEFAULT_SHARD_STRATEGY
+        self._stride_shards = None
+        # Shared LLM for all agents; wraps the default model with the response cache when LLM_CACHE is set
+        self.llm = build_llm()
         # Load YAML configs as dicts
         with open(self.agents_config_path, 'r') as f:
             self.agents_config = yaml.safe_load(f)
@@ -89,20 +134,34 @@ class ThreatModelingCrew:
 
     @agent
     def resource_extraction_agent(self) -> Agent:
-        cfg = self.agents_config["resource_extraction_agent"]
-        trace = langfuse.trace(name="resource-extraction", input={"task": "extract_resources"})
+        if self.extraction_tasks():
+            # The inputs were already read by the concurrent extraction tasks; this agent only merges them
+            print("[DEBUG] Creating resource_extraction_agent without tools (merging parallel extraction results)")
+            return self._build_extraction_agent([])
+        from threat_modeling.tools.drawio_reader_tool import DrawioReaderTool
+        from threat_modeling.tools.gcp_metadata_tool import GCPMetadataTool
+        from threat_modeling.tools.image_diagram_tool import ImageDiagramTool
+        from threat_modeling.tools.pdf_reader_tool import PDFReaderTool
+
         # Debug: print agent creation
-        print(f"[DEBUG] Creating resource_extraction_agent with tools: GCPMetadataTool, PDFReaderTool, ImageDiagramTool")
+        print(f"[DEBUG] Creating resource_extraction_agent with tools: GCPMetadataTool, PDFReaderTool, ImageDiagramTool, DrawioReaderTool")
+        return self._build_extraction_agent([
+            GCPMetadataTool(project_id=self.project_id, drawio_path=self.drawio_path),
+            PDFReaderTool(project_id=self.project_id, summary_terms=self._pdf_summary_terms()),
+            ImageDiagramTool(),
+            DrawioReaderTool()
+        ])
+
+    def _build_extraction_agent(self, tools) -> Agent:
+        # Not memoized: each concurrent extraction task gets its own agent instance
+        cfg = self.agents_config["resource_extraction_agent"]
         agent = Agent(
             role=cfg["role"],
             goal=cfg["goal"],
             backstory=cfg["backstory"],
             config=cfg,
-            tools=[
-                GCPMetadataTool(),
-                PDFReaderTool(),
-                ImageDiagramTool()
-            ],
+            tools=tools,
+            llm=self.llm,
             allow_delegation=False,
             verbose=True,
         )
@@ -110,16 +169,21 @@ class ThreatModelingCrew:
 
     @agent
     def threat_modeling_agent(self) -> Agent:
+        return self._build_threat_modeling_agent()
+
+    def _build_threat_modeling_agent(self) -> Agent:
+        from threat_modeling.tools.stride_threat_modeler_tool import STRIDEThreatModelerTool
+
+        # Not memoized: each concurrent STRIDE shard gets its own agent instance
         cfg = self.agents_config["threat_modeling_agent"]
-        trace = langfuse.trace(name="threat-modeling", input={"task": "stride_threat_modeling"})
         agent = Agent(
             role=cfg["role"],
             goal=cfg["goal"],
             backstory=cfg["backstory"],
             config=cfg,
-            tools=[
-                GenericToolProxy(STRIDEThreatModelerTool())
-            ],
+            # args_schema on the tool lets crewai pass structured arguments straight to _run
+            tools=[STRIDEThreatModelerTool(drawio_path=self.drawio_path)],
+            llm=self.llm,
             allow_delegation=False,
             verbose=True,
         )
@@ -127,16 +191,22 @@ class ThreatModelingCrew:
 
     @agent
     def risk_export_agent(self) -> Agent:
+        from threat_modeling.tools.csv_risk_exporter import CSVRiskExporterTool
+
         cfg = self.agents_config["risk_export_agent"]
-        trace = langfuse.trace(name="risk-export", input={"task": "export_risks"})
         agent = Agent(
             role=cfg["role"],
             goal=cfg["goal"],
             backstory=cfg["backstory"],
             config=cfg,
             tools=[
-                GenericToolProxy(CSVRiskExporterTool())
+                CSVRiskExporterTool(
+                    csv_path=self.csv_path,
+                    project_id=self.project_id,
+                    incremental=self.incremental,
+                )
             ],
+            llm=self.llm,
             allow_delegation=False,
             verbose=True,
         )
@@ -144,53 +214,193 @@ class ThreatModelingCrew:
 
     # TASKS
 
+    def extraction_tasks(self) -> List[Task]:
+        """
+        One async task per configured input (GCP project, PDF, diagrams), each with
+        a single-tool agent, so the inputs are read concurrently. Empty when parallel
+        extraction is off or there is nothing to split, in which case
+        extract_resources_task reads every input itself.
+        """
+        if self._extraction_tasks is not None:
+            return self._extraction_tasks
+        sources = self._extraction_sources()
+        self._extraction_tasks = []
+        if not self.parallel_extraction or not sources:
+            return self._extraction_tasks
+        print(f"[INFO] Extracting {len(sources)} inputs concurrently: {', '.join(source[0] for source in sources)}")
+        for name, config_key, tool, _, source in sources:
+            cfg = self.tasks_config[config_key]
+            self._extraction_tasks.append(ShardTask(
+                name=name,
+                description=cfg["description"] + "\n\n" + source,
+                expected_output=cfg["expected_output"],
+                agent=self._build_extraction_agent([tool]),
+                async_execution=True,
+            ))
+        return self._extraction_tasks
+
+    def _extraction_sources(self) -> list:
+        """(task name, config key, tool, tool arguments, source line) for each configured input."""
+        sources = []
+        if self.project_id:
+            from threat_modeling.tools.gcp_metadata_tool import GCPMetadataTool
+
+            tool = GCPMetadataTool(project_id=self.project_id, drawio_path=self.drawio_path)
+            sources.append(("collect_gcp_metadata_task", "collect_gcp_metadata_task", tool,
+                            {"project_id": self.project_id}, f"GCP project: {self.project_id}"))
+        if self.pdf_path:
+            from threat_modeling.tools.pdf_reader_tool import PDFReaderTool
+
+            tool = PDFReaderTool(project_id=self.project_id, summary_terms=self._pdf_summary_terms())
+            sources.append(("interpret_pdf_task", "interpret_pdf_task", tool,
+                            {"file_path": self.pdf_path}, f"PDF file_path: {self.pdf_path}"))
+        for index, path in enumerate(self.diagram_paths, start=1):
+            if path.endswith(".drawio"):
+                from threat_modeling.tools.drawio_reader_tool import DrawioReaderTool
+
+                tool, arguments = DrawioReaderTool(), {"file_path": path}
+            else:
+                from threat_modeling.tools.image_diagram_tool import ImageDiagramTool
+
+                tool, arguments = ImageDiagramTool(), {"image_path": path}
+            name = "interpret_diagram_task" if index == 1 else f"interpret_diagram_task_{index}"
+            sources.append((name, "interpret_diagram_task", tool, arguments, f"Diagram path: {path}"))
+        return sources
+
     @task
     def extract_resources_task(self) -> Task:
         cfg = self.tasks_config["extract_resources_task"]
         description = cfg["description"]
         # After resource extraction, summarized GCP data is cached by GCPMetadataTool
-        return Task(
+        extraction_tasks = self.extraction_tasks()
+        return TracedTask(
             description=description,
             expected_output=cfg["expected_output"],
             agent=self.resource_extraction_agent(),
+            # Waits for every concurrent extraction task and receives all of their outputs
+            context=extraction_tasks or None,
         )
 
+    def _pdf_summary_terms(self):
+        """
+        PDF ranking terms from the cached GCP summary (collected by `run` before the crew is
+        built), read once here instead of racing the GCP extraction task that rewrites it.
+        """
+        if not self.project_id:
+            return None
+        from threat_modeling.tools.pdf_index import project_query_terms
+
+        return project_query_terms(self.project_id)
+
+    def _load_stride_summary(self):
+        """Return (summary, heading) for the STRIDE stage; summary is None if extraction has not run."""
+        # Load summarized GCP data from cache (if available)
+        path = summary_path(self.project_id)
+        heading = "GCP Metadata Summary (for threat modeling, do not request full details):"
+        if not os.path.exists(path):
+            return None, heading
+        with open(path, "r") as f:
+            gcp_summary = json.load(f)
+        diff = load_diff(self.project_id) if self.incremental else None
+        if diff and diff.get("baseline") and os.path.exists(self.csv_path):
+            # Incremental run: only changed components need new threats;
+            # the exporter merges prior rows for everything else.
+            gcp_summary = changed_summary(gcp_summary, diff)
+            heading = (
+                "GCP Metadata Summary of components added or changed since the previous threat model "
+                "(only model these; threats for unchanged components are carried over):"
+            )
+        return gcp_summary, heading
+
+    def _stride_description(self, gcp_summary, heading) -> str:
+        cfg = self.tasks_config["stride_threat_modeling_task"]
+        if gcp_summary is None:
+            return cfg["description"] + "\n\n" + heading + "\n[ERROR] GCP summary not found. Run resource extraction first."
+        # The components to model come first: a description still over the stride_task budget is
+        # truncated from the end, which then only cuts into the supporting sections below
+        sections = [heading + "\n" + json.dumps(gcp_summary, separators=(",", ":"))]
+        flow_analysis = load_flow_analysis(self.project_id)
+        if flow_analysis:
+            # Only the paths, flows and shared identities touching these components
+            flow_analysis = analysis_for_nodes(flow_analysis, summary_node_ids(gcp_summary))
+            sections.append(
+                "Data-flow analysis (internet-reachable paths, flows crossing trust boundaries, "
+                "service accounts shared between components):\n"
+                + json.dumps(flow_analysis, separators=(",", ":"))
+            )
+        # Rule-based pre-pass findings are merged by the exporter; the LLM adds residual threats only
+        baseline_findings = compact_findings(get_default_engine().evaluate(gcp_summary))
+        sections.append(
+            "Baseline threats already found by the deterministic rule engine, with the assets each applies to "
+            "(included in the report automatically; do not repeat them, only add threats they miss):\n"
+            + json.dumps(baseline_findings, separators=(",", ":"))
+        )
+        return cfg["description"] + "\n\n" + "\n\n".join(sections)
+
     @task
     def stride_threat_modeling_task(self) -> Task:
         cfg = self.tasks_config["stride_threat_modeling_task"]
-        # Load summarized GCP data from cache (if available)
-        import os, json
-        CACHE_DIR = ".gcp_metadata_cache"
-        from dotenv import load_dotenv
-        load_dotenv()
-        project_id = os.environ.get("PROJECT_ID")
-        summary_path = os.path.join(CACHE_DIR, f"{project_id}_summary.json")
-        gcp_summary = ""
-        if os.path.exists(summary_path):
-            with open(summary_path, "r") as f:
-                gcp_summary = f.read()
-        else:
-            gcp_summary = "[ERROR] GCP summary not found. Run resource extraction first."
-        # Pass only the summarized GCP data as the task description
-        description = (
-            cfg["description"]
-            + "\n\nGCP Metadata Summary (for threat modeling, do not request full details):\n"
-            + gcp_summary
-        )
-        return Task(
-            description=description,
+        gcp_summary, heading = self._load_stride_summary()
+        return TracedTask(
+            description=self._stride_description(gcp_summary, heading),
             expected_output=cfg["expected_output"],
             agent=self.threat_modeling_agent(),
         )
 
+    def stride_shard_tasks(self) -> List[Task]:
+        """
+        Split the STRIDE stage into token-bounded shards that run concurrently.
+
+        Returns an empty list when the summary fits in a single shard, in which
+        case stride_threat_modeling_task is used unchanged. While any shard's
+        full description (with baseline findings and flow analysis) exceeds the
+        stride_task token budget, the summary is re-sharded at half the size.
+        """
+        if self._stride_shards is not None:
+            return self._stride_shards
+        cfg = self.tasks_config["stride_threat_modeling_task"]
+        gcp_summary, heading = self._load_stride_summary()
+        shards = shard_summary(gcp_summary, self.shard_tokens, self.shard_strategy) if gcp_summary else []
+        budget = STAGE_BUDGETS["stride_task"]
+        shard_tokens = self.shard_tokens
+        while budget and shards and shard_tokens > MIN_BUDGET_SHARD_TOKENS:
+            largest = max(count_tokens(self._stride_description(shard, heading)) for shard in shards)
+            if largest <= budget:
+                break
+            # Shrink in proportion to the overshoot (at least by half), starting from the summary's own size
+            summary_tokens = count_tokens(json.dumps(gcp_summary, separators=(",", ":")))
+            shard_tokens = max(MIN_BUDGET_SHARD_TOKENS, int(min(shard_tokens, summary_tokens) * min(0.5, budget / largest)))
+            print(
+                f"[WARN] [TokenBudget] STRIDE description of {largest} tokens exceeds the {budget}-token budget; "
+                f"re-sharding at {shard_tokens} tokens per shard"
+            )
+            shards = shard_summary(gcp_summary, shard_tokens, self.shard_strategy)
+        self._stride_shards = []
+        if len(shards) <= 1:
+            return self._stride_shards
+        print(f"[INFO] Sharding STRIDE analysis into {len(shards)} shards (parallelism {self.shard_parallelism})")
+        slots = threading.BoundedSemaphore(max(1, self.shard_parallelism))
+        for index, shard in enumerate(shards, start=1):
+            shard_heading = f"Shard {index}/{len(shards)}: {shard_label(shard)}. Only model the components in this shard.\n{heading}"
+            shard_task = ShardTask(
+                name=f"stride_threat_modeling_task_shard_{index}",
+                description=self._stride_description(shard, shard_heading),
+                expected_output=cfg["expected_output"],
+                agent=self._build_threat_modeling_agent(),
+                async_execution=True,
+            )
+            shard_task._slots = slots
+            self._stride_shards.append(shard_task)
+        return self._stride_shards
+
     @task
     def export_risks_task(self) -> Task:
         cfg = self.tasks_config["export_risks_task"]
-        return Task(
+        return TracedTask(
             description=cfg["description"],
             expected_output=cfg["expected_output"],
+            # The exporter tool streams the report to csv_path itself; the task output is only its summary
             agent=self.risk_export_agent(),
-            output_file="threat_model.csv",  # Saves final CSV to file
         )
 
     # CREW
@@ -198,17 +408,78 @@ class ThreatModelingCrew:
     @crew
     def crew(self, inputs=None) -> Crew:
         """Creates the Threat Modeling Crew"""
+        extraction_tasks = self.extraction_tasks()
+        shard_tasks = self.stride_shard_tasks()
+        stride_tasks = shard_tasks or [self.stride_threat_modeling_task()]
+        export_task = self.export_risks_task()
+        if shard_tasks:
+            # The exporter receives every shard's threats, in shard order, and deduplicates them
+            export_task.context = shard_tasks
+        tasks = [*extraction_tasks, self.extract_resources_task(), *stride_tasks, export_task]
+        for t in tasks:
+            # Log every description's size; STRIDE descriptions still over budget after sharding are truncated
+            t.description = enforce_budget("stride_task" if t in stride_tasks else "task", t.name, t.description)
         return Crew(
             agents=[
+                *(t.agent for t in extraction_tasks),
                 self.resource_extraction_agent(),
-                self.threat_modeling_agent(),
+                *(t.agent for t in shard_tasks or [stride_tasks[0]]),
                 self.risk_export_agent(),
             ],
-            tasks=[
-                self.extract_resources_task(),
-                self.stride_threat_modeling_task(),
-                self.export_risks_task(),
-            ],
+            tasks=tasks,
             process=Process.sequential,  # Executes tasks in order
             verbose=True,
         )
+
+    # TIMING
+
+    def phase_timings(self) -> dict:
+        """
+        Wall-clock seconds per pipeline phase after kickoff, from each task's start
+        and end times. Concurrent tasks overlap, so a phase takes roughly as long as
+        its slowest task; `extraction_serial_seconds` is what the phase would have
+        taken with its tasks run one after another.
+        """
+        extraction_tasks = self.extraction_tasks()
+        phases = {
+            # Without parallel extraction, extract_resources_task reads every input itself
+            "extraction": extraction_tasks or [self.extract_resources_task()],
+            "merge": [self.extract_resources_task()] if extraction_tasks else [],
+            "stride": self.stride_shard_tasks() or [self.stride_threat_modeling_task()],
+            "export": [self.export_risks_task()],
+        }
+        report = {"phases": {}, "tasks": {}}
+        for phase, tasks in phases.items():
+            finished = [t for t in tasks if t.start_time and t.end_time]
+            if not finished:
+                continue
+            for t in finished:
+                report["tasks"][t.name] = round(t.execution_duration, 3)
+            elapsed = max(t.end_time for t in finished) - min(t.start_time for t in finished)
+            report["phases"][phase] = round(elapsed.total_seconds(), 3)
+        report["extraction_serial_seconds"] = round(
+            sum(report["tasks"].get(t.name, 0) for t in phases["extraction"]), 3
+        )
+        report["total_seconds"] = round(sum(report["phases"].values()), 3)
+        return report
+
+    def estimate_tokens(self) -> None:
+        """
+        Fill the token ledger without calling the LLM: run every extraction tool
+        locally (GCP collection refreshes the cached summary the STRIDE stage
+        reads), then build the crew so each task description is measured.
+        """
+        for name, _, tool, arguments, _ in self._extraction_sources():
+            print(f"[INFO] [TokenBudget] Measuring {name}")
+            tool._run(**arguments)
+        self.crew()
+
+    def write_phase_timings(self, path: Optional[str] = None) -> dict:
+        report = self.phase_timings()
+        path = path or os.path.join(self.output_dir, "phase_timings.json")
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        phases = ", ".join(f"{phase} {seconds:.1f}s" for phase, seconds in report["phases"].items())
+        print(f"[INFO] Phase timings: {phases} (written to {path})")
+        return report
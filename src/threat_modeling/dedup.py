@@ -0,0 +1,330 @@
+import json
+import os
+import random
+import re
+import zlib
+
+from threat_modeling.incremental import IAM_CATEGORY, IDENTITY_FIELDS, short_name, summary_path
+from threat_modeling.resource_types import get_resource_types
+from threat_modeling.tools.metadata_cache import atomic_write_bytes
+
+# Jaccard similarity of threat wording (within one asset and category) at which two threats are the same
+DEFAULT_DEDUP_SIMILARITY = float(os.environ.get("DEDUP_SIMILARITY", "0.7"))
+MINHASH_BANDS = 8
+MINHASH_ROWS = 2  # per band; 16 hashes in total
+STEM_CHARS = 5  # crude stemming: 'publicly'/'public', 'accessible'/'access' share a prefix
+
+CATEGORIES = ["Spoofing", "Tampering", "Repudiation", "Information Disclosure", "Denial of Service", "Elevation of Privilege"]
+LIKELIHOODS = ["Low", "Medium", "High"]
+IMPACTS = ["Minor", "Moderate", "Severe"]
+
+# Aliases keyed by the value lowercased with everything but letters removed
+CATEGORY_ALIASES = {
+    "spoofing": "Spoofing", "s": "Spoofing", "identityspoofing": "Spoofing",
+    "tampering": "Tampering", "t": "Tampering",
+    "repudiation": "Repudiation", "r": "Repudiation", "nonrepudiation": "Repudiation",
+    "informationdisclosure": "Information Disclosure", "infodisclosure": "Information Disclosure",
+    "disclosure": "Information Disclosure", "i": "Information Disclosure", "dataexposure": "Information Disclosure",
+    "denialofservice": "Denial of Service", "dos": "Denial of Service", "ddos": "Denial of Service",
+    "d": "Denial of Service",
+    "elevationofprivilege": "Elevation of Privilege", "elevationofprivileges": "Elevation of Privilege",
+    "privilegeescalation": "Elevation of Privilege", "eop": "Elevation of Privilege", "e": "Elevation of Privilege",
+}
+LIKELIHOOD_ALIASES = {
+    "low": "Low", "l": "Low", "unlikely": "Low", "rare": "Low", "verylow": "Low",
+    "medium": "Medium", "med": "Medium", "m": "Medium", "moderate": "Medium", "possible": "Medium",
+    "high": "High", "h": "High", "likely": "High", "veryhigh": "High", "critical": "High", "almostcertain": "High",
+}
+IMPACT_ALIASES = {
+    "minor": "Minor", "low": "Minor", "l": "Minor", "negligible": "Minor", "limited": "Minor",
+    "moderate": "Moderate", "medium": "Moderate", "med": "Moderate", "m": "Moderate",
+    "severe": "Severe", "high": "Severe", "h": "Severe", "critical": "Severe", "major": "Severe",
+    "catastrophic": "Severe", "veryhigh": "Severe",
+}
+
+# Asset labels from config/resource_types.yaml, matching the rule engine's `asset` formats in config/stride_rules.yaml
+SERVICE_LABELS = {t.category: t.label for t in get_resource_types().values() if t.label}
+IAM_LABEL = SERVICE_LABELS.get(IAM_CATEGORY)
+
+
+def _alias_key(text):
+    return re.sub(r"[^a-z0-9]", "", text.lower())
+
+
+def _service_aliases():
+    """
+    Alias key -> label, from each resource type's label and `terms`. A term that another
+    type also uses (as a term or a word of its label, e.g. 'cloud') is left out as ambiguous.
+    """
+    words = {}
+    for rtype in get_resource_types().values():
+        if rtype.label:
+            for word in {_alias_key(w) for w in [*rtype.label.split(), *rtype.terms]}:
+                words[word] = words.get(word, 0) + 1
+    aliases = {}
+    for rtype in get_resource_types().values():
+        if not rtype.label:
+            continue
+        aliases[_alias_key(rtype.label)] = rtype.label
+        for term in rtype.terms:
+            if words[_alias_key(term)] == 1:
+                aliases.setdefault(_alias_key(term), rtype.label)
+    return aliases
+
+
+def _alias_pattern(alias):
+    """Regex for an alias as written in free text: any spacing around '/', optional '-', optional plural."""
+    words = [re.escape(w).replace("/", r"\s*/\s*").replace(r"\-", r"[\s\-]?") for w in alias.lower().split()]
+    return r"\s+".join(words) + ("" if alias.lower().endswith("s") else "s?")
+
+
+SERVICE_ALIASES = _service_aliases()
+# Every label and term, longest first so 'service-account' wins over 'service'
+_ALIAS_TEXTS = sorted(
+    {a.lower() for t in get_resource_types().values() if t.label for a in [t.label, *t.terms]
+     if _alias_key(a) in SERVICE_ALIASES},
+    key=len, reverse=True,
+)
+# Words naming the kind of resource after the service ('GCS bucket logs', 'Cloud Run service api')
+_KIND_WORDS = sorted({a for a in _ALIAS_TEXTS if a.isalpha()}, key=len, reverse=True)
+# A service or kind word ends at whitespace, ':' or '/', never at '-': 'db-replica' and 'vm-1' are names.
+# A kind word is only dropped when a name follows it, so 'Cloud SQL: db' keeps 'db'.
+SERVICE_ALIAS_PATTERN = re.compile(
+    r"^\s*(?:google\s+|gcp\s+)?(?:cloud\s+)?(?P<service>" + "|".join(map(_alias_pattern, _ALIAS_TEXTS)) + r")"
+    r"(?:\s*[:/–]+\s*|\s+(?:-+\s*)?|$)"
+    r"(?:(?:" + "|".join(map(re.escape, _KIND_WORDS)) + r")s?(?:\s*:\s*|\s+)(?=\S))?"
+    r"(?P<name>.*)$",
+    re.IGNORECASE,
+)
+NAME_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9_.-]*[a-z0-9]|[a-z0-9]")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "the", "and", "or", "of", "to", "in", "on", "for", "by", "with", "via", "from", "at", "is",
+    "are", "be", "can", "could", "may", "might", "due", "its", "it", "as", "that", "this", "which", "into",
+}
+
+_rng = random.Random(20240501)  # fixed seed: signatures are stable across runs
+MINHASH_MASKS = [_rng.getrandbits(32) for _ in range(MINHASH_BANDS * MINHASH_ROWS)]
+
+
+def canonical_enum(value, aliases, allowed):
+    """Map a free-form enum value to its canonical spelling; unknown values are returned trimmed."""
+    text = str(value or "").strip()
+    key = re.sub(r"[^a-z]", "", text.lower())
+    if key in aliases:
+        return aliases[key]
+    # Compound values ('Spoofing / EoP', 'High (internet-facing)'): first canonical value mentioned
+    lowered = text.lower()
+    found = [(lowered.find(v.lower()), v) for v in allowed if v.lower() in lowered]
+    return min(found)[1] if found else text
+
+
+def _service_label(text):
+    key = _alias_key(text)
+    return SERVICE_ALIASES.get(key) or (SERVICE_ALIASES.get(key[:-1]) if key.endswith("s") else None)
+
+
+# ----------------------------------------
+# 🏷️ Asset canonicalization
+# ----------------------------------------
+
+class AssetNormalizer:
+    """
+    Rewrites free-form asset strings ('Cloud Run api', 'cloud-run: API',
+    'the api service') to the '<Service>: <name>' form used by the rule engine,
+    resolving names against the resources in the GCP summary when one exists.
+    """
+
+    def __init__(self, summary=None):
+        self.names = {}  # lowercase short name -> [service label, ...]
+        self.display = {}  # lowercase short name -> name as in the summary
+        for category, records in (summary or {}).items():
+            label = SERVICE_LABELS.get(category)
+            if not label or not isinstance(records, list):
+                continue
+            for record in records:
+                name = short_name(record.get(IDENTITY_FIELDS.get(category, "name"), "") or "")
+                if name:
+                    self.names.setdefault(name.lower(), []).append(label)
+                    self.display[name.lower()] = name
+        self._cache = {}
+
+    def normalize(self, asset):
+        asset = " ".join(str(asset or "").split())
+        if asset not in self._cache:
+            self._cache[asset] = self._normalize(asset)
+        return self._cache[asset]
+
+    def _normalize(self, asset):
+        lowered = asset.lower()
+        match = SERVICE_ALIAS_PATTERN.match(asset)
+        hinted = _service_label(match.group("service").lower()) if match else None
+        if hinted == IAM_LABEL:
+            return f"{IAM_LABEL}: {match.group('name').strip()}" if match.group("name").strip() else IAM_LABEL
+
+        # Longest token naming a known resource wins; the service hint settles names used by several services
+        for token in sorted(set(NAME_TOKEN_PATTERN.findall(lowered)), key=len, reverse=True):
+            labels = self.names.get(token)
+            if not labels:
+                continue
+            label = hinted if hinted in labels else (labels[0] if len(labels) == 1 else None)
+            if label:
+                return f"{label}: {self.display[token]}"
+
+        if match and hinted:
+            name = match.group("name").strip(" :-–")
+            return f"{hinted}: {name}" if name else hinted
+        return asset
+
+
+# ----------------------------------------
+# 🧮 Near-duplicate index (MinHash + LSH)
+# ----------------------------------------
+
+def shingles(text):
+    """Stemmed content words of a threat description."""
+    words = [w[:STEM_CHARS] for w in WORD_PATTERN.findall(str(text or "").lower()) if w not in STOPWORDS]
+    return frozenset(words)
+
+
+class ThreatDeduplicator:
+    """
+    Streaming threat deduplication. Each row is canonicalized (asset, category,
+    likelihood, impact) and compared only with kept threats for the same asset
+    and category: exact wording matches are dropped directly, and near-duplicates
+    are found through MinHash LSH buckets and confirmed with exact Jaccard
+    similarity. The first occurrence of a threat is kept; later ones are recorded
+    in the report.
+    """
+
+    def __init__(self, summary=None, similarity=DEFAULT_DEDUP_SIMILARITY):
+        self.assets = AssetNormalizer(summary)
+        self.similarity = similarity
+        self._exact = {}  # ((asset, category), threat words in order) -> kept index
+        self._buckets = {}  # ((asset, category), band, band signature) -> [kept index, ...]
+        self._kept = []  # [(threat shingles, row), ...]
+        self._clusters = {}  # kept index -> [collapsed entry, ...]
+        self._word_hashes = {}  # word -> its hash under every MinHash mask
+        self._enums = {}  # (field, raw value) -> canonical value
+        self.stats = {
+            "rows_in": 0, "rows_out": 0, "exact_duplicates": 0, "near_duplicates": 0,
+            "assets_rewritten": 0, "enums_rewritten": 0,
+        }
+
+    def canonicalize(self, row):
+        row = dict(row)
+        asset = self.assets.normalize(row.get("asset", ""))
+        if asset != row.get("asset"):
+            self.stats["assets_rewritten"] += 1
+        row["asset"] = asset
+        for field, aliases, allowed in (
+            ("category", CATEGORY_ALIASES, CATEGORIES),
+            ("likelihood", LIKELIHOOD_ALIASES, LIKELIHOODS),
+            ("impact", IMPACT_ALIASES, IMPACTS),
+        ):
+            raw = row.get(field, "")
+            key = (field, raw)
+            value = self._enums.get(key)
+            if value is None:
+                value = self._enums[key] = canonical_enum(raw, aliases, allowed)
+            if value != raw:
+                self.stats["enums_rewritten"] += 1
+            row[field] = value
+        return row
+
+    def _signature(self, words):
+        if not words:
+            return None
+        hashes = []
+        for word in words:
+            masked = self._word_hashes.get(word)
+            if masked is None:
+                h = zlib.crc32(word.encode())
+                masked = self._word_hashes[word] = tuple(h ^ mask for mask in MINHASH_MASKS)
+            hashes.append(masked)
+        # Column-wise minimum: one MinHash value per mask
+        return tuple(map(min, zip(*hashes)))
+
+    def add(self, row):
+        """Return the canonical row if it is new, or None if it duplicates a kept threat."""
+        self.stats["rows_in"] += 1
+        original = row
+        row = self.canonicalize(row)
+        block = (row["asset"].lower(), row["category"].lower())
+        threat = str(row.get("threat", ""))
+        words = shingles(threat)
+        # Same words in the same order (case and punctuation aside); reordered wording is left to the near-duplicate check
+        tokens = tuple(WORD_PATTERN.findall(threat.lower()))
+        exact_key = (block, tokens) if tokens else (block, threat.strip().lower())
+        kept_index = self._exact.get(exact_key)
+        if kept_index is not None:
+            self.stats["exact_duplicates"] += 1
+            self._collapse(kept_index, original, 1.0)
+            return None
+
+        signature = self._signature(words) if self.similarity < 1 else None
+        band_keys = []
+        if signature:
+            best, best_similarity, checked = None, 0.0, set()
+            for band in range(MINHASH_BANDS):
+                key = (block, band, signature[band * MINHASH_ROWS:(band + 1) * MINHASH_ROWS])
+                band_keys.append(key)
+                for candidate in self._buckets.get(key, ()):
+                    if candidate in checked:
+                        continue
+                    checked.add(candidate)
+                    candidate_words = self._kept[candidate][0]
+                    shared = len(words & candidate_words)
+                    similarity = shared / (len(words) + len(candidate_words) - shared)
+                    if similarity > best_similarity:
+                        best, best_similarity = candidate, similarity
+            if best is not None and best_similarity >= self.similarity:
+                self.stats["near_duplicates"] += 1
+                self._collapse(best, original, best_similarity)
+                return None
+
+        index = len(self._kept)
+        self._kept.append((words, row))
+        self._exact[exact_key] = index
+        for key in band_keys:
+            self._buckets.setdefault(key, []).append(index)
+        self.stats["rows_out"] += 1
+        return row
+
+    def _collapse(self, kept_index, row, similarity):
+        self._clusters.setdefault(kept_index, []).append({
+            "threat": row.get("threat", ""),
+            "asset": row.get("asset", ""),
+            "category": row.get("category", ""),
+            "similarity": round(similarity, 3),
+        })
+
+    @property
+    def collapsed(self):
+        return self.stats["exact_duplicates"] + self.stats["near_duplicates"]
+
+    def report(self):
+        clusters = []
+        for kept_index, collapsed in self._clusters.items():
+            kept = self._kept[kept_index][1]
+            clusters.append({
+                "kept": {k: kept.get(k, "") for k in ("threat", "asset", "category")},
+                "collapsed": collapsed,
+            })
+        return {**self.stats, "similarity_threshold": self.similarity, "clusters": clusters}
+
+    def write_report(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        atomic_write_bytes(path, json.dumps(self.report(), indent=2).encode())
+        return path
+
+
+def load_summary(project_id):
+    """The project's GCP summary, used to resolve asset names; None if extraction has not run."""
+    if not project_id:
+        return None
+    try:
+        with open(summary_path(project_id), "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
@@ -0,0 +1,331 @@
+import json
+import os
+import re
+from collections import deque
+
+from threat_modeling.incremental import IDENTITY_FIELDS, short_name
+from threat_modeling.resource_types import listed_types
+from threat_modeling.tools.metadata_cache import CACHE_DIR, atomic_write_bytes
+
+INTERNET = "internet"
+PROJECT_BOUNDARY = "gcp-project"
+INTERNET_BOUNDARY = "internet"
+# Edge kinds that carry data or requests; identity edges only feed the service-account index
+FLOW_KINDS = ("ingress", "trigger", "diagram_flow")
+MAX_LISTED = int(os.environ.get("FLOW_GRAPH_MAX_LISTED", "200"))  # cap per result list in the compact output
+LISTED_KEYS = ("internet_reachable", "cross_boundary_flows", "shared_service_accounts")
+
+# Resource types with a `node_prefix` in config/resource_types.yaml become graph nodes
+NODE_PREFIXES = {t.category: t.node_prefix for t in listed_types() if t.node_prefix}
+INTERNET_LABEL_PATTERN = re.compile(r"\b(internet|users?|clients?|public|browser|mobile|partner)\b", re.IGNORECASE)
+LABEL_TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9_.-]*")
+DEFAULT_SA_SUFFIXES = ("-compute@developer.gserviceaccount.com", "@appspot.gserviceaccount.com")
+
+
+# ----------------------------------------
+# 🕸️ Component graph
+# ----------------------------------------
+
+class ComponentGraph:
+    """
+    Directed multigraph of components with adjacency indexes.
+
+    Nodes carry a kind, a label and the trust boundary they sit in. Edges carry a
+    kind: 'ingress' (internet to public endpoint), 'trigger' (event source to
+    function), 'diagram_flow' (arrow in the architecture diagram) or 'identity'
+    (resource to the service account it runs as).
+    """
+
+    def __init__(self):
+        self.nodes = {}
+        self.outgoing = {}
+        self.incoming = {}
+        self.edge_count = 0
+        self._edge_keys = set()
+
+    def add_node(self, node_id, kind, label, boundary=PROJECT_BOUNDARY):
+        if node_id not in self.nodes:
+            self.nodes[node_id] = {"kind": kind, "label": label, "boundary": boundary}
+            self.outgoing[node_id] = []
+            self.incoming[node_id] = []
+        return node_id
+
+    def add_edge(self, source, target, kind, label=""):
+        key = (source, target, kind)
+        if source == target or key in self._edge_keys or source not in self.nodes or target not in self.nodes:
+            return
+        self._edge_keys.add(key)
+        edge = {"source": source, "target": target, "kind": kind}
+        if label:
+            edge["label"] = label
+        self.outgoing[source].append(edge)
+        self.incoming[target].append(edge)
+        self.edge_count += 1
+
+    def edges(self, kinds=None):
+        for node_edges in self.outgoing.values():
+            for edge in node_edges:
+                if kinds is None or edge["kind"] in kinds:
+                    yield edge
+
+
+def _function_trigger_source(trigger):
+    """Node id of a Cloud Function's event source, if it is a topic or bucket."""
+    resource = (trigger or {}).get("resource") or (trigger or {}).get("pubsubTopic") or ""
+    event_type = (trigger or {}).get("eventType", "")
+    if "/topics/" in resource or "pubsub" in event_type:
+        return f"topic:{short_name(resource)}"
+    if "/buckets/" in resource or "storage" in event_type:
+        return f"bucket:{short_name(resource)}"
+    return None
+
+
+def add_summary(graph, summary):
+    """Add GCP resources, public endpoints, event triggers and service-account usage."""
+    summary = summary or {}
+    graph.add_node(INTERNET, "internet", "Internet", INTERNET_BOUNDARY)
+    for category, prefix in NODE_PREFIXES.items():
+        for record in summary.get(category) or []:
+            name = short_name(record.get(IDENTITY_FIELDS[category], ""))
+            if name:
+                graph.add_node(f"{prefix}:{name}", prefix, name)
+
+    def runs_as(node_id, accounts):
+        for account in accounts:
+            if account:
+                graph.add_node(f"sa:{account}", "service_account", account, PROJECT_BOUNDARY)
+                graph.add_edge(node_id, f"sa:{account}", "identity")
+
+    for vm in summary.get("compute_instances") or []:
+        node_id = f"vm:{short_name(vm.get('name', ''))}"
+        if vm.get("publicIP"):
+            graph.add_edge(INTERNET, node_id, "ingress", "external IP")
+        runs_as(node_id, vm.get("serviceAccounts") or [])
+
+    for fn in summary.get("cloud_functions") or []:
+        node_id = f"function:{short_name(fn.get('name', ''))}"
+        if fn.get("httpsTrigger") and fn.get("ingressSettings") not in ("ALLOW_INTERNAL_ONLY", "ALLOW_INTERNAL_AND_GCLB"):
+            graph.add_edge(INTERNET, node_id, "ingress", "HTTPS trigger")
+        source = _function_trigger_source(fn.get("eventTrigger"))
+        if source:
+            graph.add_node(source, source.split(":", 1)[0], source.split(":", 1)[1])
+            graph.add_edge(source, node_id, "trigger", (fn.get("eventTrigger") or {}).get("eventType", ""))
+        runs_as(node_id, [fn.get("serviceAccountEmail")])
+
+    for service in summary.get("cloud_run_services") or []:
+        node_id = f"run:{short_name(service.get('name', ''))}"
+        if service.get("url") and service.get("ingress") in (None, "", "all"):
+            graph.add_edge(INTERNET, node_id, "ingress", "service URL")
+        runs_as(node_id, [service.get("serviceAccount")])
+
+    for cluster in summary.get("gke_clusters") or []:
+        node_id = f"gke:{short_name(cluster.get('name', ''))}"
+        if not cluster.get("privateNodes"):
+            graph.add_edge(INTERNET, node_id, "ingress", "node external IPs")
+        runs_as(node_id, [cluster.get("serviceAccount")])
+
+    for instance in summary.get("cloudsql_instances") or []:
+        if instance.get("publicIP") and "0.0.0.0/0" in (instance.get("authorizedNetworks") or []):
+            graph.add_edge(INTERNET, f"sql:{short_name(instance.get('name', ''))}", "ingress", "authorized network 0.0.0.0/0")
+
+
+def add_diagram(graph, pages):
+    """
+    Merge draw.io page graphs: vertices are matched to GCP nodes by resource name
+    (or to the Internet node for user/internet actors), unmatched ones become
+    diagram nodes, and arrows become 'diagram_flow' edges. Vertices inside a
+    container flagged as a trust boundary take that boundary.
+    """
+    by_name = {}
+    for node_id, node in graph.nodes.items():
+        if node["kind"] not in ("internet", "service_account"):
+            by_name.setdefault(node["label"].lower(), node_id)
+
+    for page in pages or []:
+        boundaries = {c["id"]: c["label"] or c["id"] for c in page.get("containers", []) if c.get("trust_boundary")}
+        parents = {c["id"]: c.get("parent") for c in page.get("containers", [])}
+
+        def boundary_of(parent):
+            seen = set()
+            while parent and parent not in boundaries and parent not in seen:
+                seen.add(parent)
+                parent = parents.get(parent)
+            return boundaries.get(parent)
+
+        resolved = {}
+        for vertex in page.get("vertices", []):
+            label = vertex.get("label", "")
+            kind = vertex.get("kind", "")
+            match = next((by_name[t] for t in LABEL_TOKEN_PATTERN.findall(label.lower()) if t in by_name), None)
+            if match is None and (INTERNET_LABEL_PATTERN.search(label) or "actor" in kind or "user" in kind):
+                match = INTERNET
+            if match is None:
+                match = graph.add_node(f"diagram:{page['name']}:{vertex['id']}", "diagram", label or kind or vertex["id"])
+            boundary = boundary_of(vertex.get("parent"))
+            if boundary and match != INTERNET:
+                graph.nodes[match]["boundary"] = boundary
+            resolved[vertex["id"]] = match
+        for edge in page.get("edges", []):
+            source, target = resolved.get(edge["source"]), resolved.get(edge["target"])
+            if source and target:
+                graph.add_edge(source, target, "diagram_flow", edge.get("label", ""))
+
+
+def build_graph(summary, diagram_pages=None):
+    graph = ComponentGraph()
+    add_summary(graph, summary)
+    add_diagram(graph, diagram_pages)
+    return graph
+
+
+# ----------------------------------------
+# 🔍 Analyses (all linear in nodes + edges)
+# ----------------------------------------
+
+def internet_reachable_paths(graph):
+    """Breadth-first search from the Internet over flow edges; shortest path to every reachable node."""
+    previous = {INTERNET: None}
+    queue = deque([INTERNET])
+    while queue:
+        node = queue.popleft()
+        for edge in graph.outgoing[node]:
+            if edge["kind"] in FLOW_KINDS and edge["target"] not in previous:
+                previous[edge["target"]] = node
+                queue.append(edge["target"])
+    paths = []
+    for node in previous:
+        if node == INTERNET:
+            continue
+        path = [node]
+        while previous[path[-1]] is not None:
+            path.append(previous[path[-1]])
+        paths.append({"node": node, "hops": len(path) - 1, "path": path[::-1]})
+    return paths
+
+
+def cross_boundary_flows(graph):
+    flows = []
+    for edge in graph.edges(FLOW_KINDS):
+        source_boundary = graph.nodes[edge["source"]]["boundary"]
+        target_boundary = graph.nodes[edge["target"]]["boundary"]
+        if source_boundary != target_boundary:
+            flows.append({**edge, "from_boundary": source_boundary, "to_boundary": target_boundary})
+    return flows
+
+
+def shared_service_accounts(graph):
+    shared = []
+    for node_id, node in graph.nodes.items():
+        if node["kind"] != "service_account":
+            continue
+        users = [edge["source"] for edge in graph.incoming[node_id] if edge["kind"] == "identity"]
+        if len(users) > 1:
+            shared.append({
+                "service_account": node["label"],
+                "default_account": node["label"].endswith(DEFAULT_SA_SUFFIXES),
+                "used_by": users,
+            })
+    return shared
+
+
+def _truncate(analysis, limit):
+    lists = [analysis[key] for key in LISTED_KEYS]
+    return {
+        **analysis,
+        **{key: items[:limit] for key, items in zip(LISTED_KEYS, lists)},
+        "truncated": any(len(items) > limit for items in lists),
+    }
+
+
+def analyze(graph, limit=MAX_LISTED):
+    """Compact connectivity findings for the STRIDE stage; `limit=None` keeps every listed item."""
+    boundaries = {}
+    for node_id, node in graph.nodes.items():
+        boundaries.setdefault(node["boundary"], []).append(node_id)
+    reachable = internet_reachable_paths(graph)
+    flows = cross_boundary_flows(graph)
+    shared = shared_service_accounts(graph)
+    analysis = {
+        "nodes": len(graph.nodes),
+        "edges": graph.edge_count,
+        "boundaries": {name: len(members) for name, members in boundaries.items()},
+        "internet_reachable": reachable,
+        "cross_boundary_flows": flows,
+        "shared_service_accounts": shared,
+        "truncated": False,
+    }
+    return analysis if limit is None else _truncate(analysis, limit)
+
+
+def analysis_for_nodes(analysis, node_ids, limit=MAX_LISTED):
+    """
+    The subset of an analysis that involves any of `node_ids` (used for STRIDE shards).
+    Filtered before the lists are capped, so a shard keeps the paths that touch its components.
+    """
+    node_ids = set(node_ids)
+    return _truncate({
+        **analysis,
+        "internet_reachable": [p for p in analysis["internet_reachable"] if node_ids.intersection(p["path"])],
+        "cross_boundary_flows": [
+            f for f in analysis["cross_boundary_flows"] if f["source"] in node_ids or f["target"] in node_ids
+        ],
+        "shared_service_accounts": [
+            s for s in analysis["shared_service_accounts"] if node_ids.intersection(s["used_by"])
+        ],
+    }, limit)
+
+
+def summary_node_ids(summary):
+    ids = []
+    for category, prefix in NODE_PREFIXES.items():
+        for record in (summary or {}).get(category) or []:
+            ids.append(f"{prefix}:{short_name(record.get(IDENTITY_FIELDS[category], ''))}")
+    return ids
+
+
+# ----------------------------------------
+# 💾 Analysis persistence
+# ----------------------------------------
+
+def flow_analysis_path(project_id):
+    return os.path.join(CACHE_DIR, f"{project_id}_flow_analysis.json")
+
+
+def drawio_input(*paths):
+    """The first draw.io file among a run's diagram inputs, which the flow analysis merges."""
+    return next((path for path in paths if path and path.endswith(".drawio")), None)
+
+
+def load_diagram_pages(drawio_path=None):
+    drawio_path = drawio_path or os.environ.get("DRAWIO_PATH")
+    if not drawio_path or not os.path.exists(drawio_path):
+        return []
+    from threat_modeling.tools.drawio_reader_tool import load_drawio_graph
+
+    try:
+        return load_drawio_graph(drawio_path)
+    except Exception as e:
+        print(f"[WARN] [FlowGraph] Could not read diagram {drawio_path}: {e}")
+        return []
+
+
+def write_flow_analysis(project_id, summary, drawio_path=None):
+    graph = build_graph(summary, load_diagram_pages(drawio_path))
+    # Stored uncapped: each STRIDE task filters to its components first, then caps (analysis_for_nodes)
+    analysis = analyze(graph, limit=None)
+    atomic_write_bytes(flow_analysis_path(project_id), json.dumps(analysis, indent=2).encode())
+    print(
+        f"[INFO] [FlowGraph] {analysis['nodes']} nodes, {analysis['edges']} edges: "
+        f"{len(analysis['internet_reachable'])} internet-reachable, "
+        f"{len(analysis['cross_boundary_flows'])} cross-boundary flows, "
+        f"{len(analysis['shared_service_accounts'])} shared service accounts"
+    )
+    return analysis
+
+
+def load_flow_analysis(project_id):
+    try:
+        with open(flow_analysis_path(project_id), "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
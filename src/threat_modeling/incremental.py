@@ -0,0 +1,167 @@
+import csv
+import json
+import os
+import re
+import shutil
+
+from threat_modeling.resource_types import listed_types
+from threat_modeling.tools.metadata_cache import CACHE_DIR, atomic_write_bytes
+
+# Field that identifies a resource within each summary category (config/resource_types.yaml)
+IDENTITY_FIELDS = {t.category: t.identity for t in listed_types()}
+IAM_CATEGORY = "iam_policy"
+
+
+def incremental_enabled():
+    return os.environ.get("INCREMENTAL_MODELING", "").lower() in ("1", "true", "yes")
+
+
+def summary_path(project_id):
+    return os.path.join(CACHE_DIR, f"{project_id}_summary.json")
+
+
+def baseline_path(project_id):
+    """Summary that the last exported threat model was built from."""
+    return os.path.join(CACHE_DIR, f"{project_id}_summary.baseline.json")
+
+
+def diff_path(project_id):
+    return os.path.join(CACHE_DIR, f"{project_id}_diff.json")
+
+
+def _load_json(path):
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+
+# ----------------------------------------
+# 🔍 Summary normalization and diff
+# ----------------------------------------
+
+def short_name(resource_id):
+    """'projects/p/topics/orders' -> 'orders'"""
+    return str(resource_id).rstrip("/").split("/")[-1]
+
+
+def normalize_summary(summary):
+    """Index every category as {resource_id: record} so ordering does not matter."""
+    normalized = {}
+    for category, records in (summary or {}).items():
+        if category == IAM_CATEGORY:
+            roles = (records or {}).get("roles", [])
+            normalized[category] = {role: {"role": role} for role in roles}
+            continue
+        if not isinstance(records, list):
+            continue
+        field = IDENTITY_FIELDS.get(category, "name")
+        normalized[category] = {
+            str(r.get(field)): r for r in records if isinstance(r, dict) and r.get(field) is not None
+        }
+    return normalized
+
+
+def diff_summaries(previous, current):
+    """
+    Structured diff of two summaries, per category:
+    {"categories": {category: {"added": [...], "removed": [...], "changed": [...]}}, "has_changes": bool}
+
+    With no previous summary every resource is reported as added.
+    """
+    prev = normalize_summary(previous)
+    curr = normalize_summary(current)
+    categories = {}
+    for category in sorted(set(prev) | set(curr)):
+        before = prev.get(category, {})
+        after = curr.get(category, {})
+        categories[category] = {
+            "added": sorted(set(after) - set(before)),
+            "removed": sorted(set(before) - set(after)),
+            "changed": sorted(k for k in set(after) & set(before) if after[k] != before[k]),
+        }
+    return {
+        "baseline": previous is not None,
+        "has_changes": any(any(c.values()) for c in categories.values()),
+        "categories": categories,
+    }
+
+
+def write_diff(project_id, summary):
+    """Diff `summary` against the project's baseline and persist it next to the summary."""
+    diff = diff_summaries(_load_json(baseline_path(project_id)), summary)
+    atomic_write_bytes(diff_path(project_id), json.dumps(diff, indent=2).encode())
+    counts = {
+        category: {kind: len(ids) for kind, ids in changes.items() if ids}
+        for category, changes in diff["categories"].items()
+        if any(changes.values())
+    }
+    print(f"[INFO] [incremental] Metadata diff for {project_id}: {counts or 'no changes'}")
+    return diff
+
+
+def load_diff(project_id):
+    return _load_json(diff_path(project_id))
+
+
+def commit_baseline(project_id):
+    """Mark the current summary as the one the exported threat model covers."""
+    if project_id and os.path.exists(summary_path(project_id)):
+        shutil.copyfile(summary_path(project_id), baseline_path(project_id))
+
+
+# ----------------------------------------
+# ✂️ Changed-component selection and merge
+# ----------------------------------------
+
+def changed_summary(summary, diff):
+    """Subset of `summary` containing only added or changed resources."""
+    selected = {}
+    for category, records in summary.items():
+        changes = diff["categories"].get(category, {})
+        wanted = set(changes.get("added", [])) | set(changes.get("changed", []))
+        if category == IAM_CATEGORY:
+            selected[category] = records if wanted or changes.get("removed") else {}
+            continue
+        field = IDENTITY_FIELDS.get(category, "name")
+        selected[category] = [r for r in records if str(r.get(field)) in wanted]
+    return selected
+
+
+def stale_asset_names(diff):
+    """Lower-cased short names of resources whose prior threats must be regenerated or dropped."""
+    names = set()
+    for category, changes in diff["categories"].items():
+        ids = changes.get("changed", []) + changes.get("removed", [])
+        if category == IAM_CATEGORY:
+            if ids or changes.get("added"):
+                names.add("iam")
+            continue
+        names.update(short_name(i).lower() for i in ids)
+    return names
+
+
+def prior_rows_to_keep(prior_csv_path, diff):
+    """
+    Yield rows from the previous threat_model.csv whose asset does not mention a
+    changed or removed resource. These are merged unchanged into the new model.
+    """
+    if not diff or not diff.get("baseline") or not os.path.exists(prior_csv_path):
+        return
+    stale = stale_asset_names(diff)
+    # Whole-name matches only, so a change to "db" does not drop rows for "db-replica"
+    pattern = re.compile(
+        r"(?<![\w-])(" + "|".join(sorted(map(re.escape, stale), key=len, reverse=True)) + r")(?![\w-])"
+    ) if stale else None
+    with open(prior_csv_path, "r", newline="") as f:
+        for row in csv.DictReader(f):
+            asset = (row.get("asset") or "").lower()
+            if pattern is None or not pattern.search(asset):
+                yield row
+
+
+def can_skip_modeling(project_id, csv_path):
+    """True when nothing changed since the exported model and that model still exists."""
+    diff = load_diff(project_id)
+    return bool(diff and diff.get("baseline") and not diff.get("has_changes") and os.path.exists(csv_path))
@@ -0,0 +1,299 @@
+import contextlib
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # not available on Windows; peak RSS is omitted there
+    resource = None
+
+# Record spans for tool runs, gcloud/bq subprocesses, cache lookups and crew tasks
+TRACE_ENABLED = os.environ.get("TRACE", "on").lower() not in ("0", "off", "false", "no")
+# Also send the recorded spans to Langfuse when the run finishes (needs LANGFUSE_* keys and network)
+TRACE_LANGFUSE = os.environ.get("TRACE_LANGFUSE", "false").lower() in ("1", "true", "yes", "on")
+# Individual spans kept for the trace file; past this only the per-name totals are updated
+TRACE_MAX_SPANS = int(os.environ.get("TRACE_MAX_SPANS", "200000"))
+
+
+def _peak_rss_bytes():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def _current_rss_bytes():
+    """Resident set size right now (Linux /proc); None elsewhere."""
+    try:
+        with open("/proc/self/statm", "rb") as f:
+            return int(f.read().split()[1]) * PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+# ----------------------------------------
+# ⏱️ Spans
+# ----------------------------------------
+
+class Span:
+    """One timed operation; `args` holds byte counts, hit/miss and other details."""
+
+    __slots__ = ("category", "name", "args", "start", "wall", "cpu", "thread", "_cpu_start", "_rss_start")
+
+    def __init__(self, category, name, args):
+        self.category = category
+        self.name = name
+        self.args = args
+        self.thread = threading.current_thread().name
+        self.wall = self.cpu = 0.0
+        self.start = time.perf_counter()
+        self._cpu_start = time.thread_time()
+        self._rss_start = _current_rss_bytes()
+
+    def set(self, **args):
+        self.args.update({k: v for k, v in args.items() if v is not None})
+
+    def finish(self):
+        self.wall = time.perf_counter() - self.start
+        # CPU time of the calling thread, so concurrent spans do not count each other's work
+        self.cpu = time.thread_time() - self._cpu_start
+        # Process-wide RSS growth over the span (concurrent spans overlap); the run's peak is in Tracer.summary
+        rss_end = _current_rss_bytes()
+        if rss_end is not None and self._rss_start is not None:
+            self.args["rss_delta_bytes"] = rss_end - self._rss_start
+
+
+class Tracer:
+    """Thread-safe span recorder with per-(category, name) totals."""
+
+    def __init__(self, max_spans=TRACE_MAX_SPANS):
+        self._lock = threading.Lock()
+        self.max_spans = max_spans
+        self.spans = []
+        self.dropped = 0
+        self.totals = {}
+        self.epoch = time.perf_counter()
+        self.epoch_wall = time.time()
+
+    def record(self, span):
+        with self._lock:
+            if len(self.spans) < self.max_spans:
+                self.spans.append(span)
+            else:
+                self.dropped += 1
+            totals = self.totals.setdefault((span.category, span.name), {
+                "count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "max_wall_seconds": 0.0, "bytes_in": 0, "bytes_out": 0,
+            })
+            totals["count"] += 1
+            totals["wall_seconds"] += span.wall
+            totals["cpu_seconds"] += span.cpu
+            totals["max_wall_seconds"] = max(totals["max_wall_seconds"], span.wall)
+            totals["bytes_in"] += span.args.get("bytes_in") or 0
+            totals["bytes_out"] += span.args.get("bytes_out") or 0
+
+    def summary(self):
+        with self._lock:
+            totals = sorted(self.totals.items(), key=lambda item: -item[1]["wall_seconds"])
+        return {
+            "spans": sum(t["count"] for _, t in totals),
+            "dropped": self.dropped,
+            "peak_rss_bytes": _peak_rss_bytes(),
+            "by_name": [
+                {
+                    "category": category, "name": name, **t,
+                    "wall_seconds": round(t["wall_seconds"], 6),
+                    "cpu_seconds": round(t["cpu_seconds"], 6),
+                    "max_wall_seconds": round(t["max_wall_seconds"], 6),
+                }
+                for (category, name), t in totals
+            ],
+        }
+
+    def chrome_trace(self):
+        """Chrome trace-event JSON (chrome://tracing, Perfetto): one complete event per span."""
+        with self._lock:
+            spans = list(self.spans)
+        threads = {}
+        events = []
+        for span in spans:
+            tid = threads.setdefault(span.thread, len(threads) + 1)
+            events.append({
+                "name": span.name,
+                "cat": span.category,
+                "ph": "X",
+                "ts": round((span.start - self.epoch) * 1e6, 1),
+                "dur": round(span.wall * 1e6, 1),
+                "pid": os.getpid(),
+                "tid": tid,
+                "args": {**span.args, "cpu_ms": round(span.cpu * 1e3, 3)},
+            })
+        for thread, tid in threads.items():
+            events.append({"name": "thread_name", "ph": "M", "pid": os.getpid(), "tid": tid, "args": {"name": thread}})
+        return {"traceEvents": events, "displayTimeUnit": "ms", "summary": self.summary()}
+
+
+_tracer = Tracer()
+
+
+def get_tracer():
+    return _tracer
+
+
+@contextlib.contextmanager
+def span(category, name, **args):
+    """Time the enclosed block; yields the Span (or None when tracing is off) for extra args."""
+    if not TRACE_ENABLED:
+        yield None
+        return
+    current = Span(category, name, {k: v for k, v in args.items() if v is not None})
+    try:
+        yield current
+    except BaseException as e:
+        current.args["error"] = type(e).__name__
+        raise
+    finally:
+        current.finish()
+        _tracer.record(current)
+
+
+def _size(value):
+    if isinstance(value, (str, bytes)):
+        return len(value)
+    return None
+
+
+def traced(category, name=None, result_args=None):
+    """
+    Decorator recording a span per call. Tools are named after their `name`
+    attribute; string/bytes arguments and results count as bytes in/out.
+    `result_args(result)` may add details such as a cache hit.
+    """
+    def decorate(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not TRACE_ENABLED:
+                return function(*args, **kwargs)
+            label = name or getattr(args[0] if args else None, "name", None) or function.__qualname__
+            bytes_in = sum(_size(v) or 0 for v in (*args[1:], *kwargs.values()))
+            with span(category, label, bytes_in=bytes_in) as current:
+                result = function(*args, **kwargs)
+                current.set(bytes_out=_size(result), **(result_args(result) if result_args else {}))
+                return result
+        return wrapper
+    return decorate
+
+
+def cache_result(result):
+    return {"hit": result is not None}
+
+
+# ----------------------------------------
+# 📤 Export
+# ----------------------------------------
+
+_langfuse = None
+
+
+def get_langfuse():
+    """Langfuse client, created on first use rather than at import time."""
+    global _langfuse
+    if _langfuse is None:
+        from langfuse import Langfuse
+
+        _langfuse = Langfuse()
+    return _langfuse
+
+
+def export_to_langfuse(name="threat-modeling-run"):
+    """Send the recorded spans to Langfuse as one trace; failures are logged, never raised."""
+    try:
+        client = get_langfuse()
+        if not getattr(client, "enabled", True):
+            print("[WARN] [Instrumentation] Langfuse is not configured (LANGFUSE_PUBLIC_KEY); spans not exported")
+            return
+        trace = client.trace(name=name, metadata=_tracer.summary())
+        with _tracer._lock:
+            spans = list(_tracer.spans)
+        for s in spans:
+            started = _tracer.epoch_wall + (s.start - _tracer.epoch)
+            trace.span(
+                name=f"{s.category}:{s.name}",
+                start_time=datetime.fromtimestamp(started, timezone.utc),
+                end_time=datetime.fromtimestamp(started + s.wall, timezone.utc),
+                metadata={**s.args, "cpu_seconds": s.cpu, "thread": s.thread},
+            )
+        client.flush()
+        print(f"[INFO] [Instrumentation] Sent {len(spans)} spans to Langfuse")
+    except Exception as e:
+        print(f"[WARN] [Instrumentation] Langfuse export failed: {e}")
+
+
+def write_trace(path="output/trace.json"):
+    """Write the Chrome trace (with per-name totals under "summary") and print the slowest operations."""
+    if not TRACE_ENABLED or not _tracer.totals:
+        return None
+    from threat_modeling.tools.metadata_cache import atomic_write_bytes
+
+    trace = _tracer.chrome_trace()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    atomic_write_bytes(path, json.dumps(trace).encode())
+    summary = trace["summary"]
+    top = ", ".join(f"{t['category']}:{t['name']} {t['wall_seconds']:.2f}s" for t in summary["by_name"][:5])
+    print(f"[INFO] [Instrumentation] {summary['spans']} spans written to {path}; slowest: {top}")
+    if TRACE_LANGFUSE:
+        export_to_langfuse()
+    return summary
+
+
+# ----------------------------------------
+# 🔬 Profiling
+# ----------------------------------------
+
+@contextlib.contextmanager
+def profiled(profiler="cprofile", output_dir="output"):
+    """
+    Profile the enclosed block with cProfile (output/profile.pstats plus the top
+    functions by cumulative time) or pyinstrument (output/profile.html), if installed.
+    Both only see the calling thread; concurrent tasks appear as time spent waiting.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if profiler == "pyinstrument":
+        try:
+            from pyinstrument import Profiler
+        except ImportError:
+            print("[WARN] [Instrumentation] pyinstrument is not installed; using cProfile")
+        else:
+            sampler = Profiler()
+            sampler.start()
+            try:
+                yield
+            finally:
+                sampler.stop()
+                path = os.path.join(output_dir, "profile.html")
+                with open(path, "w") as f:
+                    f.write(sampler.output_html())
+                print(f"[INFO] [Instrumentation] pyinstrument profile written to {path}")
+            return
+
+    import cProfile
+    import pstats
+
+    sampler = cProfile.Profile()
+    sampler.enable()
+    try:
+        yield
+    finally:
+        sampler.disable()
+        path = os.path.join(output_dir, "profile.pstats")
+        sampler.dump_stats(path)
+        print(f"[INFO] [Instrumentation] cProfile stats written to {path}; top functions by cumulative time:")
+        pstats.Stats(sampler).sort_stats("cumulative").print_stats(25)
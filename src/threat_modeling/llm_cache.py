@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from crewai.llms.base_llm import BaseLLM
+
+from threat_modeling.instrumentation import cache_result, traced
+from threat_modeling.sharding import estimate_tokens
+from threat_modeling.tools.metadata_cache import atomic_write_bytes
+
+# off | on | replay  (replay serves only from cache and fails on a miss)
+LLM_CACHE_MODE = os.environ.get("LLM_CACHE", "off").lower()
+LLM_CACHE_PATH = os.environ.get("LLM_CACHE_PATH", ".llm_cache/responses.sqlite3")
+LLM_CACHE_MAX_BYTES = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+LLM_CACHE_TTL_SECONDS = int(os.environ.get("LLM_CACHE_TTL", "0"))  # 0 = never expires
+
+
+class LLMCacheMiss(RuntimeError):
+    """Raised in replay mode when a prompt has no cached response."""
+
+
+# ----------------------------------------
+# 🗄️ SQLite response store
+# ----------------------------------------
+
+class LLMResponseCache:
+    """
+    Content-addressed store of LLM responses keyed on model, call parameters,
+    messages (which carry every tool payload) and tool schemas.
+    """
+
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, ttl_seconds=LLM_CACHE_TTL_SECONDS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, model TEXT, response TEXT,"
+            " prompt_tokens INTEGER, completion_tokens INTEGER,"
+            " size INTEGER, created REAL, accessed REAL)"
+        )
+        self._db.commit()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.prompt_tokens_saved = 0
+        self.completion_tokens_saved = 0
+
+    @staticmethod
+    def make_key(model, messages, tools=None, **params):
+        payload = json.dumps(
+            {"model": model, "messages": messages, "tools": tools, "params": params},
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    @traced("cache", "llm_cache.get", cache_result)
+    def get(self, key):
+        with self._lock:
+            row = self._db.execute(
+                "SELECT response, prompt_tokens, completion_tokens, created FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row and self.ttl_seconds and time.time() - row[3] > self.ttl_seconds:
+                self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._db.commit()
+                row = None
+            if row is None:
+                self.misses += 1
+                return None
+            self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+            self._db.commit()
+            self.hits += 1
+            self.prompt_tokens_saved += row[1]
+            self.completion_tokens_saved += row[2]
+            return row[0]
+
+    def put(self, key, model, response, prompt_tokens, completion_tokens):
+        now = time.time()
+        size = len(response.encode())
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, model, response, prompt_tokens, completion_tokens, size, now, now),
+            )
+            self._evict_to_limit()
+            self._db.commit()
+
+    def _evict_to_limit(self):
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._db.execute("SELECT key, size FROM responses ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def report(self):
+        with self._lock:
+            entries, size = self._db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "mode": LLM_CACHE_MODE,
+            "path": self.path,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "estimated_prompt_tokens_saved": self.prompt_tokens_saved,
+            "estimated_completion_tokens_saved": self.completion_tokens_saved,
+            "entries": entries,
+            "bytes": size,
+        }
+
+
+# ----------------------------------------
+# 🧠 Caching LLM wrapper
+# ----------------------------------------
+
+class CachedLLM(BaseLLM):
+    """Wraps the agent's LLM and answers repeated prompts from the response cache."""
+
+    def __init__(self, inner, cache, replay=False):
+        super().__init__(model=inner.model, temperature=getattr(inner, "temperature", None))
+        self.inner = inner
+        self.cache = cache
+        self.replay = replay
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None):
+        key = self.cache.make_key(self.model, messages, tools, temperature=self.temperature, stop=sorted(self.stop or []))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+        if self.replay:
+            raise LLMCacheMiss(f"No cached LLM response for key {key} (LLM_CACHE=replay)")
+        # The agent executor sets stop words on this wrapper; the wrapped LLM must see them
+        self.inner.stop = self.stop
+        response = self.inner.call(messages, tools=tools, callbacks=callbacks, available_functions=available_functions)
+        if isinstance(response, str):
+            prompt = messages if isinstance(messages, str) else json.dumps(messages)
+            self.cache.put(key, self.model, response, estimate_tokens(prompt), estimate_tokens(response))
+        return response
+
+    def supports_stop_words(self):
+        return self.inner.supports_stop_words()
+
+    def supports_function_calling(self):
+        return self.inner.supports_function_calling()
+
+    def get_context_window_size(self):
+        return self.inner.get_context_window_size()
+
+    def __getattr__(self, attr):
+        # Only reached for attributes not set on the wrapper itself
+        inner = self.__dict__.get("inner")
+        if inner is None:
+            raise AttributeError(attr)
+        return getattr(inner, attr)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMResponseCache()
+        return _cache
+
+
+def build_llm():
+    """
+    Return the LLM agents should use: a CachedLLM around the default model when
+    LLM_CACHE is 'on' or 'replay', otherwise None (crewai's default resolution).
+    """
+    if LLM_CACHE_MODE not in ("on", "replay"):
+        return None
+    from crewai.utilities.llm_utils import create_llm
+
+    return CachedLLM(create_llm(None), get_llm_cache(), replay=LLM_CACHE_MODE == "replay")
+
+
+def write_llm_cache_report(path="output/llm_cache_report.json"):
+    """Print and persist this run's cache statistics (no-op when the cache is off)."""
+    if _cache is None:
+        return None
+    report = _cache.report()
+    print(f"[INFO] [LLMResponseCache] {report}")
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    atomic_write_bytes(path, json.dumps(report, indent=2).encode())
+    return report
@@ -1,13 +1,15 @@
 #!/usr/bin/env python
 
-from langfuse.openai import openai
 from typing import Optional
 
+import contextlib
 import sys
 import os
 from dotenv import load_dotenv
 import typer
-from threat_modeling.crew import ThreatModelingCrew
+
+# crewai, langfuse, PyMuPDF and Pillow take seconds to import, so they are only
+# loaded inside the commands that need them; --help and input validation stay fast.
 
 load_dotenv()  # Ensure .env is loaded at startup
 app = typer.Typer()
@@ -46,6 +48,22 @@ def build_inputs(
 
     return inputs
 
+def enable_tracing():
+    """Patch the OpenAI client for Langfuse tracing; called by commands that talk to the LLM."""
+    from langfuse.openai import openai  # noqa: F401 (import patches openai)
+
+
+def write_run_reports(output_dir: str = "output"):
+    from threat_modeling.instrumentation import write_trace
+    from threat_modeling.llm_cache import write_llm_cache_report
+    from threat_modeling.token_budget import write_token_report
+    from threat_modeling.tools.artifact_cache import log_artifact_cache_stats
+
+    write_llm_cache_report(os.path.join(output_dir, "llm_cache_report.json"))
+    write_token_report(os.path.join(output_dir, "token_report.json"))
+    write_trace(os.path.join(output_dir, "trace.json"))
+    log_artifact_cache_stats()
+
 def validate_inputs(inputs: dict):
     if not any(inputs.get(k) for k in ["project_id", "pdf_path", "diagram_path"]):
         typer.echo("\n❌ No valid inputs provided.")
@@ -61,16 +79,125 @@ def run(
     project_id: str = typer.Option(None, envvar="PROJECT_ID", help="GCP Project ID (optional, will use .env if not provided)"),
     pdf_path: str = typer.Option(None),
     diagram_path: str = typer.Option(None),
+    incremental: bool = typer.Option(False, envvar="INCREMENTAL_MODELING", help="Only re-model components that changed since the last threat model"),
+    profile: bool = typer.Option(False, "--profile", help="Profile the crew run (output/profile.pstats or output/profile.html)"),
+    profiler: str = typer.Option("cprofile", envvar="PROFILER", help="cprofile or pyinstrument (if installed)"),
 ):
     """Run full threat modeling pipeline"""
     inputs = build_inputs(project_id, pdf_path, diagram_path)
     validate_inputs(inputs)
 
+    if inputs.get("project_id"):
+        from threat_modeling.flow_graph import drawio_input
+        from threat_modeling.incremental import can_skip_modeling, diff_path
+        from threat_modeling.tools.gcp_metadata import GCPMetadataCollector
+
+        # Refresh the summary (and its diff, rule findings and flow analysis) before the crew is
+        # built: the STRIDE tasks and their shards are read from it. A draw.io input feeds the flow
+        # analysis here just as it does in the crew's own extraction, whose GCP call then hits the cache.
+        drawio_path = drawio_input(inputs.get("diagram_path"), os.environ.get("DRAWIO_PATH"))
+        GCPMetadataCollector(drawio_path=drawio_path).collect(inputs["project_id"])
+        if incremental:
+            typer.echo(f"📄 Metadata diff written to {diff_path(inputs['project_id'])}")
+            # Same report path the crew's exporter writes to
+            csv_path = os.environ.get("CSV_PATH", "threat_model.csv")
+            if can_skip_modeling(inputs["project_id"], csv_path):
+                typer.echo(f"✅ No GCP inventory changes since the last threat model; keeping {csv_path}")
+                return
+
     typer.echo("✅ Starting Threat Modeling Crew with:")
     for k, v in inputs.items():
         typer.echo(f"  {k}: {v if v else '[empty]'}")
 
-    ThreatModelingCrew().crew().kickoff(inputs=inputs)
+    enable_tracing()
+    from threat_modeling.crew import ThreatModelingCrew
+
+    crew = ThreatModelingCrew(
+        project_id=inputs.get("project_id"),
+        incremental=incremental,
+        pdf_path=inputs.get("pdf_path"),
+        diagram_path=inputs.get("diagram_path"),
+    )
+    if profile:
+        from threat_modeling.instrumentation import profiled
+
+        profiling = profiled(profiler, crew.output_dir)
+    else:
+        profiling = contextlib.nullcontext()
+    with profiling:
+        crew.crew().kickoff(inputs=inputs)
+    crew.write_phase_timings()
+    write_run_reports()
+
+@app.command()
+def estimate(
+    project_id: str = typer.Option(None, envvar="PROJECT_ID", help="GCP Project ID (optional, will use .env if not provided)"),
+    pdf_path: str = typer.Option(None),
+    diagram_path: str = typer.Option(None),
+    output: str = typer.Option("output/token_estimate.json", help="Where to write the token report"),
+):
+    """Predict prompt tokens, cost and latency without calling the LLM"""
+    inputs = build_inputs(project_id, pdf_path, diagram_path)
+    validate_inputs(inputs)
+    from threat_modeling.crew import ThreatModelingCrew
+    from threat_modeling.token_budget import write_token_report
+
+    ThreatModelingCrew(
+        project_id=inputs.get("project_id"),
+        pdf_path=inputs.get("pdf_path"),
+        diagram_path=inputs.get("diagram_path"),
+    ).estimate_tokens()
+    report = write_token_report(output)
+    for stage, totals in report["stages"].items():
+        budget = totals["budget"] or "unlimited"
+        typer.echo(f"  {stage}: {totals['tokens']} tokens in {totals['payloads']} payloads (max {totals['max_tokens']}, budget {budget})")
+    typer.echo(
+        f"✅ ~{report['total_tokens']} prompt tokens, ~${report['estimated_input_cost_usd']} input cost, "
+        f"~{report['estimated_prompt_seconds']}s prompt processing"
+    )
+
+@app.command()
+def batch(
+    project_ids: str = typer.Option(None, help="Comma-separated GCP project IDs"),
+    projects_file: str = typer.Option(None, help="File with one GCP project ID per line"),
+    folder_id: str = typer.Option(None, help="Process every active project directly under this folder"),
+    organization_id: str = typer.Option(None, help="Process every active project directly under this organization"),
+    output_dir: str = typer.Option("output", help="Per-project results are written to <output_dir>/<project_id>/"),
+    max_workers: int = typer.Option(4, help="Projects extracted concurrently"),
+    max_processes: int = typer.Option(None, help="gcloud/bq subprocesses shared across all projects (default: 4 x max-workers)"),
+    crew_workers: int = typer.Option(1, help="Projects threat-modeled concurrently"),
+    pdf_path: str = typer.Option(None),
+    diagram_path: str = typer.Option(None),
+    extract_only: bool = typer.Option(False, help="Only collect GCP metadata summaries"),
+    incremental: bool = typer.Option(False, envvar="INCREMENTAL_MODELING", help="Only re-model components that changed since the last threat model"),
+):
+    """Threat-model many GCP projects in one process"""
+    from threat_modeling.batch import resolve_project_ids, run_batch
+
+    projects = resolve_project_ids(project_ids, projects_file, folder_id, organization_id)
+    if not projects:
+        typer.echo("\n❌ No projects to process.")
+        typer.echo("Use --project-ids, --projects-file, --folder-id or --organization-id.\n")
+        raise typer.Exit(1)
+
+    typer.echo(f"✅ Starting batch threat modeling for {len(projects)} projects")
+    if not extract_only:
+        enable_tracing()
+    index = run_batch(
+        projects,
+        output_dir=output_dir,
+        max_workers=max_workers,
+        max_processes=max_processes,
+        crew_workers=crew_workers,
+        pdf_path=pdf_path,
+        diagram_path=diagram_path,
+        extract_only=extract_only,
+        incremental=incremental,
+    )
+    write_run_reports(output_dir)
+    typer.echo(f"Done: {index['succeeded']} succeeded, {index['failed']} failed")
+    if index["failed"]:
+        raise typer.Exit(1)
 
 @app.command()
 def train(iterations: int, filename: str, project_id: str = typer.Option(..., help="GCP Project ID (required)")):
@@ -78,16 +205,27 @@ def train(iterations: int, filename: str, project_id: str = typer.Option(..., he
     validate_inputs(inputs)
     inputs = build_inputs()
     validate_inputs(inputs)
+    enable_tracing()
+    from threat_modeling.crew import ThreatModelingCrew
+
     ThreatModelingCrew().crew().train(n_iterations=iterations, filename=filename, inputs=inputs)
+    write_run_reports()
 
 @app.command()
 def test(iterations: int, openai_model_name: str):
     inputs = build_inputs()
     validate_inputs(inputs)
+    enable_tracing()
+    from threat_modeling.crew import ThreatModelingCrew
+
     ThreatModelingCrew().crew().test(n_iterations=iterations, eval_llm=openai_model_name, inputs=inputs)
+    write_run_reports()
 
 @app.command()
 def replay(task_id: str):
+    enable_tracing()
+    from threat_modeling.crew import ThreatModelingCrew
+
     ThreatModelingCrew().crew().replay(task_id=task_id)
 
 if __name__ == "__main__":
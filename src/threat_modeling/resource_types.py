@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+from pathlib import Path
+
+import yaml
+
+# Declarative spec of the collected GCP resource types (see the file's header for the format)
+RESOURCE_TYPES_PATH = os.environ.get("RESOURCE_TYPES_PATH") or str(Path(__file__).parent / "config" / "resource_types.yaml")
+_MISSING = object()
+# Enrichment steps implemented by the GCP metadata tool, named by a type's `expand`
+EXPANSIONS = ("bigquery_tables",)
+
+
+# ----------------------------------------
+# 🧩 Field expression compilation
+# ----------------------------------------
+
+def _last_segment(value):
+    return "" if value is _MISSING or value is None else str(value).split("/")[-1]
+
+
+TRANSFORMS = {
+    "last_segment": _last_segment,
+    "any": lambda v: any(v) if isinstance(v, list) else bool(v) and v is not _MISSING,
+    "count": lambda v: len(v) if isinstance(v, list) else 0,
+    "unique": lambda v: list(dict.fromkeys(i for i in v if i)) if isinstance(v, list) else [],
+    "present": lambda v: v is not _MISSING and v is not None,
+}
+
+
+def _parse_path(path):
+    """'a.b[].c' (or ['a', 'b[]', 'c']) -> [('a', False), ('b', True), ('c', False)]"""
+    segments = path.split(".") if isinstance(path, str) else list(path)
+    return [(s[:-2], True) if s.endswith("[]") else (s, False) for s in segments]
+
+
+def _compile_getter(path):
+    """Lookup of one value (or _MISSING); once a segment maps over a list, a flat list of the non-null values found."""
+    segments = _parse_path(path)
+    if not any(is_list for _, is_list in segments):
+        def get(record):
+            value = record
+            for key, _ in segments:
+                if not isinstance(value, dict) or key not in value:
+                    return _MISSING
+                value = value[key]
+            return value
+        return get
+
+    def get(record):
+        values = [record]
+        for key, is_list in segments:
+            found = []
+            for value in values:
+                if not isinstance(value, dict) or key not in value:
+                    continue
+                value = value[key]
+                if is_list:
+                    found.extend(value if isinstance(value, list) else [])
+                else:
+                    found.append(value)
+            values = found
+        return [v for v in values if v is not None]
+    return get
+
+
+def _compile_field(name, spec):
+    if not isinstance(spec, dict):
+        spec = {"path": spec}
+    if "path" not in spec:
+        raise ValueError(f"Field '{name}' needs a path")
+    get = _compile_getter(spec["path"])
+    transform = spec.get("transform")
+    if transform is not None and transform not in TRANSFORMS:
+        raise ValueError(f"Field '{name}': unknown transform '{transform}'")
+    transform = TRANSFORMS.get(transform)
+    default = spec.get("default")
+
+    def project(record):
+        value = get(record)
+        if transform is not None:
+            return transform(value)
+        if value is _MISSING or value is None:
+            # Copy mutable defaults so records never share them
+            return json.loads(json.dumps(default)) if isinstance(default, (dict, list)) else default
+        return value
+    return project
+
+
+# ----------------------------------------
+# 📐 Resource types
+# ----------------------------------------
+
+class ResourceType:
+    """One summary category: how to list it and which fields of each listed record to keep."""
+
+    def __init__(self, category, spec):
+        missing = [f for f in ("command", "fields") if not spec.get(f)]
+        if missing:
+            raise ValueError(f"Resource type '{category}' missing required fields: {missing}")
+        self.category = category
+        self.api = spec.get("api")
+        self.command_template = list(spec["command"])
+        self.shape = spec.get("shape", "list")
+        if self.shape not in ("list", "object"):
+            raise ValueError(f"Resource type '{category}': shape must be list or object")
+        self.identity = spec.get("identity", "name")
+        self.label = spec.get("label")
+        self.node_prefix = spec.get("node_prefix")
+        self.terms = list(spec.get("terms") or [])
+        self.expand = spec.get("expand")
+        if self.expand is not None and self.expand not in EXPANSIONS:
+            raise ValueError(f"Resource type '{category}': unknown expand '{self.expand}'")
+        self._fields = [(name, _compile_field(name, field)) for name, field in spec["fields"].items()]
+        if self.shape == "list" and self.identity not in spec["fields"]:
+            raise ValueError(f"Resource type '{category}': identity field '{self.identity}' is not projected")
+        # Changes whenever the spec does, so cached projections of an older spec are not reused
+        self.digest = hashlib.sha256(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+    def command(self, project_id):
+        return [part.replace("{project_id}", project_id) for part in self.command_template]
+
+    def project(self, record):
+        """Projected fields of one listed record; None for records without an identity."""
+        if not isinstance(record, dict) or (self.shape == "object" and not record):
+            return None
+        projected = {name: project(record) for name, project in self._fields}
+        if self.shape == "list" and projected.get(self.identity) is None:
+            return None
+        return projected
+
+    def empty(self):
+        """Summary value when the API is disabled or the listing failed."""
+        return {} if self.shape == "object" else []
+
+
+def load_resource_types(path=RESOURCE_TYPES_PATH):
+    with open(path, "r") as f:
+        specs = yaml.safe_load(f) or {}
+    return {category: ResourceType(category, spec) for category, spec in specs.items()}
+
+
+_resource_types = None
+
+
+def get_resource_types():
+    """Resource types in summary order, loaded once per process."""
+    global _resource_types
+    if _resource_types is None:
+        _resource_types = load_resource_types()
+    return _resource_types
+
+
+def listed_types():
+    """Types whose summary value is a list of records (everything but the IAM policy)."""
+    return [t for t in get_resource_types().values() if t.shape == "list"]
@@ -0,0 +1,84 @@
+import json
+import os
+
+from threat_modeling.token_budget import count_tokens
+
+DEFAULT_SHARD_TOKENS = int(os.environ.get("STRIDE_SHARD_TOKENS", "6000"))
+DEFAULT_SHARD_PARALLELISM = int(os.environ.get("STRIDE_SHARD_PARALLELISM", "4"))
+DEFAULT_SHARD_STRATEGY = os.environ.get("STRIDE_SHARD_STRATEGY", "type")  # type | size
+
+
+def estimate_tokens(text):
+    """Token count from the local tokenizer (see token_budget.count_tokens)."""
+    return count_tokens(text)
+
+
+def _record_tokens(record):
+    return estimate_tokens(json.dumps(record, separators=(",", ":")))
+
+
+# ----------------------------------------
+# ✂️ Summary sharding
+# ----------------------------------------
+
+def shard_summary(summary, max_tokens=DEFAULT_SHARD_TOKENS, strategy=DEFAULT_SHARD_STRATEGY):
+    """
+    Split a GCP summary into token-bounded shards with the same shape as the summary.
+
+    A summary that fits in `max_tokens` is returned as a single shard. Otherwise:
+    - type: whole categories are packed into a shard until it would exceed `max_tokens`;
+      a category larger than that is split across shards of its own
+    - size: records are packed across categories, in summary order, up to `max_tokens`
+
+    Shards are produced in a fixed order, so the same summary always yields the
+    same shards. A single record larger than `max_tokens` gets a shard of its own.
+    """
+    summary = {category: records for category, records in (summary or {}).items() if records}
+    if not summary:
+        return []
+    if _record_tokens(summary) <= max_tokens:
+        return [summary]
+
+    shards = []
+    current, current_tokens = {}, 0
+
+    def close():
+        nonlocal current, current_tokens
+        if current:
+            shards.append(current)
+        current, current_tokens = {}, 0
+
+    def add(category, value, tokens, as_record):
+        nonlocal current_tokens
+        if current and current_tokens + tokens > max_tokens:
+            close()
+        if as_record:
+            current.setdefault(category, []).append(value)
+        else:
+            current[category] = value
+        current_tokens += tokens
+
+    for category, records in summary.items():
+        if not isinstance(records, list):
+            # The IAM policy summary is one object and is never split
+            add(category, records, _record_tokens(records), False)
+            continue
+        if strategy == "type":
+            tokens = _record_tokens(records)
+            if tokens <= max_tokens:
+                add(category, records, tokens, False)
+                continue
+            close()
+        for record in records:
+            add(category, record, _record_tokens(record), True)
+        if strategy == "type":
+            close()
+    close()
+    return shards
+
+
+def shard_label(shard):
+    return ", ".join(
+        f"{category} ({len(records) if isinstance(records, list) else 1})"
+        for category, records in shard.items()
+    )
@@ -0,0 +1,176 @@
+import json
+import os
+import re
+from pathlib import Path
+
+import yaml
+
+from threat_modeling.incremental import IAM_CATEGORY, IDENTITY_FIELDS, short_name
+from threat_modeling.tools.metadata_cache import CACHE_DIR, atomic_write_bytes
+
+RULES_PATH = Path(__file__).parent / "config" / "stride_rules.yaml"
+RISK_FIELDS = ("threat", "asset", "category", "likelihood", "impact", "mitigation")
+_MISSING = object()
+
+
+# ----------------------------------------
+# 🧩 Condition compilation
+# ----------------------------------------
+
+def _lookup(record, path):
+    value = record
+    for part in path:
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _compile_test(spec):
+    """Turn a condition value from the rule file into a predicate over the field value."""
+    if not isinstance(spec, dict):
+        return lambda v: v is not _MISSING and v == spec
+    if len(spec) != 1:
+        raise ValueError(f"Condition must have exactly one operator: {spec}")
+    op, arg = next(iter(spec.items()))
+    if op == "exists":
+        return lambda v: (v is not _MISSING) == bool(arg)
+    if op == "not_exists":
+        return lambda v: (v is _MISSING) == bool(arg)
+    if op == "truthy":
+        return lambda v: (v is not _MISSING and bool(v)) == bool(arg)
+    if op == "falsy":
+        return lambda v: (v is _MISSING or not v) == bool(arg)
+    if op == "equals":
+        return lambda v: v is not _MISSING and v == arg
+    if op == "not_equals":
+        return lambda v: v is _MISSING or v != arg
+    if op == "in":
+        allowed = set(arg)
+        return lambda v: v is not _MISSING and v in allowed
+    if op == "not_in":
+        excluded = set(arg)
+        return lambda v: v is _MISSING or v not in excluded
+    if op == "contains":
+        return lambda v: isinstance(v, (list, str)) and arg in v
+    if op == "any_endswith":
+        return lambda v: isinstance(v, list) and any(isinstance(i, str) and i.endswith(arg) for i in v)
+    if op == "matches":
+        pattern = re.compile(arg)
+        return lambda v: isinstance(v, str) and pattern.search(v) is not None
+    raise ValueError(f"Unknown condition operator: {op}")
+
+
+def _compile_rule(rule_id, rule):
+    missing = [f for f in ("resource",) + RISK_FIELDS if f not in rule]
+    if missing:
+        raise ValueError(f"STRIDE rule '{rule_id}' missing required fields: {missing}")
+    tests = [
+        (tuple(path.split(".")), _compile_test(spec))
+        for path, spec in (rule.get("when") or {}).items()
+    ]
+
+    def matches(record):
+        return all(test(_lookup(record, path)) for path, test in tests)
+
+    return {"id": rule_id, "resource": rule["resource"], "matches": matches, **{f: rule[f] for f in RISK_FIELDS}}
+
+
+# ----------------------------------------
+# ⚡ Rule engine
+# ----------------------------------------
+
+class _FormatFields(dict):
+    def __missing__(self, key):
+        return "?"
+
+
+class StrideRuleEngine:
+    """
+    Evaluates a declarative STRIDE rule set against a GCP metadata summary.
+
+    Rules are compiled once and grouped by summary category, so evaluation is a
+    single pass over each category's records. Fully offline.
+    """
+
+    def __init__(self, rules):
+        self.rules_by_resource = {}
+        for rule_id, rule in rules.items():
+            compiled = _compile_rule(rule_id, rule)
+            self.rules_by_resource.setdefault(compiled["resource"], []).append(compiled)
+
+    @classmethod
+    def from_file(cls, path=RULES_PATH):
+        with open(path, "r") as f:
+            return cls(yaml.safe_load(f) or {})
+
+    @staticmethod
+    def _records(category, records):
+        if category == IAM_CATEGORY:
+            return [{"role": role} for role in (records or {}).get("roles", [])]
+        return records if isinstance(records, list) else []
+
+    def evaluate(self, summary):
+        """Return RiskItem-shaped dicts, ordered by category, record and rule."""
+        findings = []
+        for category, records in (summary or {}).items():
+            rules = self.rules_by_resource.get(category)
+            if not rules:
+                continue
+            id_field = "role" if category == IAM_CATEGORY else IDENTITY_FIELDS.get(category, "name")
+            for record in self._records(category, records):
+                fields = None
+                for rule in rules:
+                    if not rule["matches"](record):
+                        continue
+                    if fields is None:
+                        fields = _FormatFields(record)
+                        fields["short_name"] = short_name(record.get(id_field, "?"))
+                    finding = {f: rule[f] for f in RISK_FIELDS}
+                    finding["asset"] = rule["asset"].format_map(fields)
+                    findings.append(finding)
+        return findings
+
+
+def compact_findings(findings):
+    """
+    Prompt form of rule findings: one entry per (category, threat) with the assets it
+    applies to, without likelihood, impact or mitigation (the exporter merges the full rows).
+    """
+    grouped = {}
+    for finding in findings:
+        grouped.setdefault((finding["category"], finding["threat"]), []).append(finding["asset"])
+    return [{"category": category, "threat": threat, "assets": assets} for (category, threat), assets in grouped.items()]
+
+
+_default_engine = None
+
+
+def get_default_engine():
+    global _default_engine
+    if _default_engine is None:
+        _default_engine = StrideRuleEngine.from_file()
+    return _default_engine
+
+
+# ----------------------------------------
+# 💾 Findings persistence
+# ----------------------------------------
+
+def findings_path(project_id):
+    return os.path.join(CACHE_DIR, f"{project_id}_rule_findings.json")
+
+
+def write_findings(project_id, summary):
+    findings = get_default_engine().evaluate(summary)
+    atomic_write_bytes(findings_path(project_id), json.dumps(findings, indent=2).encode())
+    print(f"[INFO] [StrideRuleEngine] {len(findings)} rule-based findings for {project_id}")
+    return findings
+
+
+def load_findings(project_id):
+    try:
+        with open(findings_path(project_id), "r") as f:
+            return json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return []
@@ -0,0 +1,234 @@
+import bisect
+import functools
+import itertools
+import json
+import os
+import threading
+
+try:
+    import tiktoken
+except ImportError:  # declared dependency; counts fall back to a character estimate without it
+    tiktoken = None
+
+from threat_modeling.tools.metadata_cache import atomic_write_bytes
+
+# tiktoken encoding used for counting; "heuristic" skips tiktoken entirely
+DEFAULT_TOKENIZER = os.environ.get("TOKENIZER", "cl100k_base")
+# Payloads longer than this are counted on evenly spaced samples and extrapolated
+COUNT_SAMPLE_CHARS = 256 * 1024
+# Input price and prompt-processing speed, for the cost and latency estimates in the report
+DEFAULT_TOKEN_PRICE_PER_MILLION = float(os.environ.get("TOKEN_PRICE_PER_MILLION", "2.50"))
+DEFAULT_PROMPT_TOKENS_PER_SECOND = float(os.environ.get("PROMPT_TOKENS_PER_SECOND", "2000"))
+
+# Per-stage token budgets for tool payloads and task descriptions (0 = unlimited)
+DEFAULT_BUDGETS = {
+    "gcp_metadata": 20000,
+    "pdf": 60000,
+    "image": 30000,
+    "drawio": 30000,
+    "stride_tool": 30000,
+    "stride_task": 30000,
+}
+STAGE_BUDGETS = {
+    stage: int(os.environ.get(f"TOKEN_BUDGET_{stage.upper()}", str(default)))
+    for stage, default in DEFAULT_BUDGETS.items()
+}
+
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    """The tiktoken encoding, or False when it cannot be loaded (not installed, or offline without a cached file)."""
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                _encoding = False
+                if tiktoken is not None and DEFAULT_TOKENIZER != "heuristic":
+                    try:
+                        _encoding = tiktoken.get_encoding(DEFAULT_TOKENIZER)
+                    except Exception as e:
+                        print(f"[WARN] [TokenBudget] tiktoken encoding '{DEFAULT_TOKENIZER}' unavailable ({e}); using ~4 chars/token")
+    return _encoding
+
+
+def count_tokens(text):
+    """Token count with the local tokenizer; ~4 characters per token when tiktoken is unavailable."""
+    text = text if isinstance(text, str) else json.dumps(text, separators=(",", ":"))
+    encoding = _get_encoding()
+    if not encoding:
+        return len(text) // 4 + 1
+    if len(text) <= COUNT_SAMPLE_CHARS:
+        return len(encoding.encode(text, disallowed_special=()))
+    # Large payloads (mostly base64 images): count three samples and scale by length
+    sample_chars = COUNT_SAMPLE_CHARS // 3
+    starts = (0, (len(text) - sample_chars) // 2, len(text) - sample_chars)
+    sampled = sum(len(encoding.encode(text[s:s + sample_chars], disallowed_special=())) for s in starts)
+    return round(sampled * len(text) / (3 * sample_chars))
+
+
+# ----------------------------------------
+# 📒 Token ledger
+# ----------------------------------------
+
+class TokenLedger:
+    """Thread-safe record of the size of every metered payload, grouped by stage."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.entries = []
+
+    def record(self, stage, component, tokens, chars, action=None):
+        entry = {"stage": stage, "component": component, "tokens": tokens, "chars": chars}
+        if action:
+            entry["action"] = action
+        with self._lock:
+            self.entries.append(entry)
+        budget = STAGE_BUDGETS.get(stage, 0)
+        budget_note = f" / budget {budget}" if budget else ""
+        action_note = f" ({action})" if action else ""
+        print(f"[INFO] [TokenBudget] {stage} {component}: {tokens} tokens, {chars} chars{budget_note}{action_note}")
+
+    def report(self, price_per_million=DEFAULT_TOKEN_PRICE_PER_MILLION, tokens_per_second=DEFAULT_PROMPT_TOKENS_PER_SECOND):
+        with self._lock:
+            entries = list(self.entries)
+        stages = {}
+        for entry in entries:
+            stage = stages.setdefault(entry["stage"], {
+                "budget": STAGE_BUDGETS.get(entry["stage"], 0), "payloads": 0, "tokens": 0, "max_tokens": 0, "reduced": 0,
+            })
+            stage["payloads"] += 1
+            stage["tokens"] += entry["tokens"]
+            stage["max_tokens"] = max(stage["max_tokens"], entry["tokens"])
+            stage["reduced"] += 1 if entry.get("action") else 0
+        total = sum(stage["tokens"] for stage in stages.values())
+        return {
+            "tokenizer": DEFAULT_TOKENIZER if _get_encoding() else "heuristic",
+            # Each payload enters at least one prompt; agent loops resend earlier payloads, so these are lower bounds
+            "total_tokens": total,
+            "estimated_input_cost_usd": round(total * price_per_million / 1_000_000, 4),
+            "estimated_prompt_seconds": round(total / tokens_per_second, 1) if tokens_per_second else None,
+            "stages": stages,
+            "payloads": entries,
+        }
+
+
+_ledger = TokenLedger()
+
+
+def get_token_ledger():
+    return _ledger
+
+
+def write_token_report(path="output/token_report.json"):
+    report = _ledger.report()
+    if not report["payloads"]:
+        return report
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    atomic_write_bytes(path, json.dumps(report, indent=2).encode())
+    print(
+        f"[INFO] [TokenBudget] {report['total_tokens']} tokens across {len(report['payloads'])} payloads "
+        f"(~${report['estimated_input_cost_usd']}, ~{report['estimated_prompt_seconds']}s prompt processing); "
+        f"report written to {path}"
+    )
+    return report
+
+
+# ----------------------------------------
+# ✂️ Budget enforcement
+# ----------------------------------------
+
+def truncate_text(text, budget):
+    """Cut text to roughly `budget` tokens, keeping the beginning."""
+    tokens = count_tokens(text)
+    if tokens <= budget:
+        return text
+    keep = max(0, int(len(text) * budget / tokens) - 200)
+    return text[:keep] + f"\n[TRUNCATED: payload exceeded the {budget}-token budget]"
+
+
+def drop_list_items(*keys):
+    """
+    Reducer for JSON payloads: remove items from the end of the first non-empty
+    list among `keys` (dotted paths into the payload) until the payload fits.
+    Lists are expected in priority order, most important first.
+    """
+    def reduce(payload, budget):
+        tokens = count_tokens(payload)
+        if tokens <= budget:
+            return payload
+        # Leave room for the budget note added below
+        note = "{} items were dropped to fit the " + f"{budget}-token budget"
+        target = budget - count_tokens({"budget_note": note.format(10 ** 6)})
+        dropped = 0
+        for key in keys:
+            if tokens <= target:
+                break
+            *parents, leaf = key.split(".")
+            container = payload
+            for parent in parents:
+                container = container.get(parent) if isinstance(container, dict) else None
+            items = container.get(leaf) if isinstance(container, dict) else None
+            if not isinstance(items, list) or not items:
+                continue
+            # Count each item once, scale the counts to the list's measured share of the payload
+            # (tokens are not additive across item boundaries) and keep the longest prefix that
+            # fits; recount, and repeat only if the estimate came out slightly low
+            sizes = [count_tokens(json.dumps(item, separators=(",", ":"))) for item in items]
+            container[leaf] = []
+            base = count_tokens(payload)
+            container[leaf] = items
+            while items and tokens > target:
+                scale = max(tokens - base, 1) / sum(sizes)
+                keep = bisect.bisect_right(list(itertools.accumulate(sizes)), (target - base) / scale)
+                keep = min(keep, len(items) - 1)
+                dropped += len(items) - keep
+                del items[keep:], sizes[keep:]
+                tokens = count_tokens(payload)
+        if dropped:
+            payload["budget_note"] = note.format(dropped)
+        return payload
+    return reduce
+
+
+def enforce_budget(stage, component, output, reducer=None):
+    """
+    Measure a payload, record it in the ledger and, when it exceeds the stage's
+    budget, shrink it: first with the stage's JSON `reducer`, then by plain
+    truncation as a last resort. Error strings and non-text outputs pass through.
+    """
+    if not isinstance(output, str):
+        return output
+    tokens = count_tokens(output)
+    budget = STAGE_BUDGETS.get(stage, 0)
+    if not budget or tokens <= budget or output.startswith("[ERROR]"):
+        _ledger.record(stage, component, tokens, len(output))
+        return output
+
+    action = "truncated"
+    reduced = output
+    if reducer is not None:
+        try:
+            payload = json.loads(output)
+            if isinstance(payload, dict):
+                reduced = json.dumps(reducer(payload, budget))
+                action = "reduced"
+        except (json.JSONDecodeError, TypeError):
+            pass
+    if count_tokens(reduced) > budget:
+        reduced = truncate_text(reduced, budget)
+        action = "truncated"
+    print(f"[WARN] [TokenBudget] {stage} {component}: {tokens} tokens exceeds the {budget}-token budget; {action}")
+    _ledger.record(stage, component, count_tokens(reduced), len(reduced), f"{action} from {tokens}")
+    return reduced
+
+
+def metered(stage, reducer=None):
+    """Decorator for a tool's _run: meters its output against the stage budget."""
+    def decorate(run):
+        @functools.wraps(run)
+        def wrapper(self, *args, **kwargs):
+            return enforce_budget(stage, getattr(self, "name", run.__qualname__), run(self, *args, **kwargs), reducer)
+        return wrapper
+    return decorate
@@ -0,0 +1,199 @@
+import gzip
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from threat_modeling.instrumentation import cache_result, traced
+from threat_modeling.tools.metadata_cache import atomic_write_bytes
+
+ARTIFACT_CACHE_DIR = os.environ.get("ARTIFACT_CACHE_DIR", ".artifact_cache")
+ARTIFACT_CACHE_ENABLED = os.environ.get("ARTIFACT_CACHE", "on").lower() not in ("off", "false", "0")
+DEFAULT_MEMORY_BYTES = int(os.environ.get("ARTIFACT_CACHE_MEMORY_BYTES", str(64 * 1024 * 1024)))
+DEFAULT_DISK_BYTES = int(os.environ.get("ARTIFACT_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+# ----------------------------------------
+# 🔑 Content hashing
+# ----------------------------------------
+
+_digests = {}
+_digests_lock = threading.Lock()
+
+
+def file_digest(path):
+    """
+    SHA-256 of a file's content. Memoized on (path, size, mtime), so repeated
+    calls for an unchanged file only cost a stat.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+    with _digests_lock:
+        digest = _digests.get(memo_key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+                sha.update(block)
+        digest = sha.hexdigest()
+        with _digests_lock:
+            _digests[memo_key] = digest
+    return digest
+
+
+# ----------------------------------------
+# 🗃️ Parsed-artifact cache
+# ----------------------------------------
+
+class ArtifactCache:
+    """
+    Cache for parsed input files (PDF page text, encoded images, draw.io models).
+
+    Entries are keyed on the artifact kind, the parser version and the file's
+    content hash (plus any parameters that change the result), so edits to a
+    file or to a parser never return stale data. A bounded in-memory LRU sits
+    in front of gzip-compressed JSON files on disk, which are evicted oldest
+    access first once the disk budget is exceeded.
+    """
+
+    def __init__(self, cache_dir=ARTIFACT_CACHE_DIR, memory_bytes=DEFAULT_MEMORY_BYTES, disk_bytes=DEFAULT_DISK_BYTES):
+        self.cache_dir = cache_dir
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (value, size)
+        self._memory_total = 0
+        self._disk_total = None  # measured lazily on first write
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.writes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(kind, version, digest, params=None):
+        material = json.dumps([kind, version, digest, params or {}], sort_keys=True)
+        return f"{kind}_{hashlib.sha256(material.encode()).hexdigest()}"
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.json.gz")
+
+    @traced("cache", "artifact_cache.get", cache_result)
+    def get(self, kind, version, digest, params=None):
+        key = self.make_key(kind, version, digest, params)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return self._memory[key][0]
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                payload = gzip.decompress(f.read())
+            value = json.loads(payload)
+            os.utime(path)  # mtime doubles as last-access time for disk eviction
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            return None
+        with self._lock:
+            self.disk_hits += 1
+            self._remember(key, value, len(payload))
+        return value
+
+    def put(self, kind, version, digest, value, params=None):
+        key = self.make_key(kind, version, digest, params)
+        payload = json.dumps(value).encode()
+        compressed = gzip.compress(payload, compresslevel=5)
+        path = self._path(key)
+        try:
+            previous = os.path.getsize(path)
+        except OSError:
+            previous = 0
+        atomic_write_bytes(path, compressed)
+        with self._lock:
+            self.writes += 1
+            self._remember(key, value, len(payload))
+            if self._disk_total is None:
+                self._disk_total = self._measure_disk()
+            else:
+                self._disk_total += len(compressed) - previous
+            if self._disk_total > self.disk_bytes:
+                self._evict_disk()
+
+    def _remember(self, key, value, size):
+        if size > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_total -= self._memory.pop(key)[1]
+        self._memory[key] = (value, size)
+        self._memory_total += size
+        while self._memory_total > self.memory_bytes:
+            _, (_, evicted_size) = self._memory.popitem(last=False)
+            self._memory_total -= evicted_size
+
+    def _entries(self):
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".json.gz"):
+                continue
+            try:
+                stat = os.stat(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, name))
+        return entries
+
+    def _measure_disk(self):
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict_disk(self):
+        entries = sorted(self._entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in entries:
+            if total <= self.disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except OSError:
+                continue
+            total -= size
+            self.evictions += 1
+        self._disk_total = total
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 3) if lookups else 0.0,
+                "evictions": self.evictions,
+                "writes": self.writes,
+                "memory_entries": len(self._memory),
+                "memory_bytes": self._memory_total,
+            }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_artifact_cache():
+    """Return the process-wide ArtifactCache, or None when ARTIFACT_CACHE=off."""
+    global _cache
+    if not ARTIFACT_CACHE_ENABLED:
+        return None
+    with _cache_lock:
+        if _cache is None:
+            _cache = ArtifactCache()
+        return _cache
+
+
+def log_artifact_cache_stats():
+    if _cache is not None:
+        print(f"[INFO] [ArtifactCache] {_cache.stats()}")
@@ -1,9 +1,13 @@
-import csv
-import io
 import json
-from typing import List
+from typing import Any, Dict, List, Optional, Type, Union
 from pydantic import BaseModel, ValidationError, Field
 from crewai.tools import BaseTool
+from threat_modeling.instrumentation import traced
+from threat_modeling.incremental import commit_baseline, incremental_enabled, load_diff, prior_rows_to_keep
+from threat_modeling.stride_rules import load_findings
+from threat_modeling.dedup import ThreatDeduplicator, load_summary
+from threat_modeling.tools.risk_writers import iter_risk_records, open_writers
+from threat_modeling.tools.tool_args import ToolArgs
 
 
 # ----------------------------------------
@@ -19,6 +23,16 @@ class RiskItem(BaseModel):
     mitigation: str = Field(..., description="Recommended mitigation strategy")
 
 
+class CSVRiskExporterArgs(ToolArgs):
+    payload_field = "risks_json"
+
+    # Required, so crewai retries with the raw arguments when the LLM names the payload differently
+    risks_json: Union[List[Any], Dict[str, Any], str] = Field(
+        ...,
+        description="JSON array of threat objects (or JSON Lines text, or a path to a .json/.jsonl file)",
+    )
+
+
 # ----------------------------------------
 # 🧠 CSV Exporter Tool with validation
 # ----------------------------------------
@@ -26,11 +40,23 @@ class RiskItem(BaseModel):
 class CSVRiskExporterTool(BaseTool):
     name: str = "Threat Model CSV Exporter"
     description: str = (
-        "Takes structured threat data and outputs a CSV string for use by penetration testing teams. "
-        "Input must be a JSON array of threats with keys: threat, asset, category, likelihood, impact, mitigation."
+        "Takes structured threat data and writes the threat model CSV (plus any configured JSONL/Parquet outputs) "
+        "for use by penetration testing teams. Input must be a JSON array (or JSON Lines) of threats with keys: "
+        "threat, asset, category, likelihood, impact, mitigation, or the path to a .json/.jsonl file containing them. "
+        "Returns a short summary with the row count, output paths and SHA-256 checksums."
     )
+    # Output path; when unset, CSV_PATH from the environment is used
+    csv_path: Optional[str] = None
+    # Project whose summary the exported model covers (falls back to PROJECT_ID)
+    project_id: Optional[str] = None
+    # Merge prior rows for unchanged assets (falls back to INCREMENTAL_MODELING)
+    incremental: Optional[bool] = None
+    # Extra output formats next to the CSV ("jsonl", "parquet"); falls back to EXPORT_FORMATS
+    formats: Optional[List[str]] = None
+    args_schema: Type[BaseModel] = CSVRiskExporterArgs
 
-    def _run(self, risks_json: str = "", **kwargs) -> str:
+    @traced("tool")
+    def _run(self, risks_json: Union[List[Any], Dict[str, Any], str] = "", **kwargs) -> str:
         import os
         from dotenv import load_dotenv
         load_dotenv()
@@ -39,11 +65,12 @@ class CSVRiskExporterTool(BaseTool):
             risks_json = kwargs.get("risks_json") or ""
         if not risks_json:
             risks_json = os.environ.get("RISKS_JSON", "")
-        csv_path = os.environ.get("CSV_PATH", "threat_model.csv")
+        csv_path = self.csv_path or os.environ.get("CSV_PATH", "threat_model.csv")
         print(f"[DEBUG] [CSVRiskExporterTool] Using csv_path: {csv_path}")
         """
         Expected Input:
-        JSON string of the form:
+        A list of threat objects (passed through from the LLM's arguments without
+        re-serialization) or a JSON string of the form:
         [
           {
             "threat": "Unauthorized access to storage bucket",
@@ -56,26 +83,67 @@ class CSVRiskExporterTool(BaseTool):
           ...
         ]
 
+        JSON Lines (one threat object per line) or a path to a .json/.jsonl file are also accepted.
+
         Output:
-        CSV string with header row and one row per risk.
+        JSON summary: {"rows", "model_rows", "rule_findings", "prior_rows", "duplicates", "duplicates_report",
+        "outputs": [{"format", "path", "rows", "bytes", "sha256"}, ...]}
         """
-        try:
-            parsed = json.loads(risks_json)
-            risks: List[RiskItem] = [RiskItem(**item) for item in parsed]
+        project_id = self.project_id or os.environ.get("PROJECT_ID")
+        incremental = self.incremental if self.incremental is not None else incremental_enabled()
+        writers = []
+        # Canonicalizes assets and enums, and collapses exact and near-duplicate threats across shards and sources
+        dedup = ThreatDeduplicator(load_summary(project_id))
+        counts = {"model_rows": 0, "rule_findings": 0, "prior_rows": 0}
 
-            output = io.StringIO()
-            writer = csv.DictWriter(output, fieldnames=["threat", "asset", "category", "likelihood", "impact", "mitigation"])
-            writer.writeheader()
+        def write_unique(row):
+            row = dedup.add(row)
+            if row is None:
+                return False
+            for writer in writers:
+                writer.write(row)
+            return True
 
-            for item in risks:
-                writer.writerow(item.dict())
+        try:
+            writers = open_writers(csv_path, self.formats)
+            # Validate and write one threat at a time; the input is never materialized as a list
+            for item in iter_risk_records(risks_json):
+                if not isinstance(item, dict):
+                    raise ValueError(f"Expected a JSON object per threat, got: {json.dumps(item)[:200]}")
+                counts["model_rows"] += write_unique(RiskItem(**item).model_dump())
 
-            csv_content = output.getvalue()
-            # Write to file at csv_path
-            with open(csv_path, "w") as f:
-                f.write(csv_content)
+            if project_id:
+                # Findings from the deterministic rule pre-pass are always part of the model
+                counts["rule_findings"] = sum(write_unique(RiskItem(**f).model_dump()) for f in load_findings(project_id))
+                print(f"[INFO] [CSVRiskExporterTool] Merged {counts['rule_findings']} rule-based findings")
+            if incremental and project_id:
+                # Carry over threats for assets that did not change since the last model
+                # (read from the previous report, which is only replaced on commit)
+                counts["prior_rows"] = sum(write_unique(row) for row in prior_rows_to_keep(csv_path, load_diff(project_id)))
+                print(f"[INFO] [CSVRiskExporterTool] Merged {counts['prior_rows']} prior rows for unchanged assets")
 
-            return csv_content
+            outputs = [writer.commit() for writer in writers]
+            commit_baseline(project_id)
+            duplicates_path = dedup.write_report(f"{os.path.splitext(csv_path)[0]}_duplicates.json")
+            print(f"[INFO] [CSVRiskExporterTool] Wrote {outputs[0]['rows']} rows to {', '.join(o['path'] for o in outputs)}")
+            print(
+                f"[INFO] [CSVRiskExporterTool] Collapsed {dedup.stats['exact_duplicates']} exact and "
+                f"{dedup.stats['near_duplicates']} near-duplicate threats (report: {duplicates_path})"
+            )
+            # A short receipt instead of the report itself, so large models never flow back into the LLM context
+            return json.dumps({
+                "rows": outputs[0]["rows"],
+                **counts,
+                "duplicates": dedup.collapsed,
+                "duplicates_report": duplicates_path,
+                "outputs": outputs,
+            })
 
-        except (json.JSONDecodeError, ValidationError) as e:
+        except (json.JSONDecodeError, ValidationError, ValueError, TypeError) as e:
+            for writer in writers:
+                writer.abort()
             return f"[ERROR] Invalid input: {str(e)}"
+        except Exception as e:
+            for writer in writers:
+                writer.abort()
+            return f"[ERROR] Export failed: {str(e)}"
@@ -0,0 +1,145 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image
+
+from threat_modeling.tools.artifact_cache import file_digest, get_artifact_cache
+
+try:
+    import pytesseract
+except ImportError:  # optional at runtime; OCR is skipped without it
+    pytesseract = None
+
+# off | supplement (labels alongside the image) | replace (labels instead of the image)
+DEFAULT_OCR_MODE = os.environ.get("IMAGE_OCR", "supplement").lower()
+DEFAULT_OCR_LANG = os.environ.get("IMAGE_OCR_LANG", "eng")
+DEFAULT_OCR_MIN_CONFIDENCE = int(os.environ.get("IMAGE_OCR_MIN_CONFIDENCE", "60"))
+# In replace mode the image is still sent when OCR finds fewer labels than this
+DEFAULT_OCR_MIN_LABELS = int(os.environ.get("IMAGE_OCR_MIN_LABELS", "5"))
+DEFAULT_OCR_WORKERS = int(os.environ.get("IMAGE_OCR_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Small images are upscaled before OCR; Tesseract reads ~10px text poorly
+OCR_MIN_SIDE = 1600
+# Bump when preprocessing or label grouping changes, so cached labels are not reused
+OCR_VERSION = 1
+# OCR runs inside the concurrent image extraction task; forking that multithreaded
+# process can hand a worker a lock another thread held, so workers are spawned
+WORKER_CONTEXT = multiprocessing.get_context("spawn")
+
+_available = None
+
+
+def ocr_available():
+    """True when pytesseract is installed and the tesseract binary can be run."""
+    global _available
+    if _available is None:
+        if pytesseract is None:
+            _available = False
+        else:
+            try:
+                pytesseract.get_tesseract_version()
+                _available = True
+            except Exception:
+                _available = False
+        if not _available:
+            print("[WARN] [DiagramOCR] Tesseract is not available; diagrams are sent without OCR labels")
+    return _available
+
+
+# ----------------------------------------
+# 🔤 Label extraction
+# ----------------------------------------
+
+def group_words(data, min_confidence=DEFAULT_OCR_MIN_CONFIDENCE, scale=1.0):
+    """
+    Merge Tesseract word results (image_to_data dict) into line labels:
+    [{"text", "box": [left, top, right, bottom], "confidence"}, ...] in reading order.
+    """
+    lines = {}
+    for i, word in enumerate(data["text"]):
+        word = (word or "").strip()
+        confidence = float(data["conf"][i])
+        if not word or confidence < min_confidence:
+            continue
+        key = (data["block_num"][i], data["par_num"][i], data["line_num"][i])
+        left, top = data["left"][i], data["top"][i]
+        right, bottom = left + data["width"][i], top + data["height"][i]
+        line = lines.get(key)
+        if line is None:
+            lines[key] = {"words": [word], "box": [left, top, right, bottom], "confidences": [confidence]}
+            continue
+        line["words"].append(word)
+        line["confidences"].append(confidence)
+        box = line["box"]
+        line["box"] = [min(box[0], left), min(box[1], top), max(box[2], right), max(box[3], bottom)]
+
+    labels = []
+    for line in lines.values():
+        labels.append({
+            "text": " ".join(line["words"]),
+            "box": [round(v / scale) for v in line["box"]],
+            "confidence": round(sum(line["confidences"]) / len(line["confidences"])),
+        })
+    labels.sort(key=lambda label: (label["box"][1], label["box"][0]))
+    return labels
+
+
+def ocr_labels(image_path, lang=DEFAULT_OCR_LANG, min_confidence=DEFAULT_OCR_MIN_CONFIDENCE):
+    """Run Tesseract on one diagram and return its line labels with boxes in source pixels."""
+    with Image.open(image_path) as image:
+        gray = image.convert("L")
+    scale = 1.0
+    if max(gray.size) < OCR_MIN_SIDE:
+        scale = OCR_MIN_SIDE / max(gray.size)
+        gray = gray.resize((round(gray.width * scale), round(gray.height * scale)), Image.LANCZOS)
+    # psm 11: sparse text, which suits labels scattered across a diagram
+    data = pytesseract.image_to_data(gray, lang=lang, config="--psm 11", output_type=pytesseract.Output.DICT)
+    return group_words(data, min_confidence, scale)
+
+
+def _ocr_worker(args):
+    image_path, lang, min_confidence = args
+    try:
+        return ocr_labels(image_path, lang, min_confidence), None
+    except Exception as e:
+        return None, str(e)
+
+
+def ocr_many(image_paths, workers=DEFAULT_OCR_WORKERS, lang=DEFAULT_OCR_LANG, min_confidence=DEFAULT_OCR_MIN_CONFIDENCE):
+    """
+    OCR several diagrams, in a process pool when there is more than one, using
+    cached labels for files already seen. Returns {path: labels}; a diagram that
+    fails OCR maps to None.
+    """
+    if not image_paths or not ocr_available():
+        return {path: None for path in image_paths}
+
+    cache = get_artifact_cache()
+    settings = {"lang": lang, "min_confidence": min_confidence}
+    results, pending = {}, []
+    for path in image_paths:
+        cached = cache.get("ocr", OCR_VERSION, file_digest(path), settings) if cache else None
+        if cached is None:
+            pending.append(path)
+        else:
+            results[path] = cached
+
+    jobs = [(path, lang, min_confidence) for path in pending]
+    if len(jobs) > 1 and workers > 1:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs)), mp_context=WORKER_CONTEXT) as pool:
+            outcomes = list(pool.map(_ocr_worker, jobs))
+    else:
+        outcomes = [_ocr_worker(job) for job in jobs]
+
+    for path, (labels, error) in zip(pending, outcomes):
+        if error:
+            print(f"[WARN] [DiagramOCR] OCR failed for {path}: {error}")
+        elif cache:
+            cache.put("ocr", OCR_VERSION, file_digest(path), labels, settings)
+        results[path] = labels
+    return results
+
+
+def format_labels(labels):
+    """Compact one-line-per-label text: 'Cloud Run api @ 120,80,310,104'."""
+    return "\n".join(f"{label['text']} @ {','.join(str(v) for v in label['box'])}" for label in labels)
@@ -1,20 +1,327 @@
 import os
 import json
+import base64
+import html
+import re
+import zlib
+from urllib.parse import unquote_to_bytes
 from pydantic import BaseModel, ValidationError, Field
+from typing import Type
 from crewai.tools import BaseTool
 from dotenv import load_dotenv
 import xml.etree.ElementTree as ET
+from threat_modeling.tools.artifact_cache import file_digest, get_artifact_cache
+from threat_modeling.instrumentation import traced
+from threat_modeling.token_budget import drop_list_items, metered
+from threat_modeling.tools.tool_args import ToolArgs
+
+# Bump when parsing or the graph layout changes, so cached graphs are not reused
+DRAWIO_PARSER_VERSION = 2
+
+# Container labels/styles that usually mark a trust boundary
+BOUNDARY_PATTERN = re.compile(
+    r"boundary|perimeter|vpc|subnet|network|zone|dmz|trust|project|internet|external|on-?prem",
+    re.IGNORECASE,
+)
+CONTAINER_STYLES = ("container=1", "swimlane", "group")
+TAG_PATTERN = re.compile(r"<[^>]+>")
+WRAPPER_TAGS = ("UserObject", "object")
+READ_CHUNK = 64 * 1024
+
+
+# ----------------------------------------
+# 📦 Pydantic model for input validation
+# ----------------------------------------
 
 class DrawioReaderInput(BaseModel):
     file_path: str = Field(..., description="Absolute or relative path to the input .drawio file")
 
+
+class DrawioReaderArgs(ToolArgs):
+    payload_field = "file_path"
+
+    file_path: str = Field("", description="Absolute or relative path to the input .drawio file (defaults to DRAWIO_PATH)")
+
+
+# ----------------------------------------
+# 🌊 Streaming cell reader
+# ----------------------------------------
+
+def iter_file_chunks(file_path):
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(READ_CHUNK), b""):
+            yield chunk
+
+
+def iter_decompressed_diagram(text):
+    """
+    Decode a compressed <diagram> payload (base64 of raw deflate of URI-encoded XML)
+    into XML bytes, a bounded chunk at a time.
+    """
+    inflater = zlib.decompressobj(-15)
+    pending = base64.b64decode(text)
+    carry = b""
+    while pending:
+        chunk = carry + inflater.decompress(pending, READ_CHUNK)
+        pending = inflater.unconsumed_tail
+        # Keep a %XX escape that straddles the chunk boundary for the next round
+        cut = chunk.rfind(b"%", max(0, len(chunk) - 2))
+        chunk, carry = (chunk[:cut], chunk[cut:]) if cut != -1 else (chunk, b"")
+        yield unquote_to_bytes(chunk)
+    yield unquote_to_bytes(carry + inflater.flush())
+
+
+def _iter_xml_events(chunks):
+    parser = ET.XMLPullParser(events=("start", "end"))
+    for chunk in chunks:
+        parser.feed(chunk)
+        yield from parser.read_events()
+    parser.close()
+    yield from parser.read_events()
+
+
+def iter_cells(chunks, page_name=None):
+    """
+    Stream ("page", name) and ("cell", attributes) events from .drawio XML bytes
+    (an iterable of chunks), in document order.
+
+    Parsed elements are dropped as soon as they are read and compressed pages are
+    inflated and parsed incrementally, so memory stays bounded regardless of the
+    document size. Labels of <UserObject>/<object> wrappers are applied to the
+    mxCell they contain. `page_name` names a bare <mxGraphModel> document.
+    """
+    stack, wrapper = [], None
+    for event, elem in _iter_xml_events(chunks):
+        tag = elem.tag
+        if event == "start":
+            stack.append(elem)
+            if tag == "diagram":
+                yield "page", elem.get("name") or elem.get("id") or "Page"
+            elif tag == "mxGraphModel" and page_name is not None and len(stack) == 1:
+                yield "page", page_name
+            elif tag in WRAPPER_TAGS:
+                wrapper = dict(elem.attrib)
+            continue
+
+        stack.pop()
+        if tag == "mxCell":
+            attributes = dict(elem.attrib)
+            if wrapper is not None:
+                attributes["id"] = wrapper.get("id", attributes.get("id", ""))
+                attributes["value"] = wrapper.get("label", attributes.get("value", ""))
+            yield "cell", attributes
+        elif tag in WRAPPER_TAGS:
+            wrapper = None
+        elif tag == "diagram":
+            text = (elem.text or "").strip()
+            if text and len(elem) == 0:
+                for item in iter_cells(iter_decompressed_diagram(text)):
+                    if item[0] == "cell":
+                        yield item
+        else:
+            continue
+        # Everything under the parent has been read; drop it
+        if stack:
+            del stack[-1][:]
+
+
+# ----------------------------------------
+# 🕸️ Graph model
+# ----------------------------------------
+
+def clean_label(value):
+    """Strip draw.io HTML labels down to plain text."""
+    if not value:
+        return ""
+    text = TAG_PATTERN.sub(" ", value.replace("<br>", " ").replace("<br/>", " "))
+    return " ".join(html.unescape(text).split())
+
+
+def style_kind(style):
+    """Short shape name from a cell style, e.g. 'gcp2.cloud_run' or 'swimlane'."""
+    if not style:
+        return ""
+    parts = [p for p in style.split(";") if p]
+    for part in parts:
+        if part.startswith("shape="):
+            return part[len("shape="):].replace("mxgraph.", "")
+    for part in parts:
+        if part.startswith("image="):
+            return os.path.splitext(os.path.basename(part))[0]
+    if "=" not in parts[0]:
+        return parts[0]
+    return ""
+
+
+class DiagramGraphBuilder:
+    """Accumulates cells page by page and reduces them to vertices, edges and containers."""
+
+    def __init__(self):
+        self.pages = []
+        self._cells = None
+        self._name = None
+
+    def start_page(self, name):
+        self._finish_page()
+        self._name = name
+        self._cells = {}
+
+    def add_cell(self, attributes):
+        if self._cells is None:
+            self.start_page("Page-1")
+        cell_id = attributes.get("id")
+        if not cell_id:
+            return
+        style = attributes.get("style", "")
+        # Compact tuple per cell: (label, kind, parent, vertex, edge, source, target, style)
+        self._cells[cell_id] = (
+            clean_label(attributes.get("value")),
+            style_kind(style),
+            attributes.get("parent"),
+            attributes.get("vertex") == "1",
+            attributes.get("edge") == "1",
+            attributes.get("source"),
+            attributes.get("target"),
+            style,
+        )
+
+    def _finish_page(self):
+        if self._cells is not None:
+            self.pages.append(self._build_page(self._name, self._cells))
+        self._cells = None
+
+    def build(self):
+        self._finish_page()
+        return self.pages
+
+    @staticmethod
+    def _build_page(name, cells):
+        # Layers are the cells directly under the root cell (the one without a parent)
+        roots = {cid for cid, c in cells.items() if not c[2]}
+        layers = {cid for cid, c in cells.items() if c[2] in roots}
+        edge_ids = {cid for cid, c in cells.items() if c[4]}
+
+        parents_with_children = {c[2] for c in cells.values() if c[3] and c[2] not in layers and c[2] not in roots}
+        containers = {
+            cid for cid, c in cells.items()
+            if c[3] and cid not in layers
+            and (cid in parents_with_children or any(s in c[7] for s in CONTAINER_STYLES))
+        }
+
+        # Edge labels are vertices parented to an edge
+        edge_labels = {}
+        for cid, c in cells.items():
+            if c[3] and c[2] in edge_ids and c[0]:
+                edge_labels.setdefault(c[2], []).append(c[0])
+
+        endpoints = set()
+        edges, dangling = [], 0
+        for cid, c in cells.items():
+            if not c[4]:
+                continue
+            if not c[5] or not c[6]:
+                dangling += 1
+                continue
+            endpoints.update((c[5], c[6]))
+            edge = {"source": c[5], "target": c[6]}
+            label = " ".join(filter(None, [c[0]] + edge_labels.get(cid, [])))
+            if label:
+                edge["label"] = label
+            edges.append(edge)
+
+        def container_of(cell_id):
+            parent = cells.get(cell_id, (None,) * 8)[2]
+            seen = set()
+            while parent and parent not in containers and parent in cells and parent not in seen:
+                seen.add(parent)
+                parent = cells[parent][2]
+            return parent if parent in containers else None
+
+        vertices, children = [], {}
+        for cid, c in cells.items():
+            if not c[3] or cid in layers or c[2] in edge_ids:
+                continue
+            if not c[0] and cid not in containers and cid not in endpoints:
+                continue  # unlabeled decoration
+            parent = container_of(cid)
+            if parent:
+                children.setdefault(parent, []).append(cid)
+            if cid in containers:
+                continue
+            vertex = {"id": cid, "label": c[0]}
+            if c[1]:
+                vertex["kind"] = c[1]
+            if parent:
+                vertex["parent"] = parent
+            vertices.append(vertex)
+
+        container_list = []
+        for cid in containers:
+            c = cells[cid]
+            container = {"id": cid, "label": c[0]}
+            if c[1]:
+                container["kind"] = c[1]
+            parent = container_of(cid)
+            if parent:
+                container["parent"] = parent
+            container["trust_boundary"] = bool(
+                BOUNDARY_PATTERN.search(c[0]) or BOUNDARY_PATTERN.search(c[1]) or "dashed=1" in c[7]
+            )
+            container["children"] = children.get(cid, [])
+            container_list.append(container)
+
+        return {
+            "name": name,
+            "vertices": vertices,
+            "edges": edges,
+            "containers": container_list,
+            "stats": {
+                "cells": len(cells),
+                "vertices": len(vertices),
+                "edges": len(edges),
+                "containers": len(container_list),
+                "dangling_edges": dangling,
+            },
+        }
+
+
+def parse_drawio(file_path):
+    """Stream a .drawio file into a list of page graphs."""
+    builder = DiagramGraphBuilder()
+    for kind, value in iter_cells(iter_file_chunks(file_path), page_name="Page-1"):
+        if kind == "page":
+            builder.start_page(value)
+        else:
+            builder.add_cell(value)
+    return builder.build()
+
+
+def load_drawio_graph(file_path):
+    """parse_drawio with the parsed-artifact cache in front of it."""
+    cache = get_artifact_cache()
+    digest = file_digest(file_path) if cache else None
+    pages = cache.get("drawio_graph", DRAWIO_PARSER_VERSION, digest) if cache else None
+    if pages is None:
+        pages = parse_drawio(file_path)
+        if cache:
+            cache.put("drawio_graph", DRAWIO_PARSER_VERSION, digest, pages)
+    return pages
+
+
+# ----------------------------------------
+# 🧠 DrawioReaderTool definition
+# ----------------------------------------
+
 class DrawioReaderTool(BaseTool):
     name: str = "Draw.io Architecture Diagram Interpreter"
     description: str = (
         "Extracts structure and text from a .drawio diagram and sends it to an LLM for structured analysis. "
         "Useful for interpreting system designs, architecture diagrams, or threat assessments."
     )
+    args_schema: Type[BaseModel] = DrawioReaderArgs
 
+    @traced("tool")
+    @metered("drawio", drop_list_items("pages"))
     def _run(self, file_path: str = "", **kwargs) -> str:
         load_dotenv()
         if not file_path:
@@ -26,30 +333,27 @@ class DrawioReaderTool(BaseTool):
             validated = DrawioReaderInput(file_path=file_path)
             if not os.path.exists(validated.file_path) or not validated.file_path.endswith(".drawio"):
                 return f"[ERROR] File not found or invalid format: {validated.file_path}"
+            # Stream pages into a graph of vertices, edges and containers (cached by content hash)
             try:
-                tree = ET.parse(validated.file_path)
-                root = tree.getroot()
-            except Exception as e:
+                pages = load_drawio_graph(validated.file_path)
+            except (ET.ParseError, zlib.error, ValueError) as e:
                 return f"[ERROR] Could not parse .drawio file: {str(e)}"
-            # Extract shapes, connectors, and text
-            cells = []
-            for cell in root.iter("mxCell"):
-                cell_data = {k: cell.attrib.get(k, "") for k in cell.attrib}
-                value = cell.attrib.get("value", "")
-                if value:
-                    cell_data["text"] = value
-                cells.append(cell_data)
+            for page in pages:
+                print(f"[INFO] [DrawioReaderTool] Page '{page['name']}': {page['stats']}")
             # Step 4: Return structured LLM prompt
             return json.dumps({
                 "type": "diagram_prompt",
-                "cells": cells,
+                "pages": pages,
                 "instructions": (
                     "You are analyzing a Draw.io (.drawio) diagram related to cloud architecture or threat modeling. "
+                    "Each page is a graph: vertices are components (kind is the draw.io shape or icon), edges are "
+                    "connections from source to target vertex ids, and containers group vertices; containers marked "
+                    "trust_boundary are likely network or trust boundaries. "
                     "Extract relevant components, security controls, service relationships, or identified threats. "
                     "If possible, align content to the STRIDE framework. "
                     "Return a structured summary of services, risks, and mitigation recommendations."
                 )
-            })
+            }, separators=(",", ":"))
         except ValidationError as ve:
             return f"[ERROR] Input validation failed: {ve.json(indent=2)}"
         except Exception as e:
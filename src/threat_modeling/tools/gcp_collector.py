@@ -0,0 +1,192 @@
+import codecs
+import json
+import os
+import subprocess
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from threat_modeling.instrumentation import span
+from threat_modeling.tools.json_stream import READ_CHUNK, iter_json_records
+
+# ----------------------------------------
+# ⚙️ Collection engine defaults
+# ----------------------------------------
+
+DEFAULT_MAX_WORKERS = int(os.environ.get("GCP_MAX_WORKERS", "6"))
+DEFAULT_COMMAND_TIMEOUT = float(os.environ.get("GCP_COMMAND_TIMEOUT", "120"))
+
+# BigQuery table listing
+DEFAULT_BQ_MAX_WORKERS = int(os.environ.get("BQ_MAX_WORKERS", "8"))
+DEFAULT_BQ_MAX_RESULTS = int(os.environ.get("BQ_MAX_RESULTS", "100000"))  # --max_results of one dataset listing
+DEFAULT_BQ_MAX_TABLES = int(os.environ.get("BQ_MAX_TABLES_PER_DATASET", "0"))  # 0 = no cap
+DEFAULT_BQ_TABLE_SAMPLING = os.environ.get("BQ_TABLE_SAMPLING", "head")  # head | spread
+
+
+# Optional process-wide cap on concurrent gcloud/bq subprocesses. Batch mode sets
+# this so that many projects extracting at once share one pool of process slots.
+_process_slots = None
+
+
+def set_process_limit(limit):
+    """Cap concurrent gcloud/bq subprocesses across all tools in this process (None = no cap)."""
+    global _process_slots
+    _process_slots = threading.BoundedSemaphore(limit) if limit and limit > 0 else None
+
+
+# ----------------------------------------
+# 🧵 Bounded concurrent fetcher execution
+# ----------------------------------------
+
+def run_command(command, timeout=None):
+    """
+    Run a gcloud/bq command and return the CompletedProcess.
+
+    Raises subprocess.CalledProcessError on a non-zero exit and
+    subprocess.TimeoutExpired when the command exceeds `timeout` seconds.
+    The executable is resolved from PATH, so a fake `gcloud`/`bq` placed
+    first on PATH is picked up for testing.
+    """
+    slots = _process_slots
+    if slots is not None:
+        slots.acquire()
+    try:
+        # Named after the command group (e.g. "gcloud compute instances"); the span excludes slot waits
+        with span("subprocess", " ".join(c for c in command[:3] if not c.startswith("-"))) as current:
+            completed = subprocess.run(
+                command,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                check=True,
+                text=True,
+                timeout=timeout or DEFAULT_COMMAND_TIMEOUT,
+            )
+            if current is not None:
+                current.set(bytes_out=len(completed.stdout), stderr_bytes=len(completed.stderr))
+            return completed
+    finally:
+        if slots is not None:
+            slots.release()
+
+
+def stream_records(command, timeout=None):
+    """
+    Run a gcloud/bq command and yield the records of its JSON output (the
+    items of a top-level array, or a single top-level object) as they are
+    decoded, so callers can keep only what they need of a large listing.
+
+    Raises the same errors as run_command once the output ends: CalledProcessError
+    on a non-zero exit and TimeoutExpired when the command exceeds `timeout`
+    seconds (it is killed then). Output that is not JSON raises JSONDecodeError.
+    """
+    timeout = timeout or DEFAULT_COMMAND_TIMEOUT
+    slots = _process_slots
+    if slots is not None:
+        slots.acquire()
+    try:
+        with span("subprocess", " ".join(c for c in command[:3] if not c.startswith("-"))) as current, \
+                tempfile.TemporaryFile() as stderr:
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=stderr)
+            timed_out = threading.Event()
+
+            def expire():
+                timed_out.set()
+                process.kill()
+
+            timer = threading.Timer(timeout, expire)
+            timer.daemon = True
+            timer.start()
+            counts = {"bytes_out": 0, "records": 0}
+
+            def chunks():
+                decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+                for block in iter(lambda: process.stdout.read1(READ_CHUNK), b""):
+                    counts["bytes_out"] += len(block)
+                    yield decoder.decode(block)
+                yield decoder.decode(b"", final=True)
+
+            def check_exit():
+                returncode = process.wait()
+                if timed_out.is_set():
+                    raise subprocess.TimeoutExpired(command, timeout)
+                if returncode:
+                    stderr.seek(0)
+                    raise subprocess.CalledProcessError(
+                        returncode, command, stderr=stderr.read().decode("utf-8", errors="replace"))
+
+            try:
+                try:
+                    for record in iter_json_records(chunks()):
+                        counts["records"] += 1
+                        yield record
+                except json.JSONDecodeError:
+                    # A failed or killed command explains a truncated document better than the parse error
+                    check_exit()
+                    raise
+                check_exit()
+            finally:
+                timer.cancel()
+                if process.poll() is None:
+                    process.kill()
+                    process.wait()
+                process.stdout.close()
+                if current is not None:
+                    current.set(stderr_bytes=stderr.seek(0, os.SEEK_END), **counts)
+    finally:
+        if slots is not None:
+            slots.release()
+
+
+def collect_concurrently(fetchers, max_workers=None):
+    """
+    Run a mapping of {name: zero-arg callable} on a bounded thread pool.
+
+    Results are returned as a dict in the same key order as `fetchers`, so
+    the output is identical to calling each fetcher one after another.
+    Exceptions raised by a fetcher propagate to the caller, as they would
+    in the sequential path.
+    """
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    if max_workers <= 1 or len(fetchers) <= 1:
+        return {name: fetch() for name, fetch in fetchers.items()}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(fetchers))) as pool:
+        futures = {name: pool.submit(fetch) for name, fetch in fetchers.items()}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def map_concurrently(function, items, max_workers=None):
+    """
+    Apply `function` to each item on a bounded thread pool.
+
+    Returns a list in the same order as `items`, regardless of which call
+    finishes first, so callers get deterministic output.
+    """
+    items = list(items)
+    max_workers = max_workers or DEFAULT_MAX_WORKERS
+    if max_workers <= 1 or len(items) <= 1:
+        return [function(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(items))) as pool:
+        return list(pool.map(function, items))
+
+
+# ----------------------------------------
+# 🎯 Table cap / sampling
+# ----------------------------------------
+
+def sample_items(items, limit, mode="head"):
+    """
+    Reduce `items` to at most `limit` entries.
+
+    - head:   keep the first `limit` items (bq returns tables sorted by id)
+    - spread: keep `limit` evenly spaced items across the whole listing
+
+    Both modes are deterministic. A limit of 0 or less keeps everything.
+    """
+    if not limit or limit <= 0 or len(items) <= limit:
+        return items
+    if mode == "spread":
+        step = len(items) / limit
+        return [items[int(i * step)] for i in range(limit)]
+    return items[:limit]
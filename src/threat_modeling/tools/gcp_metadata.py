@@ -0,0 +1,222 @@
+import subprocess
+import json
+import os
+from functools import partial
+from typing import Optional
+from pydantic import BaseModel, ValidationError, Field
+from threat_modeling.tools.gcp_collector import (
+    DEFAULT_BQ_MAX_TABLES,
+    DEFAULT_BQ_MAX_WORKERS,
+    DEFAULT_BQ_MAX_RESULTS,
+    DEFAULT_BQ_TABLE_SAMPLING,
+    DEFAULT_COMMAND_TIMEOUT,
+    DEFAULT_MAX_WORKERS,
+    collect_concurrently,
+    map_concurrently,
+    sample_items,
+    stream_records,
+)
+from threat_modeling.tools.metadata_cache import CACHE_DIR, atomic_write_bytes, get_metadata_cache
+from threat_modeling.incremental import IDENTITY_FIELDS, write_diff
+from threat_modeling.resource_types import get_resource_types
+from threat_modeling.stride_rules import write_findings
+from threat_modeling.flow_graph import write_flow_analysis
+
+# ----------------------------------------
+# 📦 Pydantic schema for input validation
+# ----------------------------------------
+
+
+class GCPMetadataInput(BaseModel):
+    project_id: str = Field(
+        ...,
+        description="GCP project ID to extract metadata from",
+        min_length=6,
+        max_length=30,
+        pattern=r"^[a-z][a-z0-9\-]{4,28}[a-z0-9]$",
+    )
+
+
+# Resource names listed per category when the summary is condensed to fit the token budget
+SUMMARY_SAMPLE_NAMES = 20
+
+
+def condense_summary(summary, budget):
+    """
+    Token-budget reducer: replace each resource list with its count and a sample
+    of names. The full summary stays in the cache, where the STRIDE stage reads it.
+    """
+    for category, field in IDENTITY_FIELDS.items():
+        records = summary.get(category)
+        if isinstance(records, list):
+            summary[category] = {
+                "count": len(records),
+                "sample": [r.get(field) for r in records[:SUMMARY_SAMPLE_NAMES] if isinstance(r, dict)],
+            }
+    summary["budget_note"] = (
+        f"Resource lists were condensed to counts and sample names to fit the {budget}-token budget; "
+        "the full summary is cached for the STRIDE stage"
+    )
+    return summary
+
+
+def _service_name(service):
+    return (service.get("config") or {}).get("name") if isinstance(service, dict) else None
+
+
+def _table_id(table):
+    return (table.get("tableReference") or {}).get("tableId") if isinstance(table, dict) else None
+
+
+# ----------------------------------------
+# 🧠 Collection, without the agent tool
+# ----------------------------------------
+
+
+class GCPMetadataCollector:
+    """
+    Collects a project's summary, caches it and derives the diff, rule findings and
+    flow analysis from it. GCPMetadataTool wraps it for agents; batch extraction uses
+    it directly, so collecting never imports crewai.
+    """
+
+    def __init__(
+        self,
+        drawio_path: Optional[str] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        command_timeout: float = DEFAULT_COMMAND_TIMEOUT,
+        bq_max_workers: int = DEFAULT_BQ_MAX_WORKERS,
+        bq_max_results: int = DEFAULT_BQ_MAX_RESULTS,
+        bq_max_tables_per_dataset: int = DEFAULT_BQ_MAX_TABLES,
+        bq_table_sampling: str = DEFAULT_BQ_TABLE_SAMPLING,
+    ):
+        # draw.io diagram merged into the flow analysis (falls back to DRAWIO_PATH)
+        self.drawio_path = drawio_path
+        # Collection engine settings (override via GCP_MAX_WORKERS / GCP_COMMAND_TIMEOUT)
+        self.max_workers = max_workers
+        self.command_timeout = command_timeout
+        # BigQuery table listing (BQ_MAX_WORKERS / BQ_MAX_RESULTS / BQ_MAX_TABLES_PER_DATASET / BQ_TABLE_SAMPLING)
+        self.bq_max_workers = bq_max_workers
+        self.bq_max_results = bq_max_results
+        self.bq_max_tables_per_dataset = bq_max_tables_per_dataset
+        self.bq_table_sampling = bq_table_sampling
+
+    def _fetch(self, project_id, cache, command, project, variant, silent=False):
+        """
+        Records of one listing passed through `project`, which returns what to
+        keep of each record (None drops it). The command's output is streamed,
+        so only the kept values are held, and that projection is what gets cached.
+        """
+        cached = cache.get(project_id, command, variant)
+        if cached is not None:
+            print(f"[INFO] [GCPMetadataTool] Loaded cached result for: {' '.join(command)}")
+            return cached
+        try:
+            records = [kept for kept in map(project, stream_records(command, timeout=self.command_timeout))
+                       if kept is not None]
+        except subprocess.CalledProcessError as e:
+            if not silent:
+                print(f"[WARN] Command failed: {' '.join(command)}")
+                print(e.stderr)
+            return None
+        except subprocess.TimeoutExpired:
+            if not silent:
+                print(f"[WARN] Command timed out after {self.command_timeout}s: {' '.join(command)}")
+            return None
+        except json.JSONDecodeError as e:
+            if not silent:
+                print(f"[ERROR] Failed to parse JSON from: {' '.join(command)}")
+                print(f"[DEBUG] {e}")
+            return None
+        cache.put(project_id, command, records, variant)
+        return records
+
+    def _enabled_services(self, project_id, cache):
+        # Per-run service index: fetched once, shared by every enablement check
+        command = ["gcloud", "services", "list", "--enabled", f"--project={project_id}", "--format=json"]
+        names = self._fetch(project_id, cache, command, _service_name, "services", silent=True)
+        return set(names or [])
+
+    def _collect(self, rtype, project_id, cache, enabled_services):
+        """Summary value of one resource type; empty when its API is disabled or the listing fails."""
+        if rtype.api and rtype.api not in enabled_services:
+            return rtype.empty()
+        records = self._fetch(project_id, cache, rtype.command(project_id), rtype.project, rtype.digest)
+        if records is None:
+            return rtype.empty()
+        if rtype.shape == "object":
+            return records[0] if records else rtype.empty()
+        return records
+
+    def _list_dataset_tables(self, project_id, cache, dataset_id):
+        # bq's JSON output carries no page token, so each dataset is listed with a single
+        # call: just past the cap when only the head is kept, else up to bq_max_results.
+        cap = self.bq_max_tables_per_dataset
+        head_only = cap > 0 and self.bq_table_sampling == "head"
+        limit = cap + 1 if head_only else max(self.bq_max_results, 1)
+        command = ["bq", "ls", "--project_id", project_id, "--dataset_id", dataset_id,
+                   f"--max_results={limit}", "--format=prettyjson"]
+        tables = self._fetch(project_id, cache, command, _table_id, "tableId", silent=True) or []
+        listing_full = not head_only and len(tables) >= limit
+        if listing_full:
+            print(f"[WARN] [GCPMetadataTool] Dataset {dataset_id} lists at least {limit} tables; raise BQ_MAX_RESULTS to see the rest")
+        sampled = sample_items(tables, cap, self.bq_table_sampling)
+        return sampled, listing_full or len(sampled) < len(tables)
+
+    def _expand_bigquery_tables(self, project_id, cache, datasets):
+        # Fan out the per-dataset listings; map_concurrently keeps dataset order
+        listings = map_concurrently(
+            lambda d: self._list_dataset_tables(project_id, cache, d["datasetId"]),
+            datasets,
+            max_workers=self.bq_max_workers,
+        )
+        for dataset, (tables, truncated) in zip(datasets, listings):
+            dataset["tables"] = tables
+            if truncated:
+                dataset["tablesTruncated"] = True
+        return datasets
+
+    def _collect_summary(self, project_id, cache):
+        enabled_services = self._enabled_services(project_id, cache)
+        # Resource types (config/resource_types.yaml) are independent, so collect them on a
+        # bounded worker pool. Results keep the spec's order, matching the sequential output.
+        resource_types = get_resource_types()
+        summary = collect_concurrently({
+            category: partial(self._collect, rtype, project_id, cache, enabled_services)
+            for category, rtype in resource_types.items()
+        }, max_workers=self.max_workers)
+        # Expansions fan out on their own pool after that one has finished, so at most
+        # max(max_workers, bq_max_workers) threads run at a time instead of nesting the pools
+        for category, rtype in resource_types.items():
+            if rtype.expand == "bigquery_tables" and summary[category]:
+                summary[category] = self._expand_bigquery_tables(project_id, cache, summary[category])
+        return summary
+
+    def collect(self, project_id) -> str:
+        """The project's summary as JSON, or an '[ERROR] ...' string if the project ID is invalid."""
+        try:
+            validated = GCPMetadataInput(project_id=project_id)
+            project_id = validated.project_id
+
+            cache = get_metadata_cache(CACHE_DIR)
+            try:
+                summary = self._collect_summary(project_id, cache)
+            finally:
+                # Index this run's cache writes once, even if collection failed part-way
+                cache.flush()
+
+            # Cache summary to file
+            summary_cache_path = os.path.join(CACHE_DIR, f"{project_id}_summary.json")
+            atomic_write_bytes(summary_cache_path, json.dumps(summary, indent=2).encode())
+            print(f"[INFO] [GCPMetadataTool] Wrote summarized metadata to {summary_cache_path}")
+            # Diff against the summary the last exported threat model was built from
+            write_diff(project_id, summary)
+            # Deterministic STRIDE pre-pass; the LLM only needs to add residual threats
+            write_findings(project_id, summary)
+            # Trust boundaries, internet-reachable paths and shared identities across the diagram and live resources
+            write_flow_analysis(project_id, summary, self.drawio_path)
+            print(f"[INFO] [GCPMetadataTool] Cache stats: {cache.stats()}")
+            return json.dumps(summary, indent=2)
+
+        except ValidationError as ve:
+            return f"[ERROR] Input validation failed: {ve.json(indent=2)}"
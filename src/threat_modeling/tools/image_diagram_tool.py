@@ -4,8 +4,199 @@ import os
 import base64
 import io
 from pydantic import BaseModel, ValidationError, Field
+from typing import Type
 from dotenv import load_dotenv
 import json
+from concurrent.futures import ThreadPoolExecutor
+from threat_modeling.tools.artifact_cache import file_digest, get_artifact_cache
+from threat_modeling.tools.diagram_ocr import (
+    DEFAULT_OCR_MIN_LABELS,
+    DEFAULT_OCR_MODE,
+    DEFAULT_OCR_WORKERS,
+    format_labels,
+    ocr_many,
+)
+from threat_modeling.instrumentation import traced
+from threat_modeling.token_budget import count_tokens, drop_list_items, metered
+from threat_modeling.tools.tool_args import ToolArgs
+
+load_dotenv()
+
+# Bump when image normalization/encoding changes, so cached encodings are not reused
+IMAGE_PIPELINE_VERSION = 2
+
+DEFAULT_IMAGE_MAX_SIDE = int(os.environ.get("IMAGE_MAX_SIDE", "2048"))
+DEFAULT_IMAGE_PASSTHROUGH_MAX_BYTES = int(os.environ.get("IMAGE_PASSTHROUGH_MAX_BYTES", str(4 * 1024 * 1024)))
+DEFAULT_IMAGE_JPEG_QUALITY = int(os.environ.get("IMAGE_JPEG_QUALITY", "85"))  # JPEG and WebP
+# Candidate encodings for re-encoded images; the smallest result wins
+DEFAULT_IMAGE_ENCODINGS = tuple(e.strip() for e in os.environ.get("IMAGE_ENCODINGS", "png,jpeg,webp").split(",") if e.strip())
+# Diagrams whose longest side exceeds this are also sent as overlapping full-resolution tiles
+DEFAULT_IMAGE_TILE_THRESHOLD = int(os.environ.get("IMAGE_TILE_THRESHOLD", "4096"))
+# Tiles carry the detail, so the overview sent alongside them can be smaller
+DEFAULT_IMAGE_OVERVIEW_MAX_SIDE = int(os.environ.get("IMAGE_OVERVIEW_MAX_SIDE", "1024"))
+DEFAULT_IMAGE_TILE_SIZE = int(os.environ.get("IMAGE_TILE_SIZE", "1536"))
+DEFAULT_IMAGE_TILE_OVERLAP = int(os.environ.get("IMAGE_TILE_OVERLAP", "128"))
+DEFAULT_IMAGE_MAX_TILES = int(os.environ.get("IMAGE_MAX_TILES", "16"))
+
+# Formats vision models accept as-is
+PASSTHROUGH_FORMATS = {"PNG": "image/png", "JPEG": "image/jpeg", "WEBP": "image/webp"}
+
+
+# ----------------------------------------
+# 🖼️ Image pipeline
+# ----------------------------------------
+
+def _flatten_rgb(image):
+    if image.mode in ("RGBA", "LA") or (image.mode == "P" and "transparency" in image.info):
+        rgb = Image.new("RGB", image.size, "white")
+        rgb.paste(image, mask=image.convert("RGBA").getchannel("A"))
+        return rgb
+    return image if image.mode == "RGB" else image.convert("RGB")
+
+
+def encode_cheapest(image, jpeg_quality=DEFAULT_IMAGE_JPEG_QUALITY, encodings=DEFAULT_IMAGE_ENCODINGS):
+    """
+    Encode in each allowed format and keep the smallest payload. PNG is palette-quantized
+    (diagrams rarely use more than 256 colours); screenshots and photos usually win as
+    JPEG or WebP.
+
+    Returns (media_type, encoded_bytes).
+    """
+    rgb = _flatten_rgb(image)
+    candidates = []
+    for encoding in encodings:
+        buffer = io.BytesIO()
+        if encoding == "png":
+            rgb.quantize(colors=256, dither=Image.Dither.NONE).save(buffer, format="PNG")
+        elif encoding == "jpeg":
+            rgb.save(buffer, format="JPEG", quality=jpeg_quality)
+        elif encoding == "webp":
+            rgb.save(buffer, format="WEBP", quality=jpeg_quality)
+        else:
+            continue
+        candidates.append((f"image/{encoding}", buffer.getvalue()))
+    if not candidates:
+        raise ValueError(f"No supported image encodings in {encodings}")
+    return min(candidates, key=lambda candidate: len(candidate[1]))
+
+
+def downscale(image, max_side):
+    """Resize so the longest side is at most `max_side` (aspect ratio kept; never upscales)."""
+    if max(image.size) <= max_side:
+        return image
+    scale = max_side / max(image.size)
+    return image.resize((max(1, round(image.width * scale)), max(1, round(image.height * scale))), Image.LANCZOS)
+
+
+def tile_starts(length, size, overlap):
+    """Start offsets of tiles covering `length` pixels; the last tile ends at the edge."""
+    if length <= size:
+        return [0]
+    step = max(1, size - overlap)
+    return list(range(0, length - size, step)) + [length - size]
+
+
+def split_tiles(image, size, overlap, max_tiles):
+    """
+    Overlapping `size` x `size` tiles covering the image, left to right, top to bottom.
+    If the grid would exceed `max_tiles`, the image is scaled down until it fits.
+
+    Returns [(box, tile_image), ...] with boxes in original image coordinates.
+    """
+    scale = 1.0
+    scaled = image
+    while True:
+        xs = tile_starts(scaled.width, size, overlap)
+        ys = tile_starts(scaled.height, size, overlap)
+        if len(xs) * len(ys) <= max_tiles:
+            break
+        scale *= 0.8
+        scaled = image.resize((round(image.width * scale), round(image.height * scale)), Image.LANCZOS)
+    tiles = []
+    for y in ys:
+        for x in xs:
+            crop = (x, y, min(x + size, scaled.width), min(y + size, scaled.height))
+            box = [round(v / scale) for v in crop]
+            tiles.append((box, scaled.crop(crop)))
+    return tiles
+
+
+def prepare_image(
+    image_path,
+    max_side=DEFAULT_IMAGE_MAX_SIDE,
+    passthrough_max_bytes=DEFAULT_IMAGE_PASSTHROUGH_MAX_BYTES,
+    jpeg_quality=DEFAULT_IMAGE_JPEG_QUALITY,
+    encodings=DEFAULT_IMAGE_ENCODINGS,
+    tile_threshold=DEFAULT_IMAGE_TILE_THRESHOLD,
+    overview_max_side=DEFAULT_IMAGE_OVERVIEW_MAX_SIDE,
+    tile_size=DEFAULT_IMAGE_TILE_SIZE,
+    tile_overlap=DEFAULT_IMAGE_TILE_OVERLAP,
+    max_tiles=DEFAULT_IMAGE_MAX_TILES,
+):
+    """
+    Turn an image file into the smallest payload a vision model can read:
+
+    - PNG/JPEG/WebP files within `max_side` and `passthrough_max_bytes` are sent as-is (no decode)
+    - anything else is downscaled to `max_side` and encoded in whichever of `encodings` is smallest
+    - images larger than `tile_threshold` are sent as an `overview_max_side` overview plus
+      overlapping full-resolution tiles, so small labels stay legible
+    """
+    file_size = os.path.getsize(image_path)
+    with Image.open(image_path) as image:  # reads the header only until pixels are needed
+        source = {"format": image.format, "width": image.width, "height": image.height, "bytes": file_size}
+        if (
+            image.format in PASSTHROUGH_FORMATS
+            and max(image.size) <= max_side
+            and file_size <= passthrough_max_bytes
+        ):
+            with open(image_path, "rb") as f:
+                data = f.read()
+            return {
+                "source": source,
+                "encoding": "passthrough",
+                "media_type": PASSTHROUGH_FORMATS[image.format],
+                "image_base64": base64.b64encode(data).decode("utf-8"),
+                "tiles": [],
+            }
+
+        image.load()
+        tiled = max(image.size) > tile_threshold
+        overview = downscale(image, min(max_side, overview_max_side) if tiled else max_side)
+        media_type, data = encode_cheapest(overview, jpeg_quality, encodings)
+        tiles = []
+        if tiled:
+            boxes, crops = zip(*split_tiles(image, tile_size, tile_overlap, max_tiles))
+            # PIL releases the GIL while encoding, so tiles encode in parallel
+            with ThreadPoolExecutor(max_workers=min(len(crops), os.cpu_count() or 1)) as pool:
+                encoded = list(pool.map(lambda crop: encode_cheapest(crop, jpeg_quality, encodings), crops))
+            for box, (tile_type, tile_data) in zip(boxes, encoded):
+                tiles.append({
+                    "box": box,
+                    "media_type": tile_type,
+                    "image_base64": base64.b64encode(tile_data).decode("utf-8"),
+                })
+    return {
+        "source": source,
+        "encoding": "reencoded",
+        "media_type": media_type,
+        "image_base64": base64.b64encode(data).decode("utf-8"),
+        "tiles": tiles,
+    }
+
+
+def reduce_image_payload(payload, budget):
+    """
+    Token-budget reducer: drop trailing tiles (then whole diagrams); if the
+    overview alone is still too large, omit the image rather than send truncated
+    base64, keeping any OCR labels as OCR replace mode would.
+    """
+    payload = drop_list_items("tiles", "diagrams")(payload, budget)
+    if count_tokens(payload) > budget and payload.get("image_base64"):
+        payload.pop("image_base64")
+        payload.pop("media_type", None)
+        payload["image_omitted"] = True
+        payload["budget_note"] = f"The image exceeded the {budget}-token budget and was omitted"
+    return payload
 
 
 # ----------------------------------------
@@ -13,7 +204,13 @@ import json
 # ----------------------------------------
 
 class ImageDiagramInput(BaseModel):
-    image_path: str = Field(..., description="Path to a PNG, JPG, or JPEG image file")
+    image_path: str = Field(..., description="Path to a PNG, JPG, JPEG or WebP image file; separate several diagrams with commas")
+
+
+class ImageDiagramArgs(ToolArgs):
+    payload_field = "image_path"
+
+    image_path: str = Field("", description="Path to a PNG, JPG, JPEG or WebP image file; separate several diagrams with commas (defaults to DIAGRAM_PATH)")
 
 
 # ----------------------------------------
@@ -23,22 +220,98 @@ class ImageDiagramInput(BaseModel):
 class ImageDiagramTool(BaseTool):
     name: str = "GCP Architecture Diagram Interpreter"
     description: str = (
-        "Analyzes a cloud architecture diagram (PNG, JPG) using an LLM with vision capabilities to extract structured insights. "
-        "Useful for identifying components, data flows, trust boundaries, and correlating with GCP metadata for STRIDE threat modeling."
+        "Analyzes a cloud architecture diagram (PNG, JPG, WebP) using an LLM with vision capabilities to extract structured insights. "
+        "Useful for identifying components, data flows, trust boundaries, and correlating with GCP metadata for STRIDE threat modeling. "
+        "Text labels are extracted locally with OCR; several diagrams can be passed as a comma-separated list."
     )
+    args_schema: Type[BaseModel] = ImageDiagramArgs
+    ocr_mode: str = DEFAULT_OCR_MODE
+    ocr_min_labels: int = DEFAULT_OCR_MIN_LABELS
+    ocr_workers: int = DEFAULT_OCR_WORKERS
+    max_side: int = DEFAULT_IMAGE_MAX_SIDE
+    passthrough_max_bytes: int = DEFAULT_IMAGE_PASSTHROUGH_MAX_BYTES
+    jpeg_quality: int = DEFAULT_IMAGE_JPEG_QUALITY
+    encodings: tuple = DEFAULT_IMAGE_ENCODINGS
+    tile_threshold: int = DEFAULT_IMAGE_TILE_THRESHOLD
+    overview_max_side: int = DEFAULT_IMAGE_OVERVIEW_MAX_SIDE
+    tile_size: int = DEFAULT_IMAGE_TILE_SIZE
+    tile_overlap: int = DEFAULT_IMAGE_TILE_OVERLAP
+    max_tiles: int = DEFAULT_IMAGE_MAX_TILES
+
+    def _prepare(self, image_path):
+        settings = {
+            "max_side": self.max_side,
+            "passthrough_max_bytes": self.passthrough_max_bytes,
+            "jpeg_quality": self.jpeg_quality,
+            "encodings": list(self.encodings),
+            "tile_threshold": self.tile_threshold,
+            "overview_max_side": self.overview_max_side,
+            "tile_size": self.tile_size,
+            "tile_overlap": self.tile_overlap,
+            "max_tiles": self.max_tiles,
+        }
+        cache = get_artifact_cache()
+        digest = file_digest(image_path) if cache else None
+        prepared = cache.get("image", IMAGE_PIPELINE_VERSION, digest, settings) if cache else None
+        if prepared is None:
+            prepared = prepare_image(image_path, **settings)
+            if cache:
+                cache.put("image", IMAGE_PIPELINE_VERSION, digest, prepared, settings)
+        return prepared
 
+    def _describe(self, image_path, labels):
+        """Payload for one diagram: OCR labels and/or the prepared image, per ocr_mode."""
+        diagram = {}
+        if labels is not None:
+            diagram["ocr"] = {"engine": "tesseract", "count": len(labels), "labels": format_labels(labels)}
+        if self.ocr_mode == "replace" and labels is not None and len(labels) >= self.ocr_min_labels:
+            with Image.open(image_path) as image:
+                diagram["source"] = {
+                    "format": image.format, "width": image.width, "height": image.height,
+                    "bytes": os.path.getsize(image_path),
+                }
+            diagram["image_omitted"] = True
+            print(f"[INFO] [ImageDiagramTool] {image_path}: {len(labels)} OCR labels sent instead of the image")
+            return diagram
+
+        prepared = self._prepare(image_path)
+        tile_note = f", {len(prepared['tiles'])} tiles" if prepared["tiles"] else ""
+        ocr_note = f", {len(labels)} OCR labels" if labels is not None else ""
+        print(
+            f"[INFO] [ImageDiagramTool] {prepared['encoding']} {prepared['media_type']}: "
+            f"{prepared['source']['bytes']} bytes on disk -> {len(prepared['image_base64'])} base64 chars"
+            f"{tile_note}{ocr_note}"
+        )
+        diagram.update({
+            "media_type": prepared["media_type"],
+            "image_base64": prepared["image_base64"],
+            "tiles": prepared["tiles"],
+            "source": prepared["source"],
+        })
+        return diagram
+
+    @traced("tool")
+    @metered("image", reduce_image_payload)
     def _run(self, image_path: str = "", **kwargs) -> str:
         """
         Expected Input:
-        A valid image path string pointing to a PNG, JPG, or JPEG file.
+        A valid image path string pointing to a PNG, JPG, JPEG or WebP file
+        (or several, comma-separated).
 
         Expected Output:
         A dictionary structured as:
         {
             "type": "image_prompt",
-            "image_base64": "...",  # base64 string of the image
+            "media_type": "image/png",  # or image/jpeg, image/webp
+            "image_base64": "...",  # base64 string of the image (overview when tiled)
+            "tiles": [{"box": [l, t, r, b], "media_type": ..., "image_base64": ...}],
+            "source": {"format", "width", "height", "bytes"},
+            "ocr": {"engine": "tesseract", "count": n, "labels": "text @ l,t,r,b\n..."},
             "instructions": "LLM prompt to extract architecture insights and STRIDE threats"
         }
+        In OCR replace mode the image fields are dropped ("image_omitted": true) when
+        enough labels were found. With several diagrams, the per-diagram fields are
+        listed under "diagrams", each with its "path".
 
         If input or image processing fails, returns an error string.
         """
@@ -56,22 +329,36 @@ class ImageDiagramTool(BaseTool):
         try:
             # Step 1: Validate input using Pydantic
             validated = ImageDiagramInput(image_path=image_path)
-
-            if not os.path.exists(validated.image_path) or not validated.image_path.lower().endswith(('.png', '.jpg', '.jpeg')):
+            image_paths = [p.strip() for p in validated.image_path.split(",") if p.strip()]
+            if not image_paths:
                 return f"[ERROR] Invalid image file: {validated.image_path}"
+            for path in image_paths:
+                if not os.path.exists(path) or not path.lower().endswith(('.png', '.jpg', '.jpeg', '.webp')):
+                    return f"[ERROR] Invalid image file: {path}"
+
+            # Step 2: Extract text labels locally (process pool across diagrams, cached by content hash)
+            if self.ocr_mode in ("supplement", "replace"):
+                labels = ocr_many(image_paths, workers=self.ocr_workers)
+            else:
+                labels = {}
 
-            # Step 2: Load and convert image to base64 for LLM
-            image = Image.open(validated.image_path)
-            buffer = io.BytesIO()
-            image.save(buffer, format="PNG")
-            encoded_image = base64.b64encode(buffer.getvalue()).decode("utf-8")
+            # Step 3: Pass through, downscale/re-encode or tile each image
+            diagrams = [self._describe(path, labels.get(path)) for path in image_paths]
+            if len(diagrams) == 1:
+                content = diagrams[0]
+            else:
+                content = {"diagrams": [{"path": path, **d} for path, d in zip(image_paths, diagrams)]}
 
-            # Step 3: Return a structured prompt for vision-capable LLM
+            # Step 4: Return a structured prompt for vision-capable LLM
             return json.dumps({
                 "type": "image_prompt",
-                "image_base64": encoded_image,
+                **content,
                 "instructions": (
-                    "Analyze this cloud architecture diagram. Identify and list the main components, "
+                    "Analyze this cloud architecture diagram. When tiles are present, image_base64 is a downscaled "
+                    "overview and each tile is a full-resolution crop (box = [left, top, right, bottom] in source "
+                    "pixels); use the tiles to read small labels. OCR labels, when present, list each text line as "
+                    "'text @ left,top,right,bottom'; use their positions to group components and infer flows, and "
+                    "prefer them over reading small text from the image. Identify and list the main components, "
                     "data flows, and trust boundaries. If possible, match them with common Google Cloud services "
                     "(e.g., Cloud Run, Pub/Sub, GCS) and call out any missing security controls. "
                     "Apply STRIDE threat modeling categories to each major component where appropriate. "
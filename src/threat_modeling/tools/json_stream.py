@@ -0,0 +1,102 @@
+import json
+import re
+
+READ_CHUNK = 64 * 1024
+
+# Characters that change nesting outside strings, and those that matter inside one
+STRUCTURE_PATTERN = re.compile(r'[\[\]{}"]')
+STRING_END_PATTERN = re.compile(r'["\\]')
+
+
+# ----------------------------------------
+# 📥 Incremental JSON decoding
+# ----------------------------------------
+
+def _scan_to_close(buffer, state):
+    """
+    Continue scanning a top-level array or object from `state` = [index, depth, in_string].
+    Returns the index just past its closing bracket, or None (with `state` saved) if the
+    text ends first, so each character is scanned once however many chunks a record spans.
+    """
+    index, depth, in_string = state
+    while True:
+        if in_string:
+            match = STRING_END_PATTERN.search(buffer, index)
+            if match is None:
+                # An escape at the very end of the buffer leaves index one past it
+                index = max(index, len(buffer))
+                break
+            index = match.end() + (1 if match.group() == "\\" else 0)
+            in_string = match.group() != '"'
+            continue
+        match = STRUCTURE_PATTERN.search(buffer, index)
+        if match is None:
+            index = len(buffer)
+            break
+        index = match.end()
+        char = match.group()
+        if char == '"':
+            in_string = True
+        elif char in "[{":
+            depth += 1
+        else:
+            depth -= 1
+            if depth == 0:
+                return index
+    state[:] = [index, depth, in_string]
+    return None
+
+
+def iter_json_records(chunks):
+    """
+    Yield objects one at a time from a JSON array, JSON Lines or concatenated
+    JSON objects, without materializing the whole document. Only the current,
+    not yet complete record is buffered: its chunks are scanned for the closing
+    bracket as they arrive and joined and decoded once, when it has closed.
+    """
+    decoder = json.JSONDecoder()
+    buffer, position, started = "", 0, False
+    pending, scan = [], None  # chunks and [index, depth, in_string] of an incomplete record
+    for chunk in chunks:
+        if scan is not None:
+            pending.append(chunk)
+            if _scan_to_close(chunk, scan) is None:
+                scan[0] -= len(chunk)
+                continue
+            buffer, position, pending, scan = "".join(pending), 0, [], None
+        else:
+            buffer = buffer[position:] + chunk
+            position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position >= len(buffer):
+                break
+            if not started:
+                started = True
+                if buffer[position] == "[":
+                    position += 1
+                    continue
+            if buffer[position] == "]":
+                position += 1
+                continue
+            if buffer[position] in "[{":
+                state = [position, 0, False]
+                if _scan_to_close(buffer, state) is None:
+                    # Incomplete record; set it aside and scan only the new chunks from here on
+                    state[0] -= len(buffer)
+                    pending, scan = [buffer[position:]], state
+                    buffer, position = "", 0
+                    break
+                record, position = decoder.raw_decode(buffer, position)
+            else:
+                try:
+                    record, position = decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    break  # incomplete scalar; wait for the next chunk
+            yield record
+    if scan is not None:
+        buffer, position = "".join(pending), 0
+    if buffer[position:].strip():
+        # Re-raise the decoder error for whatever could not be completed
+        decoder.raw_decode(buffer, position)
@@ -0,0 +1,286 @@
+import gzip
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+try:
+    import zstandard
+except ImportError:  # optional dependency
+    zstandard = None
+
+from threat_modeling.instrumentation import cache_result, traced
+
+CACHE_DIR = ".gcp_metadata_cache"
+INDEX_FILE = "_index.json"
+
+# ----------------------------------------
+# ⚙️ Cache policy
+# ----------------------------------------
+
+DEFAULT_TTL_SECONDS = int(os.environ.get("GCP_CACHE_TTL", "3600"))  # 1 hour
+DEFAULT_MAX_BYTES = int(os.environ.get("GCP_CACHE_MAX_BYTES", str(512 * 1024 * 1024)))
+DEFAULT_COMPRESSION = os.environ.get("GCP_CACHE_COMPRESSION", "none")  # none | gzip | zstd
+COMPRESSION_MIN_BYTES = 64 * 1024
+
+# IAM and enabled services change more often than inventory listings.
+# Each family can be overridden with GCP_CACHE_TTL_<FAMILY>, e.g. GCP_CACHE_TTL_IAM=300.
+COMMAND_FAMILY_TTLS = {
+    "iam": 900,
+    "services": 1800,
+    "compute": 3600,
+    "functions": 3600,
+    "run": 3600,
+    "bigquery": 3600,
+    "storage": 7200,
+    "pubsub": 7200,
+    "container": 3600,
+    "sql": 3600,
+    "secrets": 3600,
+}
+
+CODEC_SUFFIXES = {"none": "", "gzip": ".gz", "zstd": ".zst"}
+ENTRY_FILE_PATTERN = re.compile(r"^.+_[0-9a-f]{64}\.json(\.gz|\.zst)?$")
+STALE_TMP_SECONDS = 3600
+# Unindexed entry files younger than this may belong to another process that has not flushed its index yet
+ORPHAN_GRACE_SECONDS = 3600
+
+
+def command_family(command):
+    """Map a gcloud/bq command to the family used for TTL lookup."""
+    if not command:
+        return "default"
+    if command[0] == "bq":
+        return "bigquery"
+    if any("iam-policy" in part for part in command):
+        return "iam"
+    return command[1] if len(command) > 1 else "default"
+
+
+def ttl_for_family(family):
+    override = os.environ.get(f"GCP_CACHE_TTL_{family.upper()}")
+    if override:
+        return int(override)
+    return COMMAND_FAMILY_TTLS.get(family, DEFAULT_TTL_SECONDS)
+
+
+def atomic_write_bytes(path, data):
+    """Write `data` to a temp file next to `path`, then rename it into place."""
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+# ----------------------------------------
+# 🗄️ On-disk metadata cache
+# ----------------------------------------
+
+class MetadataCache:
+    """
+    Managed cache for gcloud/bq JSON output, or for a projection of it: the
+    optional `variant` (e.g. a resource type's spec digest) keys what was kept.
+
+    - Entries are written atomically (write-then-rename), so a crashed run
+      never leaves a partial file that is read back as a hit.
+    - A small index file tracks family, creation/access time, size and codec
+      per entry, so a lookup does not need a stat before reading. It is
+      written by flush(), once per run, not on every put.
+    - Expiry is per command family; total size is bounded by LRU eviction.
+    - Large listings can be stored gzip- or zstd-compressed.
+    """
+
+    def __init__(self, cache_dir=CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, compression=DEFAULT_COMPRESSION):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        if compression == "zstd" and zstandard is None:
+            print("[WARN] [MetadataCache] zstandard is not installed; falling back to gzip compression")
+            compression = "gzip"
+        self.compression = compression if compression in CODEC_SUFFIXES else "none"
+        self._lock = threading.RLock()
+        self._removed = set()
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self.writes = 0
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self._index = self._load_index()
+        self._remove_orphans()
+
+    # --- index ---
+
+    @property
+    def index_path(self):
+        return os.path.join(self.cache_dir, INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self.index_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return {}
+
+    def flush(self):
+        """Persist the index, merging entries written concurrently by other processes."""
+        with self._lock:
+            if not self._dirty and not self._removed:
+                return
+            merged = self._load_index()
+            for key in self._removed:
+                merged.pop(key, None)
+            merged.update(self._index)
+            self._index = merged
+            self._removed.clear()
+            atomic_write_bytes(self.index_path, json.dumps(self._index).encode())
+            self._dirty = False
+
+    def _remove_orphans(self):
+        """Delete entry files unknown to the index (legacy or crashed writes) once they are past a grace period."""
+        now = time.time()
+        known = {entry["file"] for entry in self._index.values()}
+        for name in os.listdir(self.cache_dir):
+            path = os.path.join(self.cache_dir, name)
+            try:
+                if name.endswith(".tmp"):
+                    if now - os.path.getmtime(path) > STALE_TMP_SECONDS:
+                        os.remove(path)
+                elif ENTRY_FILE_PATTERN.match(name) and name not in known:
+                    if now - os.path.getmtime(path) > ORPHAN_GRACE_SECONDS:
+                        os.remove(path)
+            except OSError:
+                pass
+
+    # --- entries ---
+
+    @staticmethod
+    def make_key(project_id, command, variant=None):
+        text = " ".join(command) if variant is None else f"{' '.join(command)}#{variant}"
+        digest = hashlib.sha256(text.encode()).hexdigest()
+        return f"{project_id}_{digest}"
+
+    @traced("cache", "metadata_cache.get", cache_result)
+    def get(self, project_id, command, variant=None):
+        """Return cached data for `command`, or None on a miss or expired entry."""
+        key = self.make_key(project_id, command, variant)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if time.time() - entry["created"] >= ttl_for_family(entry["family"]):
+                self.expired += 1
+                self.misses += 1
+                self._drop(key)
+                return None
+        try:
+            with open(os.path.join(self.cache_dir, entry["file"]), "rb") as f:
+                data = json.loads(self._decode(f.read(), entry["codec"]))
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+                self._drop(key)
+            return None
+        with self._lock:
+            self.hits += 1
+            entry["accessed"] = time.time()
+            self._dirty = True
+        return data
+
+    def put(self, project_id, command, data, variant=None):
+        key = self.make_key(project_id, command, variant)
+        payload = json.dumps(data).encode()
+        codec = self.compression if len(payload) >= COMPRESSION_MIN_BYTES else "none"
+        payload = self._encode(payload, codec)
+        file_name = f"{key}.json{CODEC_SUFFIXES[codec]}"
+        atomic_write_bytes(os.path.join(self.cache_dir, file_name), payload)
+        now = time.time()
+        with self._lock:
+            previous = self._index.get(key)
+            if previous and previous["file"] != file_name:
+                self._remove_file(previous["file"])
+            self._index[key] = {
+                "file": file_name,
+                "family": command_family(command),
+                "created": now,
+                "accessed": now,
+                "size": len(payload),
+                "codec": codec,
+            }
+            self._removed.discard(key)
+            self._dirty = True
+            self.writes += 1
+            self._evict_to_limit()
+
+    def _drop(self, key):
+        entry = self._index.pop(key, None)
+        if entry:
+            self._remove_file(entry["file"])
+            self._removed.add(key)
+            self._dirty = True
+
+    def _remove_file(self, file_name):
+        try:
+            os.remove(os.path.join(self.cache_dir, file_name))
+        except OSError:
+            pass
+
+    def _evict_to_limit(self):
+        total = sum(entry["size"] for entry in self._index.values())
+        if total <= self.max_bytes:
+            return
+        for key, entry in sorted(self._index.items(), key=lambda item: item[1]["accessed"]):
+            if total <= self.max_bytes:
+                break
+            total -= entry["size"]
+            self._drop(key)
+            self.evictions += 1
+
+    # --- codecs ---
+
+    @staticmethod
+    def _encode(payload, codec):
+        if codec == "gzip":
+            return gzip.compress(payload)
+        if codec == "zstd":
+            return zstandard.ZstdCompressor().compress(payload)
+        return payload
+
+    @staticmethod
+    def _decode(payload, codec):
+        if codec == "gzip":
+            return gzip.decompress(payload)
+        if codec == "zstd":
+            if zstandard is None:
+                raise ValueError("zstandard is required to read this cache entry")
+            return zstandard.ZstdDecompressor().decompress(payload)
+        return payload
+
+    # --- stats ---
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "evictions": self.evictions,
+                "writes": self.writes,
+                "entries": len(self._index),
+                "bytes": sum(entry["size"] for entry in self._index.values()),
+            }
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_metadata_cache(cache_dir=CACHE_DIR):
+    """Return the process-wide MetadataCache for `cache_dir`."""
+    with _caches_lock:
+        if cache_dir not in _caches:
+            _caches[cache_dir] = MetadataCache(cache_dir)
+        return _caches[cache_dir]
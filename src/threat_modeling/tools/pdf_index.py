@@ -0,0 +1,172 @@
+import json
+import math
+import os
+import re
+from collections import Counter
+
+from threat_modeling.incremental import IAM_CATEGORY, IDENTITY_FIELDS, short_name, summary_path
+from threat_modeling.resource_types import get_resource_types
+
+DEFAULT_PDF_TOP_K = int(os.environ.get("PDF_TOP_K", "12"))  # 0 = return every chunk in page order
+DEFAULT_PDF_INDEX_CHUNK_CHARS = int(os.environ.get("PDF_INDEX_CHUNK_CHARS", "1500"))
+# Bump when tokenization, chunking or index layout changes, so persisted indexes are rebuilt
+PDF_INDEX_VERSION = 1
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[-_./][a-z0-9]+)*")
+STOPWORDS = {
+    "the", "and", "for", "with", "that", "this", "are", "from", "into", "per", "all",
+    "any", "can", "its", "not", "our", "was", "will", "has", "have", "been", "via",
+}
+
+# Words that indicate security-relevant content, grouped by STRIDE category
+STRIDE_TERMS = {
+    "Spoofing": ["spoofing", "authentication", "identity", "credential", "token", "oauth", "jwt", "mfa", "impersonation"],
+    "Tampering": ["tampering", "integrity", "signature", "signed", "validation", "injection", "checksum"],
+    "Repudiation": ["repudiation", "audit", "logging", "logs", "trace", "non-repudiation"],
+    "Information Disclosure": ["disclosure", "encryption", "encrypted", "kms", "cmek", "tls", "pii", "secret", "sensitive", "public"],
+    "Denial of Service": ["denial", "dos", "ddos", "availability", "quota", "throttling", "rate", "autoscaling", "armor"],
+    "Elevation of Privilege": ["privilege", "escalation", "iam", "role", "permission", "admin", "owner", "least-privilege"],
+    "Boundaries": ["boundary", "firewall", "vpc", "ingress", "egress", "internet", "perimeter", "network", "threat", "risk"],
+}
+
+# Words that name each summary category in prose (`terms` in config/resource_types.yaml)
+CATEGORY_TERMS = {t.category: t.terms for t in get_resource_types().values() if t.terms}
+
+
+def tokenize(text):
+    """
+    Lowercase word tokens. Compound identifiers ('orders-api', 'roles/owner')
+    are kept whole and also split into their parts.
+    """
+    tokens = []
+    for token in TOKEN_PATTERN.findall(text.lower()):
+        if len(token) < 2 or token in STOPWORDS:
+            continue
+        tokens.append(token)
+        parts = re.split(r"[-_./]", token)
+        if len(parts) > 1:
+            tokens.extend(p for p in parts if len(p) > 1 and p not in STOPWORDS)
+    return tokens
+
+
+# ----------------------------------------
+# ✂️ Section chunks
+# ----------------------------------------
+
+def section_chunks(pages, chunk_chars=DEFAULT_PDF_INDEX_CHUNK_CHARS):
+    """
+    Split (page_number, text) pairs into small chunks for indexing. Chunks never
+    span pages and break on paragraph or line boundaries where possible.
+    """
+    chunks = []
+    for number, text in pages:
+        parts, size = [], 0
+        for line in text.strip().splitlines():
+            line = line.strip()
+            if not line:
+                continue
+            if parts and size + len(line) > chunk_chars:
+                chunks.append({"index": len(chunks), "pages": [number, number], "text": "\n".join(parts)})
+                parts, size = [], 0
+            while len(line) > chunk_chars:
+                chunks.append({"index": len(chunks), "pages": [number, number], "text": line[:chunk_chars]})
+                line = line[chunk_chars:]
+            parts.append(line)
+            size += len(line) + 1
+        if parts:
+            chunks.append({"index": len(chunks), "pages": [number, number], "text": "\n".join(parts)})
+    return chunks
+
+
+# ----------------------------------------
+# 🔎 BM25 index
+# ----------------------------------------
+
+class BM25Index:
+    """Okapi BM25 over a list of chunks. Plain dicts throughout, so it round-trips through JSON."""
+
+    def __init__(self, chunks, postings, lengths):
+        self.chunks = chunks
+        self.postings = postings  # term -> [[chunk_index, term_frequency], ...]
+        self.lengths = lengths
+        self.average_length = (sum(lengths) / len(lengths)) if lengths else 0.0
+
+    @classmethod
+    def build(cls, chunks):
+        postings, lengths = {}, []
+        for position, chunk in enumerate(chunks):
+            counts = Counter(tokenize(chunk["text"]))
+            lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                postings.setdefault(term, []).append([position, frequency])
+        return cls(chunks, postings, lengths)
+
+    def to_dict(self):
+        return {"chunks": self.chunks, "postings": self.postings, "lengths": self.lengths}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data["chunks"], data["postings"], data["lengths"])
+
+    def search(self, query_terms, top_k):
+        """Return [(score, chunk), ...] for the best `top_k` chunks, highest score first."""
+        total = len(self.chunks)
+        scores = Counter()
+        for term in set(query_terms):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, frequency in postings:
+                norm = 1 - BM25_B + BM25_B * self.lengths[position] / (self.average_length or 1)
+                scores[position] += idf * frequency * (BM25_K1 + 1) / (frequency + BM25_K1 * norm)
+        return [(round(score, 4), self.chunks[position]) for position, score in scores.most_common(top_k)]
+
+
+# ----------------------------------------
+# 🧭 Query terms
+# ----------------------------------------
+
+def summary_query_terms(summary):
+    """Terms naming the services and resources present in a GCP summary."""
+    terms = []
+    for category, records in (summary or {}).items():
+        if not records:
+            continue
+        terms += CATEGORY_TERMS.get(category, [])
+        if category == IAM_CATEGORY:
+            for role in (records or {}).get("roles", []):
+                terms += tokenize(role)
+            continue
+        id_field = IDENTITY_FIELDS.get(category, "name")
+        for record in records if isinstance(records, list) else []:
+            terms += tokenize(short_name(record.get(id_field, "")))
+    return terms
+
+
+def stride_query_terms():
+    return [term for words in STRIDE_TERMS.values() for term in words]
+
+
+def project_query_terms(project_id):
+    """summary_query_terms of the project's cached GCP summary; empty when none has been collected."""
+    try:
+        with open(summary_path(project_id), "r") as f:
+            return summary_query_terms(json.load(f))
+    except (OSError, json.JSONDecodeError):
+        return []
+
+
+def build_query_terms(project_id=None, extra_query="", summary_terms=None):
+    """
+    STRIDE keywords, plus the components in the project's GCP summary. `summary_terms`
+    pins those components (see project_query_terms); otherwise the summary is read now.
+    """
+    terms = stride_query_terms() + tokenize(extra_query or "")
+    if summary_terms is not None:
+        terms += summary_terms
+    elif project_id:
+        terms += project_query_terms(project_id)
+    return terms
@@ -0,0 +1,8 @@
+import fitz  # PyMuPDF
+
+
+# Kept apart from pdf_reader_tool so spawned page workers only import PyMuPDF, not crewai
+def extract_page_range(file_path, first, last):
+    """Worker: text of pages first..last (1-based, inclusive), read in its own process."""
+    with fitz.open(file_path) as doc:
+        return [(n, doc[n - 1].get_text()) for n in range(first, last + 1)]
@@ -1,9 +1,40 @@
 import fitz  # PyMuPDF
+import multiprocessing
 import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Optional, Type
 from pydantic import BaseModel, ValidationError, Field
 from crewai.tools import BaseTool
 from dotenv import load_dotenv
 import json
+from threat_modeling.tools.artifact_cache import file_digest, get_artifact_cache
+from threat_modeling.instrumentation import traced
+from threat_modeling.token_budget import drop_list_items, metered
+from threat_modeling.tools.tool_args import ToolArgs
+from threat_modeling.tools.pdf_pages import extract_page_range
+from threat_modeling.tools.pdf_index import (
+    DEFAULT_PDF_INDEX_CHUNK_CHARS,
+    DEFAULT_PDF_TOP_K,
+    PDF_INDEX_VERSION,
+    BM25Index,
+    build_query_terms,
+    section_chunks,
+)
+
+load_dotenv()
+
+DEFAULT_PDF_MAX_CHARS = int(os.environ.get("PDF_MAX_CHARS", "200000"))  # 0 = no limit
+DEFAULT_PDF_CHUNK_CHARS = int(os.environ.get("PDF_CHUNK_CHARS", "8000"))
+DEFAULT_PDF_WORKERS = int(os.environ.get("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Page ranges smaller than this are read in-process; worker start-up is not worth it
+DEFAULT_PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "100"))
+PAGES_PER_TASK = 25
+# Page workers are spawned, not forked: the tool runs on crew threads, and a forked child
+# can inherit a lock (logging, tokenizer, PyMuPDF) that another thread held at fork time
+WORKER_CONTEXT = multiprocessing.get_context("spawn")
+# Bump when page text extraction changes, so cached page text is not reused
+PDF_PARSER_VERSION = 1
 
 # ----------------------------------------
 # 📦 Pydantic model for input validation
@@ -11,6 +42,175 @@ import json
 
 class PDFReaderInput(BaseModel):
     file_path: str = Field(..., description="Absolute or relative path to the input PDF file")
+    page_start: Optional[int] = Field(None, ge=1, description="First page to read (1-based, inclusive)")
+    page_end: Optional[int] = Field(None, ge=1, description="Last page to read (1-based, inclusive)")
+    max_chars: Optional[int] = Field(None, ge=0, description="Maximum characters to return (0 = no limit)")
+    top_k: Optional[int] = Field(None, ge=0, description="Return only the K most security-relevant sections (0 = all text in page order)")
+    query: Optional[str] = Field(None, description="Extra search terms used to rank sections")
+
+
+class PDFReaderArgs(ToolArgs):
+    payload_field = "file_path"
+
+    # Only file_path is expected from the LLM; ranges and limits are validated by PDFReaderInput in the tool
+    file_path: str = Field("", description="Absolute or relative path to the input PDF file (defaults to PDF_PATH)")
+    page_start: Optional[int] = Field(None, description="First page to read (1-based, inclusive)")
+    page_end: Optional[int] = Field(None, description="Last page to read (1-based, inclusive)")
+    max_chars: Optional[int] = Field(None, description="Maximum characters to return (0 = no limit)")
+    top_k: Optional[int] = Field(None, description="Return only the K most security-relevant sections (0 = all text in page order)")
+    query: Optional[str] = Field(None, description="Extra search terms used to rank sections")
+
+
+# ----------------------------------------
+# 📄 Page extraction
+# ----------------------------------------
+
+def iter_page_text(file_path, first, last, workers=1, parallel_min_pages=DEFAULT_PDF_PARALLEL_MIN_PAGES):
+    """
+    Yield (page_number, text) for pages first..last in page order.
+
+    Large ranges are split into fixed-size page ranges read by `workers` processes;
+    results are still yielded in order. Closing the generator early (e.g. once a
+    character budget is spent) closes the document or cancels pending ranges.
+    """
+    if workers <= 1 or last - first + 1 < parallel_min_pages:
+        with fitz.open(file_path) as doc:
+            for n in range(first, last + 1):
+                yield n, doc[n - 1].get_text()
+        return
+
+    starts = list(range(first, last + 1, PAGES_PER_TASK))
+    ends = [min(start + PAGES_PER_TASK - 1, last) for start in starts]
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=WORKER_CONTEXT)
+    try:
+        for pages in pool.map(extract_page_range, repeat(file_path), starts, ends):
+            yield from pages
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def pdf_page_count(file_path):
+    cache = get_artifact_cache()
+    digest = file_digest(file_path) if cache else None
+    info = cache.get("pdf_info", PDF_PARSER_VERSION, digest) if cache else None
+    if info is None:
+        with fitz.open(file_path) as doc:
+            info = {"page_count": doc.page_count}
+        if cache:
+            cache.put("pdf_info", PDF_PARSER_VERSION, digest, info)
+    return info["page_count"]
+
+
+def iter_cached_page_text(file_path, first, last, workers=1):
+    """
+    Same as iter_page_text, but serves pages from the artifact cache. Pages read
+    from the PDF are added to the document's cached page map when the generator
+    finishes or is closed, so a later call with a larger range or budget only
+    extracts the pages it has not seen.
+    """
+    cache = get_artifact_cache()
+    if cache is None:
+        yield from iter_page_text(file_path, first, last, workers=workers)
+        return
+
+    digest = file_digest(file_path)
+    pages = dict(cache.get("pdf_pages", PDF_PARSER_VERSION, digest) or {})
+    added = False
+    try:
+        number = first
+        while number <= last and str(number) in pages:
+            yield number, pages[str(number)]
+            number += 1
+        if number <= last:
+            source = iter_page_text(file_path, number, last, workers=workers)
+            try:
+                for number, text in source:
+                    pages[str(number)] = text
+                    added = True
+                    yield number, text
+            finally:
+                source.close()
+    finally:
+        if added:
+            cache.put("pdf_pages", PDF_PARSER_VERSION, digest, pages)
+
+
+def build_chunks(pages, chunk_chars=DEFAULT_PDF_CHUNK_CHARS, max_chars=DEFAULT_PDF_MAX_CHARS):
+    """
+    Pack (page_number, text) pairs into chunks of at most `chunk_chars` characters,
+    breaking at page boundaries where possible. Stops reading pages once `max_chars`
+    characters have been collected.
+
+    Returns (chunks, characters, truncated).
+    """
+    chunks = []
+    parts, part_chars, part_pages = [], 0, []
+    total, truncated = 0, False
+
+    def close():
+        nonlocal parts, part_chars, part_pages
+        if parts:
+            chunks.append({
+                "index": len(chunks),
+                "pages": [part_pages[0], part_pages[-1]],
+                "text": "\n\n".join(parts),
+            })
+        parts, part_chars, part_pages = [], 0, []
+
+    for number, text in pages:
+        text = text.strip()
+        if not text:
+            continue
+        if max_chars and total + len(text) > max_chars:
+            text = text[:max_chars - total]
+            truncated = True
+        while text:
+            if parts and part_chars + len(text) > chunk_chars:
+                close()
+            piece, text = text[:chunk_chars], text[chunk_chars:]
+            parts.append(piece)
+            part_chars += len(piece)
+            part_pages.append(number)
+            total += len(piece)
+        if truncated:
+            break
+    close()
+    return chunks, total, truncated
+
+
+def load_section_index(file_path, first, last, workers=1, chunk_chars=DEFAULT_PDF_INDEX_CHUNK_CHARS):
+    """BM25 index over the section chunks of pages first..last, built once per PDF content hash."""
+    cache = get_artifact_cache()
+    digest = file_digest(file_path) if cache else None
+    params = {"first": first, "last": last, "chunk_chars": chunk_chars}
+    data = cache.get("pdf_bm25", PDF_INDEX_VERSION, digest, params) if cache else None
+    if data is not None:
+        return BM25Index.from_dict(data)
+    index = BM25Index.build(section_chunks(iter_cached_page_text(file_path, first, last, workers=workers), chunk_chars))
+    if cache:
+        cache.put("pdf_bm25", PDF_INDEX_VERSION, digest, index.to_dict(), params)
+    return index
+
+
+def select_relevant_chunks(index, query_terms, top_k, max_chars=DEFAULT_PDF_MAX_CHARS):
+    """
+    Top-K chunks for `query_terms`, returned in page order and cut to `max_chars`.
+
+    Returns (chunks, characters, truncated).
+    """
+    ranked = index.search(query_terms, top_k)
+    chunks, total, truncated = [], 0, False
+    for score, chunk in sorted(ranked, key=lambda item: item[1]["index"]):
+        text = chunk["text"]
+        if max_chars and total + len(text) > max_chars:
+            text = text[:max_chars - total]
+            truncated = True
+        if text:
+            chunks.append({"index": chunk["index"], "pages": chunk["pages"], "score": score, "text": text})
+            total += len(text)
+        if truncated:
+            break
+    return chunks, total, truncated
 
 
 # ----------------------------------------
@@ -21,10 +221,27 @@ class PDFReaderTool(BaseTool):
     name: str = "Cloud Architecture PDF Interpreter"
     description: str = (
         "Extracts text from a PDF document and sends it to an LLM for structured analysis. "
-        "Useful for interpreting system designs, architecture write-ups, or threat assessments."
+        "Useful for interpreting system designs, architecture write-ups, or threat assessments. "
+        "Returns the sections most relevant to the project's GCP components and STRIDE threats; "
+        "optionally reads only a page range (page_start, page_end) or ranks on extra terms (query)."
     )
+    args_schema: Type[BaseModel] = PDFReaderArgs
+    project_id: Optional[str] = None
+    # GCP component terms fixed when the tool is built (pdf_index.project_query_terms), so ranking
+    # does not depend on whether a concurrent GCP extraction has rewritten the summary yet
+    summary_terms: Optional[List[str]] = None
+    workers: int = DEFAULT_PDF_WORKERS
+    chunk_chars: int = DEFAULT_PDF_CHUNK_CHARS
+    max_chars: int = DEFAULT_PDF_MAX_CHARS
+    top_k: int = DEFAULT_PDF_TOP_K
+    index_chunk_chars: int = DEFAULT_PDF_INDEX_CHUNK_CHARS
 
-    def _run(self, file_path: str = "", **kwargs) -> str:
+    # Over budget: drop the lowest-priority chunks (last in page order, or lowest BM25 score)
+    @traced("tool")
+    @metered("pdf", drop_list_items("chunks"))
+    def _run(self, file_path: str = "", page_start: Optional[int] = None, page_end: Optional[int] = None,
+             max_chars: Optional[int] = None, top_k: Optional[int] = None, query: Optional[str] = None,
+             **kwargs) -> str:
         load_dotenv()
         # Allow file_path from kwargs or env
         if not file_path:
@@ -34,12 +251,17 @@ class PDFReaderTool(BaseTool):
         print(f"[DEBUG] [PDFReaderTool] Using file_path: {file_path}")
         """
         Expected Input:
-        A string containing a valid file path to a `.pdf` file.
+        A string containing a valid file path to a `.pdf` file, optionally with a
+        1-based page range, a character budget, a top-K and extra search terms.
 
         Expected Output:
         A dictionary with:
         - type: "text_prompt"
-        - text: (full extracted text from PDF)
+        - pages: first/last page read and the document's page count
+        - chunks: bounded-size pieces of the extracted text, in page order; with top-K
+          selection, only the highest-scoring sections (each with its BM25 score)
+        - selection: how chunks were chosen and how much text was indexed
+        - characters / truncated: how much text was kept and whether the budget cut it short
         - instructions: prompt to guide LLM to extract security-relevant insights
 
         If validation or reading fails, returns a string error.
@@ -47,27 +269,66 @@ class PDFReaderTool(BaseTool):
 
         try:
             # Step 1: Validate input using Pydantic
-            validated = PDFReaderInput(file_path=file_path)
+            validated = PDFReaderInput(
+                file_path=file_path, page_start=page_start, page_end=page_end,
+                max_chars=max_chars, top_k=top_k, query=query,
+            )
 
             # Step 2: Check file existence and extension
             if not os.path.exists(validated.file_path) or not validated.file_path.endswith(".pdf"):
                 return f"[ERROR] File not found or invalid format: {validated.file_path}"
 
-            # Step 3: Extract all text from the PDF using PyMuPDF
+            # Step 3: Resolve the page range
             try:
-                doc = fitz.open(validated.file_path)
+                page_count = pdf_page_count(validated.file_path)
             except Exception as e:
                 return f"[ERROR] Could not open PDF file: {str(e)}"
-            full_text = ""
-            for page in doc:
-                full_text += page.get_text() + "\n\n"
+            first = validated.page_start or 1
+            last = min(validated.page_end or page_count, page_count)
+            if first > last:
+                return f"[ERROR] Invalid page range {first}-{last} for a {page_count}-page PDF"
+
+            budget = self.max_chars if validated.max_chars is None else validated.max_chars
+            k = self.top_k if validated.top_k is None else validated.top_k
+            if k:
+                # Step 4a: Rank section chunks against GCP components and STRIDE keywords
+                index = load_section_index(validated.file_path, first, last, self.workers, self.index_chunk_chars)
+                project_id = self.project_id or os.environ.get("PROJECT_ID")
+                query_terms = build_query_terms(project_id, validated.query, self.summary_terms)
+                chunks, characters, truncated = select_relevant_chunks(index, query_terms, k, budget)
+                indexed_characters = sum(len(chunk["text"]) for chunk in index.chunks)
+                selection = {
+                    "method": "bm25",
+                    "top_k": k,
+                    "indexed_chunks": len(index.chunks),
+                    "indexed_characters": indexed_characters,
+                }
+            else:
+                # Step 4b: Stream page text into bounded chunks
+                pages = iter_cached_page_text(validated.file_path, first, last, workers=self.workers)
+                try:
+                    chunks, characters, truncated = build_chunks(pages, self.chunk_chars, budget)
+                finally:
+                    pages.close()
+                selection = {"method": "sequential"}
+            print(
+                f"[INFO] [PDFReaderTool] Pages {first}-{last} of {page_count}: "
+                f"{characters} chars in {len(chunks)} chunks ({selection['method']})"
+                f"{' (truncated)' if truncated else ''}"
+            )
 
-            # Step 4: Return structured LLM prompt
+            # Step 5: Return structured LLM prompt
             return json.dumps({
                 "type": "text_prompt",
-                "text": full_text.strip(),
+                "pages": {"first": first, "last": last, "total": page_count},
+                "characters": characters,
+                "truncated": truncated,
+                "selection": selection,
+                "chunks": chunks,
                 "instructions": (
                     "You are analyzing a PDF document related to cloud architecture or threat modeling. "
+                    "The text is split into chunks in page order; when selection.method is 'bm25', only the sections "
+                    "most relevant to the project's GCP components and STRIDE threats are included. "
                     "Extract any relevant components, security controls, service relationships, or identified threats. "
                     "If possible, align content to the STRIDE framework. "
                     "Return a structured summary of services, risks, and mitigation recommendations."
@@ -0,0 +1,225 @@
+import abc
+import csv
+import hashlib
+import json
+import os
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # optional at runtime; Parquet output is skipped without it
+    pyarrow = None
+
+from threat_modeling.tools.json_stream import READ_CHUNK, iter_json_records
+
+RISK_FIELDS = ["threat", "asset", "category", "likelihood", "impact", "mitigation"]
+# Formats written next to the CSV report, e.g. "csv,jsonl,parquet"; CSV is always written
+DEFAULT_EXPORT_FORMATS = [f.strip().lower() for f in os.environ.get("EXPORT_FORMATS", "csv").split(",") if f.strip()]
+PARQUET_BATCH_ROWS = int(os.environ.get("EXPORT_PARQUET_BATCH_ROWS", "5000"))
+
+
+# ----------------------------------------
+# 📥 Streaming JSON source
+# ----------------------------------------
+
+def iter_source_chunks(source):
+    """Chunks of JSON text: a path to a .json/.jsonl file is read incrementally, anything else is used as-is."""
+    if isinstance(source, str) and source.strip().endswith((".json", ".jsonl")) and os.path.isfile(source.strip()):
+        with open(source.strip(), "r", encoding="utf-8") as f:
+            while True:
+                chunk = f.read(READ_CHUNK)
+                if not chunk:
+                    return
+                yield chunk
+    else:
+        yield source
+
+
+def iter_risk_records(source):
+    """Records from structured input (a list, or a single object) or from JSON text or a file path."""
+    if isinstance(source, list):
+        return iter(source)
+    if isinstance(source, dict):
+        return iter((source,))
+    return iter_json_records(iter_source_chunks(source))
+
+
+# ----------------------------------------
+# 📤 Incremental writers
+# ----------------------------------------
+
+def _sha256_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class RiskWriter(abc.ABC):
+    """
+    Writes rows to `<path>.tmp` and moves the file into place on commit(), so a
+    failed export never leaves a half-written report (or clobbers the previous
+    one, which incremental runs still read while exporting).
+    """
+
+    format = None
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = f"{path}.tmp"
+        self.rows = 0
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+
+    @abc.abstractmethod
+    def write(self, row):
+        """Append one risk row."""
+
+    @abc.abstractmethod
+    def _close(self):
+        """Flush and close the temporary file."""
+
+    def _checksum(self):
+        return _sha256_file(self.tmp_path)
+
+    def commit(self):
+        self._close()
+        checksum = self._checksum()
+        os.replace(self.tmp_path, self.path)
+        return {
+            "format": self.format,
+            "path": self.path,
+            "rows": self.rows,
+            "bytes": os.path.getsize(self.path),
+            "sha256": checksum,
+        }
+
+    def abort(self):
+        try:
+            self._close()
+        except Exception:
+            pass
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class _HashingTextFile:
+    """Minimal buffered text sink for csv/json writers that hashes bytes as they are written."""
+
+    def __init__(self, path, buffer_chars=READ_CHUNK):
+        self._file = open(path, "wb")
+        self.digest = hashlib.sha256()
+        self._parts, self._size, self._buffer_chars = [], 0, buffer_chars
+
+    def write(self, text):
+        self._parts.append(text)
+        self._size += len(text)
+        if self._size >= self._buffer_chars:
+            self.flush()
+
+    def flush(self):
+        if self._parts:
+            data = "".join(self._parts).encode("utf-8")
+            self.digest.update(data)
+            self._file.write(data)
+            self._parts, self._size = [], 0
+
+    def close(self):
+        if not self._file.closed:
+            self.flush()
+            self._file.close()
+
+
+class CSVRiskWriter(RiskWriter):
+    format = "csv"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = _HashingTextFile(self.tmp_path)
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(RISK_FIELDS)
+
+    def write(self, row):
+        self._writer.writerow([row.get(k, "") for k in RISK_FIELDS])
+        self.rows += 1
+
+    def _close(self):
+        self._file.close()
+
+    def _checksum(self):
+        return self._file.digest.hexdigest()
+
+
+class JSONLRiskWriter(RiskWriter):
+    format = "jsonl"
+
+    def __init__(self, path):
+        super().__init__(path)
+        self._file = _HashingTextFile(self.tmp_path)
+
+    def write(self, row):
+        self._file.write(json.dumps({k: row.get(k, "") for k in RISK_FIELDS}, ensure_ascii=False) + "\n")
+        self.rows += 1
+
+    def _close(self):
+        self._file.close()
+
+    def _checksum(self):
+        return self._file.digest.hexdigest()
+
+
+class ParquetRiskWriter(RiskWriter):
+    """Buffers PARQUET_BATCH_ROWS rows at a time and writes each batch as a row group."""
+
+    format = "parquet"
+
+    def __init__(self, path, batch_rows=PARQUET_BATCH_ROWS):
+        super().__init__(path)
+        self._schema = pyarrow.schema([(k, pyarrow.string()) for k in RISK_FIELDS])
+        self._writer = pyarrow.parquet.ParquetWriter(self.tmp_path, self._schema)
+        self._batch = {k: [] for k in RISK_FIELDS}
+        self._batch_rows = batch_rows
+
+    def _flush(self):
+        if self._batch[RISK_FIELDS[0]]:
+            self._writer.write_table(pyarrow.table(self._batch, schema=self._schema))
+            self._batch = {k: [] for k in RISK_FIELDS}
+
+    def write(self, row):
+        for k in RISK_FIELDS:
+            self._batch[k].append(str(row.get(k, "")))
+        self.rows += 1
+        if len(self._batch[RISK_FIELDS[0]]) >= self._batch_rows:
+            self._flush()
+
+    def _close(self):
+        if self._writer is not None:
+            self._flush()
+            self._writer.close()
+            self._writer = None
+
+
+WRITERS = {"csv": CSVRiskWriter, "jsonl": JSONLRiskWriter, "parquet": ParquetRiskWriter}
+
+
+def open_writers(csv_path, formats=None):
+    """One writer per format; non-CSV outputs share the CSV path with their own extension."""
+    writers = [CSVRiskWriter(csv_path)]
+    base = os.path.splitext(csv_path)[0]
+    try:
+        for fmt in dict.fromkeys(formats or DEFAULT_EXPORT_FORMATS):
+            if fmt == "csv":
+                continue
+            if fmt not in WRITERS:
+                print(f"[WARN] [CSVRiskExporterTool] Unknown export format '{fmt}'; skipped")
+                continue
+            if fmt == "parquet" and pyarrow is None:
+                print("[WARN] [CSVRiskExporterTool] pyarrow is not installed; Parquet output skipped")
+                continue
+            writers.append(WRITERS[fmt](f"{base}.{fmt}"))
+    except Exception:
+        # Remove the temporary files of the writers already opened
+        for writer in writers:
+            writer.abort()
+        raise
+    return writers
@@ -1,7 +1,12 @@
 import json
 from pydantic import BaseModel, ValidationError, Field
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Type, Union
 from crewai.tools import BaseTool 
+from threat_modeling.stride_rules import get_default_engine
+from threat_modeling.flow_graph import analyze, build_graph, load_diagram_pages
+from threat_modeling.instrumentation import traced
+from threat_modeling.token_budget import metered
+from threat_modeling.tools.tool_args import ToolArgs
 
 
 # ----------------------------------------
@@ -13,6 +18,15 @@ class STRIDEInputModel(BaseModel):
     architecture_summary: str = Field(..., description="Summarized architecture text extracted from diagram or PDF")
 
 
+class STRIDEToolArgs(ToolArgs):
+    payload_field = "summarized_input"
+
+    # Required, so crewai retries with the raw arguments when the LLM passes gcp_metadata/architecture_summary directly
+    summarized_input: Union[Dict[str, Any], str] = Field(
+        ..., description='Object (or JSON string) with "gcp_metadata" and "architecture_summary"'
+    )
+
+
 # ----------------------------------------
 # 🔐 CrewAI Tool Definition
 # ----------------------------------------
@@ -23,11 +37,16 @@ class STRIDEThreatModelerTool(BaseTool):
         "Analyzes cloud architecture using the STRIDE framework based on GCP metadata "
         "and documentation summaries. Outputs a list of potential threats and risks."
     )
+    args_schema: Type[BaseModel] = STRIDEToolArgs
+    # The run's draw.io diagram, the same one GCP extraction merged into the flow analysis (falls back to DRAWIO_PATH)
+    drawio_path: Optional[str] = None
 
-    def _run(self, summarized_input: str) -> str:
+    @traced("tool")
+    @metered("stride_tool")
+    def _run(self, summarized_input: Union[Dict[str, Any], str] = "", **kwargs) -> str:
         """
         Expected Input:
-        A JSON string matching this structure:
+        An object (passed through from the LLM's arguments) or a JSON string matching this structure:
         {
             "gcp_metadata": {
                 "compute_instances": [...],
@@ -55,7 +74,8 @@ class STRIDEThreatModelerTool(BaseTool):
         try:
             # Accept both dict and str input for robustness
             if isinstance(summarized_input, dict):
-                parsed_json = summarized_input
+                # Shallow copy: the fields below are normalized in place
+                parsed_json = dict(summarized_input)
             else:
                 parsed_json = json.loads(summarized_input)
             # Defensive: If gcp_metadata is a string, parse it
@@ -76,12 +96,18 @@ class STRIDEThreatModelerTool(BaseTool):
                 gcp_metadata=parsed_json.get("gcp_metadata", {}),
                 architecture_summary=parsed_json.get("architecture_summary", "")
             )
+            # Deterministic pre-pass: trivially detectable threats come from local rules
+            baseline_findings = get_default_engine().evaluate(validated_data.gcp_metadata)
+            # Connectivity facts the LLM would otherwise have to infer: exposure paths, boundary crossings, shared identities
+            flow_analysis = analyze(build_graph(validated_data.gcp_metadata, load_diagram_pages(self.drawio_path)))
             # Construct LLM prompt payload
             return json.dumps({
                 "type": "text_prompt",
                 "text": json.dumps({
                     "gcp_metadata": validated_data.gcp_metadata,
-                    "architecture_summary": validated_data.architecture_summary
+                    "architecture_summary": validated_data.architecture_summary,
+                    "baseline_findings": baseline_findings,
+                    "flow_analysis": flow_analysis
                 }, indent=2),
                 "instructions": (
                     "You are a security analyst performing a STRIDE threat model. "
@@ -100,6 +126,11 @@ class STRIDEThreatModelerTool(BaseTool):
                     "- likelihood (e.g. Low, Medium, High)\n"
                     "- impact (e.g. Minor, Moderate, Severe)\n"
                     "- mitigation (recommended security control)\n\n"
+                    "The baseline_findings were already produced by a deterministic rule engine and are "
+                    "added to the report automatically. Do not repeat them; only return additional, "
+                    "context-dependent threats they do not cover.\n"
+                    "Use flow_analysis to prioritize: components on internet_reachable paths, flows in "
+                    "cross_boundary_flows and components in shared_service_accounts need the closest review.\n\n"
                     "Return your findings as a list of structured JSON objects."
                 )
             })
@@ -0,0 +1,63 @@
+from typing import Any, ClassVar
+
+from pydantic import BaseModel, model_validator
+
+
+# ----------------------------------------
+# 📦 Base schema for tool arguments
+# ----------------------------------------
+
+class ToolArgs(BaseModel):
+    """
+    Base for the tools' `args_schema`. crewai validates the LLM's Action Input
+    against it and calls `_run` with the result, so structured payloads (lists,
+    dicts) reach the tool as-is instead of being serialized and parsed again.
+
+    Arguments the LLM gets slightly wrong are repaired before validation:
+    - a bare value instead of an object is used as the payload field
+    - a payload under another name is used when it is the only unknown key;
+      several unknown keys together become the payload object
+    - a payload nested under its own name, or a single-key object holding a
+      list, is unwrapped
+    - surrounding quotes are stripped from string payloads
+
+    crewai drops unknown keys on the first attempt and retries with the LLM's
+    raw arguments when validation fails, so renamed payloads are only recovered
+    for tools whose payload field is required.
+    """
+
+    # Name of the field that carries the tool's main input
+    payload_field: ClassVar[str] = ""
+
+    @model_validator(mode="before")
+    @classmethod
+    def _repair_payload(cls, data: Any) -> Any:
+        field = cls.payload_field
+        if not field:
+            return data
+        if not isinstance(data, dict):
+            # A bare value is the payload itself; it still goes through the unwrapping and quote stripping below
+            data = {field: data}
+        # crewai adds the agent's fingerprint to every call; it is not a tool argument
+        data = {k: v for k, v in data.items() if k != "security_context"}
+        if field not in data:
+            unknown = {k: v for k, v in data.items() if k not in cls.model_fields}
+            if len(unknown) == 1:
+                data[field] = data.pop(next(iter(unknown)))
+            elif unknown:
+                data = {k: v for k, v in data.items() if k not in unknown}
+                data[field] = unknown
+            else:
+                return data
+        value = data[field]
+        while isinstance(value, dict) and len(value) == 1:
+            key, inner = next(iter(value.items()))
+            if key != field and not isinstance(inner, list):
+                break
+            value = inner
+        if isinstance(value, str):
+            value = value.strip()
+            if len(value) >= 2 and value[0] == value[-1] and value[0] in "\"'":
+                value = value[1:-1]
+        data[field] = value
+        return data
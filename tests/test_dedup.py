@@ -0,0 +1,145 @@
+import json
+import os
+
+import pytest
+
+from threat_modeling.dedup import AssetNormalizer, ThreatDeduplicator
+
+SUMMARY = {
+    "cloud_run_services": [{"name": "api"}],
+    "storage_buckets": [{"name": "logs"}],
+    "compute_instances": [{"name": "web-1"}],
+}
+
+
+# ----------------------------------------
+# Asset canonicalization
+# ----------------------------------------
+
+@pytest.mark.parametrize("asset", [
+    "Compute Engine: vm-1",
+    "Compute Engine: instance-1",
+    "Cloud SQL: db-replica",
+    "Pub/Sub: message-bus",
+    "Cloud Run: service-api",
+    "GKE: node-pool-a",
+])
+def test_hyphenated_names_keep_their_leading_word(asset):
+    assert AssetNormalizer(None).normalize(asset) == asset
+
+
+@pytest.mark.parametrize("asset", ["Cloud SQL: db", "BigQuery: table", "Pub/Sub: message", "GKE: cluster"])
+def test_kind_word_used_as_the_name_is_kept(asset):
+    assert AssetNormalizer(None).normalize(asset) == asset
+
+
+def test_name_starting_with_a_service_term_is_not_a_service():
+    assert AssetNormalizer(None).normalize("db-replica") == "db-replica"
+
+
+@pytest.mark.parametrize("asset, expected", [
+    ("Cloud Run api", "Cloud Run: api"),
+    ("Cloud Run service checkout", "Cloud Run: checkout"),
+    ("Cloud Run - checkout", "Cloud Run: checkout"),
+    ("GCS bucket logs", "GCS: logs"),
+    ("GCS bucket: archive", "GCS: archive"),
+    ("Google Cloud Storage bucket archive", "GCS: archive"),
+    ("gcs://archive", "GCS: archive"),
+    ("Compute Engine VM web-2", "Compute Engine: web-2"),
+    ("GCP Compute instance batch", "Compute Engine: batch"),
+    ("Cloud Functions: handler", "Cloud Function: handler"),
+    ("gcf handler", "Cloud Function: handler"),
+    ("Pub/Sub topic orders", "Pub/Sub: orders"),
+    ("pub / sub orders", "Pub/Sub: orders"),
+    ("bq sales", "BigQuery: sales"),
+    ("Kubernetes: prod", "GKE: prod"),
+    ("Cloud SQL instance db-1", "Cloud SQL: db-1"),
+    ("IAM: roles/owner", "IAM: roles/owner"),
+    ("Service account deployer", "IAM: deployer"),
+    ("VMs", "Compute Engine"),
+])
+def test_service_prefix_forms(asset, expected):
+    assert AssetNormalizer(None).normalize(asset) == expected
+
+
+@pytest.mark.parametrize("asset, expected", [
+    ("the api service", "Cloud Run: api"),
+    ("cloud-run: API", "Cloud Run: api"),
+    ("Storage bucket logs", "GCS: logs"),
+    ("web-1", "Compute Engine: web-1"),
+])
+def test_names_resolve_against_the_summary(asset, expected):
+    assert AssetNormalizer(SUMMARY).normalize(asset) == expected
+
+
+def test_unknown_assets_are_left_alone():
+    assert AssetNormalizer(SUMMARY).normalize("  Load   balancer ") == "Load balancer"
+
+
+# ----------------------------------------
+# Deduplication
+# ----------------------------------------
+
+def threat(text, asset="GCS: logs", category="Information Disclosure", **fields):
+    return {"threat": text, "asset": asset, "category": category, "likelihood": "High", "impact": "Severe",
+            "mitigation": "Remove allUsers", **fields}
+
+
+def test_exact_duplicates_merge_across_case_and_punctuation():
+    dedup = ThreatDeduplicator()
+    assert dedup.add(threat("Bucket is publicly readable")) is not None
+    assert dedup.add(threat("bucket is publicly readable.")) is None
+    assert dedup.stats["exact_duplicates"] == 1
+
+
+def test_near_duplicates_merge():
+    dedup = ThreatDeduplicator()
+    assert dedup.add(threat("Public bucket exposes sensitive log data to the internet")) is not None
+    assert dedup.add(threat("Public bucket exposes sensitive log data to anyone on the internet")) is None
+    assert dedup.stats["near_duplicates"] == 1
+
+
+def test_duplicates_merge_after_canonicalization():
+    dedup = ThreatDeduplicator(SUMMARY)
+    assert dedup.add(threat("Bucket is publicly readable", asset="GCS: logs")) is not None
+    assert dedup.add(threat("Bucket is publicly readable", asset="Storage bucket logs", category="info disclosure")) is None
+
+
+def test_distinct_assets_stay_separate():
+    dedup = ThreatDeduplicator()
+    rows = [dedup.add(threat("Instance has a public IP", asset=f"Compute Engine: {name}"))
+            for name in ("vm-1", "instance-1", "web-1")]
+    assert all(row is not None for row in rows)
+    assert len({row["asset"] for row in rows}) == 3
+
+
+def test_distinct_categories_and_wording_stay_separate():
+    dedup = ThreatDeduplicator()
+    assert dedup.add(threat("Bucket is publicly readable")) is not None
+    assert dedup.add(threat("Bucket is publicly readable", category="Tampering")) is not None
+    assert dedup.add(threat("Object versioning is disabled so deletions cannot be recovered")) is not None
+    assert dedup.stats["rows_out"] == 3
+
+
+def test_similarity_one_keeps_near_duplicates():
+    dedup = ThreatDeduplicator(similarity=1.0)
+    assert dedup.add(threat("Public bucket exposes sensitive log data to the internet")) is not None
+    assert dedup.add(threat("Public bucket exposes sensitive log data to anyone on the internet")) is not None
+
+
+def test_report_keeps_the_source_of_every_merged_row(tmp_path):
+    dedup = ThreatDeduplicator(SUMMARY)
+    kept = dedup.add(threat("Bucket is publicly readable", asset="GCS: logs"))
+    dedup.add(threat("bucket is publicly readable!", asset="Storage bucket logs"))
+    dedup.add(threat("The bucket is publicly readable by anyone", asset="GCS bucket logs"))
+    path = dedup.write_report(str(tmp_path / "reports" / "threat_model_duplicates.json"))
+
+    with open(path) as f:
+        report = json.load(f)
+    assert report["rows_in"] == 3 and report["rows_out"] == 1
+    [cluster] = report["clusters"]
+    assert cluster["kept"] == {"threat": kept["threat"], "asset": "GCS: logs", "category": "Information Disclosure"}
+    # Collapsed entries record the row as it was submitted, before canonicalization
+    assert [c["asset"] for c in cluster["collapsed"]] == ["Storage bucket logs", "GCS bucket logs"]
+    assert cluster["collapsed"][0]["similarity"] == 1.0
+    assert os.listdir(tmp_path / "reports") == ["threat_model_duplicates.json"]
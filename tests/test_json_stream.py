@@ -0,0 +1,35 @@
+import json
+
+import pytest
+
+from threat_modeling.tools.json_stream import iter_json_records
+
+RECORDS = [
+    {"threat": "Bucket \"logs\" is public ]}", "asset": "GCS: logs"},
+    {"threat": "Escaped \\ backslash", "tags": [["nested"], {"a": [1, 2]}]},
+    {"threat": "Unicode é ☃", "asset": ""},
+]
+
+
+def split(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64, 10_000])
+@pytest.mark.parametrize("text", [
+    json.dumps(RECORDS),
+    "\n".join(json.dumps(r) for r in RECORDS),
+    "".join(json.dumps(r) for r in RECORDS),
+])
+def test_records_survive_any_chunking(text, size):
+    assert list(iter_json_records(split(text, size))) == RECORDS
+
+
+def test_scalars_are_yielded():
+    assert list(iter_json_records(split('[1, "two", null]', 2))) == [1, "two", None]
+
+
+@pytest.mark.parametrize("text", ['[{"a": 1}, {"b": ', '{"a": [1, 2}', '{"a": "x'])
+def test_incomplete_or_invalid_input_raises(text):
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_json_records(split(text, 3)))
@@ -0,0 +1,49 @@
+import pytest
+
+import threat_modeling.token_budget as token_budget
+from threat_modeling.token_budget import count_tokens, drop_list_items
+
+
+@pytest.fixture(autouse=True)
+def heuristic_tokenizer(monkeypatch):
+    # ~4 chars/token keeps the tests offline and independent of the tiktoken version
+    monkeypatch.setattr(token_budget, "_encoding", False)
+
+
+def payload(chunks=200, tiles=20):
+    return {
+        "project_id": "demo",
+        "pdf": {"chunks": [{"page": i, "text": f"chunk {i} " * 10} for i in range(chunks)]},
+        "tiles": [f"tile-{i}" for i in range(tiles)],
+    }
+
+
+def test_trailing_items_are_dropped_until_the_payload_fits():
+    reduced = drop_list_items("pdf.chunks", "tiles")(payload(), 2000)
+    chunks = reduced["pdf"]["chunks"]
+    assert count_tokens(reduced) <= 2000
+    assert [c["page"] for c in chunks] == list(range(len(chunks)))
+    assert len(reduced["tiles"]) == 20
+    assert reduced["budget_note"] == f"{200 - len(chunks)} items were dropped to fit the 2000-token budget"
+
+
+def test_keeps_the_longest_prefix_that_fits():
+    reduced = drop_list_items("pdf.chunks")(payload(), 2000)
+    kept = len(reduced["pdf"]["chunks"])
+    reduced["pdf"]["chunks"] = payload()["pdf"]["chunks"][:kept + 1]
+    assert count_tokens(reduced) > 2000
+
+
+def test_next_list_is_reduced_once_the_first_is_empty():
+    reduced = drop_list_items("pdf.chunks", "tiles")(payload(chunks=5, tiles=400), 300)
+    assert reduced["pdf"]["chunks"] == []
+    assert 0 < len(reduced["tiles"]) < 400
+    assert count_tokens(reduced) <= 300
+
+
+def test_payload_is_not_recounted_per_item(monkeypatch):
+    calls = []
+    monkeypatch.setattr(token_budget, "count_tokens", lambda text: calls.append(text) or count_tokens(text))
+    drop_list_items("pdf.chunks")(payload(chunks=2000), 2000)
+    # One count up front, one without the list, then a recount per estimate (rarely more than two)
+    assert sum(1 for c in calls if isinstance(c, dict) and "project_id" in c) <= 4
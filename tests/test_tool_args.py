@@ -0,0 +1,97 @@
+from typing import Any, List, Union
+
+import pytest
+from pydantic import Field
+
+from threat_modeling.tools.tool_args import ToolArgs
+
+
+class RisksArgs(ToolArgs):
+    payload_field = "risks_json"
+
+    risks_json: Union[List[Any], dict, str] = Field(...)
+    csv_path: str = ""
+
+
+class PathArgs(ToolArgs):
+    payload_field = "file_path"
+
+    file_path: str = Field(...)
+    page_start: int = 0
+
+
+RISKS = [{"threat": "Public bucket", "asset": "GCS: logs"}]
+
+
+# ----------------------------------------
+# Bare values
+# ----------------------------------------
+
+def test_bare_list_is_the_payload():
+    assert RisksArgs.model_validate(RISKS).risks_json == RISKS
+
+
+def test_bare_string_is_stripped_and_unquoted():
+    assert PathArgs.model_validate('  "docs/architecture.pdf" ').file_path == "docs/architecture.pdf"
+
+
+def test_quoted_value_nested_under_its_own_name_is_unwrapped_and_unquoted():
+    assert PathArgs.model_validate({"file_path": {"file_path": "'a.pdf'"}}).file_path == "a.pdf"
+
+
+# ----------------------------------------
+# Renamed keys
+# ----------------------------------------
+
+def test_single_unknown_key_is_the_payload():
+    args = PathArgs.model_validate({"path": "a.pdf", "page_start": 3})
+    assert (args.file_path, args.page_start) == ("a.pdf", 3)
+
+
+def test_several_unknown_keys_become_the_payload_object():
+    args = RisksArgs.model_validate({"threat": "Public bucket", "asset": "GCS: logs", "csv_path": "out.csv"})
+    assert args.risks_json == RISKS[0]
+    assert args.csv_path == "out.csv"
+
+
+def test_security_context_is_not_a_payload():
+    args = PathArgs.model_validate({"file_path": "a.pdf", "security_context": {"agent": "x"}})
+    assert args.file_path == "a.pdf"
+
+
+def test_known_fields_only_still_fail_validation():
+    with pytest.raises(ValueError):
+        PathArgs.model_validate({"page_start": 3})
+
+
+# ----------------------------------------
+# Nested wrappers
+# ----------------------------------------
+
+def test_payload_nested_under_its_own_name_is_unwrapped():
+    assert RisksArgs.model_validate({"risks_json": {"risks_json": RISKS}}).risks_json == RISKS
+
+
+def test_renamed_key_with_list_wrapper_is_unwrapped():
+    assert RisksArgs.model_validate({"input": {"risks": RISKS}}).risks_json == RISKS
+
+
+def test_single_key_object_without_a_list_is_kept():
+    assert RisksArgs.model_validate({"risks_json": {"threat": "x"}}).risks_json == {"threat": "x"}
+
+
+# ----------------------------------------
+# Quoted JSON strings
+# ----------------------------------------
+
+@pytest.mark.parametrize("quoted", ["'[{\"threat\": \"x\"}]'", "\"[{\"threat\": \"x\"}]\"", " '[{\"threat\": \"x\"}]' "])
+def test_quoted_json_string_is_unquoted(quoted):
+    assert RisksArgs.model_validate({"risks_json": quoted}).risks_json == '[{"threat": "x"}]'
+
+
+def test_bare_quoted_json_string_is_unquoted():
+    assert RisksArgs.model_validate("'[{\"threat\": \"x\"}]'").risks_json == '[{"threat": "x"}]'
+
+
+def test_mismatched_quotes_are_kept():
+    assert PathArgs.model_validate({"file_path": "'a.pdf\""}).file_path == "'a.pdf\""